@@ -0,0 +1,209 @@
+import argparse
+import difflib
+import json
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+import numpy as np
+import pandas as pd
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+@lru_cache(maxsize=None)
+def strip_accents(value: str) -> str:
+    decomposed = unicodedata.normalize('NFKD', value)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+@lru_cache(maxsize=None)
+def normalize_key(value: str) -> str:
+    # Case, accents, punctuation and repeated whitespace do not distinguish two names
+    return re.sub(r'[\W_]+', ' ', strip_accents(value)).strip().upper()
+
+
+class NameCanonicalizer:
+    """
+    This class maps the spellings of a name column (e.g. 'Belén', 'BELEN ', 'belen') to one canonical
+    value, so that the same neighborhood, property type or origin is a single group across years.
+    Spellings are compared on their key: upper case, without accents, punctuation or repeated spaces.
+    Every key has one canonical value in a persisted alias dictionary (a JSON file with one section per
+    column). Keys seen for the first time take their most frequent spelling as canonical value (upper
+    case for the columns in `upper_columns`) and are added to the dictionary, together with a fuzzy-match
+    suggestion (difflib) when they are close to a known key, e.g. 'LAURELEZ' -> 'LAURELES'. Suggestions
+    are never applied automatically; accept them with accept_suggestions or edit the file by hand.
+    A column is canonicalized per distinct value: each spelling is normalized and looked up once,
+    and the rows take the result of their spelling.
+    """
+    columns = ("Barrio", "Predio", "Origin")
+    # The KML layers are upper case and filtered with e.g. startswith('APARTAMENTO')
+    upper_columns = ("Barrio", "Predio")
+
+    def __init__(self, aliases_path: Optional[Path] = None, cutoff: float = 0.85):
+        self.aliases_path = Path(aliases_path) if aliases_path else None
+        self.cutoff = cutoff
+        self.aliases: Dict[str, Dict[str, str]] = {column: {} for column in self.columns}
+        self.suggestions: Dict[str, Dict[str, Dict[str, object]]] = {column: {} for column in self.columns}
+        self._lock = threading.Lock()
+        if self.aliases_path is not None and self.aliases_path.exists():
+            with open(self.aliases_path, encoding='utf-8') as f:
+                stored = json.load(f)
+            for column, section in stored.items():
+                # Keys may be written in any spelling by hand, they are normalized on load
+                self.aliases.setdefault(column, {}).update(
+                    {normalize_key(key): value for key, value in section.get("aliases", {}).items()})
+                self.suggestions.setdefault(column, {}).update(section.get("suggestions", {}))
+
+    def _learn(self, column: str, spellings: pd.Series) -> None:
+        # spellings: row count per raw spelling of keys missing from the dictionary
+        aliases = self.aliases.setdefault(column, {})
+        # Leading and trailing punctuation (': APARTAMENTO') is not part of the name
+        frame = pd.DataFrame({"Spelling": spellings.index.map(
+                                  lambda value: re.sub(r'^[\W_]+|[\W_]+$', '', re.sub(r'\s+', ' ', value))),
+                              "Key": spellings.index.map(normalize_key), "Rows": spellings.to_numpy()})
+        frame = frame.groupby(["Key", "Spelling"], as_index=False)["Rows"].sum()
+        # Between equally frequent spellings, prefer one carrying case or accents ('Perú' over 'PERU')
+        frame["Plain"] = frame["Spelling"].map(lambda value: value == strip_accents(value).upper())
+        frame["Accents"] = frame["Spelling"].map(lambda value: sum(not char.isascii() for char in value))
+        frame = frame.sort_values(["Key", "Rows", "Plain", "Accents", "Spelling"],
+                                  ascending=[True, False, True, False, True])
+        new_keys = frame.groupby("Key", sort=False)["Rows"].sum()
+        for key, group in frame.groupby("Key", sort=False):
+            canonical = group["Spelling"].iloc[0]
+            aliases[key] = canonical.upper() if column in self.upper_columns else canonical
+
+        # A new key is only compared with known names and with more frequent new keys, so two
+        # similar new names do not suggest each other
+        known = {normalize_key(value) for value in aliases.values()} - set(new_keys.index)
+        for key, rows in new_keys.items():
+            candidates = sorted(known | set(new_keys.index[new_keys > rows]))
+            matches = difflib.get_close_matches(key, candidates, n=1, cutoff=self.cutoff)
+            if matches:
+                self.suggestions.setdefault(column, {})[key] = {
+                    "canonical": aliases.get(matches[0], matches[0]),
+                    "score": round(difflib.SequenceMatcher(None, key, matches[0]).ratio(), 3),
+                    "rows": int(rows),
+                }
+        print(f"[INFO] Added {len(new_keys)} new '{column}' names to the canonical dictionary")
+
+    def canonicalize(self, df: pd.DataFrame, column: str) -> pd.DataFrame:
+        """
+        Returns df with `column` replaced by its canonical values. Missing values stay missing.
+        """
+        if df is None or column not in df.columns:
+            return df
+        series = df[column]
+        codes, uniques = pd.factorize(series.astype(object))
+        spellings = pd.Series(np.bincount(codes[codes >= 0], minlength=len(uniques)),
+                              index=pd.Index(uniques, dtype=object).map(str))
+
+        with self._lock:
+            aliases = self.aliases.setdefault(column, {})
+            unseen = spellings[[normalize_key(value) not in aliases for value in spellings.index]]
+            if len(unseen):
+                self._learn(column, unseen)
+            # Code -1 (missing value) takes the trailing None
+            canonical = np.array([aliases[normalize_key(value)] for value in spellings.index] + [None], dtype=object)
+
+        values = pd.Series(canonical[codes], index=df.index, dtype=object)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            values = values.astype('category')
+        elif series.dtype != object:
+            values = values.astype(series.dtype)
+        return df.assign(**{column: values})
+
+    def report(self) -> pd.DataFrame:
+        """Pending fuzzy-match suggestions, one row per column and key."""
+        rows = [{"Column": column, "Key": key, "Current": self.aliases.get(column, {}).get(key),
+                 "Suggested": suggestion["canonical"], "Score": suggestion["score"], "Rows": suggestion["rows"]}
+                for column, section in self.suggestions.items() for key, suggestion in section.items()]
+        return pd.DataFrame(rows, columns=["Column", "Key", "Current", "Suggested", "Score", "Rows"])
+
+    def accept_suggestions(self, min_score: float = 0.0) -> int:
+        """Turns the suggestions scoring at least min_score into aliases and returns their number."""
+        accepted = 0
+        with self._lock:
+            for column, section in self.suggestions.items():
+                for key in [key for key, suggestion in section.items() if suggestion["score"] >= min_score]:
+                    self.aliases.setdefault(column, {})[key] = section.pop(key)["canonical"]
+                    accepted += 1
+        return accepted
+
+    @contextmanager
+    def _file_lock(self):
+        # Serializes the read-merge-replace of save() between processes (the city shards of run_catalog
+        # run in a process pool); the thread lock only covers this instance
+        lock_path = self.aliases_path.with_name(self.aliases_path.name + '.lock')
+        with open(lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def save(self) -> None:
+        """
+        Writes the dictionary merged with the file on disk, so that pipelines sharing the file (e.g. the
+        city shards of run_catalog) keep each other's names. Keys in memory win over the stored ones and
+        suggestions that were accepted, here or in the file, are dropped. The read, merge and replace run
+        under an exclusive lock on a sidecar '.lock' file (fcntl.flock; on platforms without fcntl only
+        threads of this process are serialized), and the file is replaced atomically from a temporary
+        file in the same directory.
+        """
+        if self.aliases_path is None:
+            return
+        self.aliases_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, self._file_lock():
+            stored = {}
+            if self.aliases_path.exists():
+                with open(self.aliases_path, encoding='utf-8') as f:
+                    stored = json.load(f)
+            merged = {}
+            for column in sorted(set(stored) | set(self.aliases) | set(self.suggestions)):
+                section = stored.get(column, {})
+                aliases = {normalize_key(key): value for key, value in section.get("aliases", {}).items()}
+                aliases.update(self.aliases.get(column, {}))
+                suggestions = {**section.get("suggestions", {}), **self.suggestions.get(column, {})}
+                suggestions = {key: suggestion for key, suggestion in suggestions.items()
+                               if aliases.get(key) != suggestion["canonical"]}
+                merged[column] = {"aliases": dict(sorted(aliases.items())),
+                                  "suggestions": dict(sorted(suggestions.items()))}
+
+            descriptor, temporary = tempfile.mkstemp(prefix=f".{self.aliases_path.name}.", suffix='.tmp',
+                                                     dir=self.aliases_path.parent)
+            try:
+                with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                    json.dump(merged, f, ensure_ascii=False, indent=2)
+                os.replace(temporary, self.aliases_path)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+            for column, section in merged.items():
+                self.aliases[column] = dict(section["aliases"])
+                self.suggestions[column] = dict(section["suggestions"])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Review the canonical name dictionary")
+    parser.add_argument('--aliases', type=Path, default=Path('../data') / 'canonical_aliases.json')
+    parser.add_argument('--accept', type=float, metavar='MIN_SCORE',
+                        help="accept the suggestions scoring at least MIN_SCORE")
+    args = parser.parse_args()
+
+    canonicalizer = NameCanonicalizer(args.aliases)
+    if args.accept is not None:
+        accepted = canonicalizer.accept_suggestions(args.accept)
+        canonicalizer.save()
+        print(f"[SUCCESS] Accepted {accepted} suggestions into {args.aliases}")
+    pending: List[dict] = canonicalizer.report().sort_values("Score", ascending=False).to_dict('records')
+    for row in pending:
+        print(f"{row['Column']}: '{row['Current']}' -> '{row['Suggested']}' (score {row['Score']}, {row['Rows']} rows)")
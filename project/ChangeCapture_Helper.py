@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+class ChangeCapture:
+    """
+    This class computes the difference between the previous and the new version of an output table.
+    Every row gets two 64-bit fingerprints: one over its key columns and one over the whole row.
+    Both versions are hash-joined on (key fingerprint, occurrence of the key) in linear time, which
+    classifies the rows as inserted, deleted or updated (same key, different row fingerprint). Tables
+    without declared keys use the whole row as key, so they only report inserts and deletes.
+    """
+    # Columns identifying a row of each output table
+    table_keys: Dict[str, List[str]] = {
+        "sales_rents_2011_2021": ["Period", "Research", "Property", "Neighborhood", "Longitude", "Latitude"],
+        "monthly_entry_colombians_foreigners": ["Nationality", "Period"],
+        "monthly_passengers_origin": ["Code", "Origin", "Period", "Nationality"],
+        "monthly_features": ["Month_Index"],
+        "price_sketches": ["Measure", "Research", "Neighborhood", "Stratum", "Period"],
+    }
+
+    @staticmethod
+    def _canonical(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+        # Values read back from SQLite and freshly transformed values must hash identically:
+        # numbers become float64 (NaN for nulls) and everything else becomes str (None for nulls)
+        canonical = {}
+        for column in columns:
+            if column not in df.columns:
+                canonical[column] = pd.Series(None, index=df.index, dtype=object)
+                continue
+            values = df[column]
+            # A column without any value is read back from SQLite as object; hash it like float64 NaN
+            if values.dtype == object and values.isna().all():
+                values = values.astype('float64')
+            if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+                canonical[column] = pd.to_numeric(values, errors='coerce').astype('float64')
+            else:
+                canonical[column] = values.astype(object).where(values.notna(), None).map(
+                    lambda value: value if value is None else str(value))
+        return pd.DataFrame(canonical, index=df.index)
+
+    @staticmethod
+    def _align_dtypes(previous: pd.DataFrame, current: pd.DataFrame) -> pd.DataFrame:
+        # The previous version is read back from SQLite; give its columns the dtypes of the new version
+        # where the values allow it, so that e.g. an all-NULL float column is float64 on both sides
+        aligned = {}
+        for column in previous.columns.intersection(current.columns):
+            if previous[column].dtype == current[column].dtype:
+                continue
+            try:
+                aligned[column] = previous[column].astype(current[column].dtype)
+            except (TypeError, ValueError):
+                pass
+        return previous.assign(**aligned) if aligned else previous
+
+    @classmethod
+    def fingerprints(cls, df: pd.DataFrame, columns: List[str], key_columns: List[str]) -> pd.DataFrame:
+        canonical = cls._canonical(df, columns)
+        row_hash = pd.util.hash_pandas_object(canonical, index=False).to_numpy().view('int64')
+        key_hash = pd.util.hash_pandas_object(canonical[key_columns], index=False).to_numpy().view('int64')
+        prints = pd.DataFrame({"Key_Hash": key_hash, "Row_Hash": row_hash, "Position": np.arange(len(df))})
+        # Rows sharing a key are matched in order of appearance
+        prints["Occurrence"] = prints.groupby("Key_Hash").cumcount()
+        return prints
+
+    @classmethod
+    def diff(cls, table_name: str, previous: Optional[pd.DataFrame], current: pd.DataFrame, run_id: str) -> pd.DataFrame:
+        """
+        Returns one row per change with columns Run_ID, Table_Name, Change ("insert", "delete" or
+        "update"), Key_Hash and Row (JSON of the new row, or of the old row for deletes).
+        """
+        columns_out = ["Run_ID", "Table_Name", "Change", "Key_Hash", "Row"]
+        if previous is None:
+            previous = current.iloc[0:0]
+        previous = cls._align_dtypes(previous, current)
+        columns = list(dict.fromkeys(list(current.columns) + list(previous.columns)))
+        key_columns = [c for c in cls.table_keys.get(table_name, columns) if c in columns] or columns
+
+        old = cls.fingerprints(previous, columns, key_columns)
+        new = cls.fingerprints(current, columns, key_columns)
+        joined = old.merge(new, on=["Key_Hash", "Occurrence"], how="outer", suffixes=("_old", "_new"), indicator=True)
+
+        inserted = joined[joined["_merge"] == "right_only"]
+        deleted = joined[joined["_merge"] == "left_only"]
+        both = joined[joined["_merge"] == "both"]
+        updated = both[both["Row_Hash_old"] != both["Row_Hash_new"]]
+
+        parts = []
+        for change, rows, source, position in (("insert", inserted, current, "Position_new"),
+                                               ("update", updated, current, "Position_new"),
+                                               ("delete", deleted, previous, "Position_old")):
+            if rows.empty:
+                continue
+            records = source.iloc[rows[position].astype(int).to_numpy()]
+            parts.append(pd.DataFrame({
+                "Run_ID": run_id,
+                "Table_Name": table_name,
+                "Change": change,
+                "Key_Hash": rows["Key_Hash"].to_numpy(),
+                "Row": records.to_json(orient='records', lines=True, force_ascii=False).splitlines()
+            }))
+        if not parts:
+            return pd.DataFrame(columns=columns_out)
+        changes = pd.concat(parts, ignore_index=True)
+        print(f"[INFO] Changes in '{table_name}': "
+              + ", ".join(f"{len(rows)} {change}s" for change, rows in (("insert", inserted), ("update", updated), ("delete", deleted))))
+        return changes[columns_out]
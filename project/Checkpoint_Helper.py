@@ -0,0 +1,74 @@
+import json
+import pickle
+import re
+import threading
+import pandas as pd
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+class RunCheckpoint:
+    """
+    This class persists the intermediate result and the status of every pipeline task in a run
+    directory (one file per task plus a 'status.json' manifest). Raw payloads are stored as they were
+    downloaded, DataFrames as pickles. A resumed run restores every task whose checkpoint is marked
+    "ok" and only re-executes the tasks that failed or never ran.
+    """
+    def __init__(self, run_dir: Path):
+        self.run_dir = Path(run_dir)
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.run_dir / 'status.json'
+        self._lock = threading.Lock()
+        self.manifest: Dict[str, Dict[str, Any]] = {}
+        if self.manifest_path.exists():
+            self.manifest = json.loads(self.manifest_path.read_text())
+
+    @staticmethod
+    def latest_run_dir(runs_path: Path) -> Optional[Path]:
+        runs = sorted(path for path in Path(runs_path).glob('*') if (path / 'status.json').exists())
+        return runs[-1] if runs else None
+
+    def _file_name(self, name: str, result: Any) -> str:
+        stem = re.sub(r'[^\w.-]+', '_', name)
+        if isinstance(result, bytes):
+            return stem + '.raw'
+        return stem + '.pkl'
+
+    def _write_manifest(self) -> None:
+        tmp = self.manifest_path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.manifest, indent=2, sort_keys=True))
+        tmp.replace(self.manifest_path)
+
+    def has(self, name: str) -> bool:
+        entry = self.manifest.get(name)
+        return entry is not None and entry["status"] == "ok" and (self.run_dir / entry["file"]).exists()
+
+    def load(self, name: str) -> Any:
+        path = self.run_dir / self.manifest[name]["file"]
+        if path.suffix == '.raw':
+            return path.read_bytes()
+        if self.manifest[name].get("kind") == "dataframe":
+            return pd.read_pickle(path)
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def save(self, name: str, result: Any, duration: float) -> None:
+        file_name = self._file_name(name, result)
+        path = self.run_dir / file_name
+        if isinstance(result, bytes):
+            path.write_bytes(result)
+            kind = "raw"
+        elif isinstance(result, pd.DataFrame):
+            result.to_pickle(path)
+            kind = "dataframe"
+        else:
+            with open(path, 'wb') as f:
+                pickle.dump(result, f)
+            kind = "object"
+        with self._lock:
+            self.manifest[name] = {"status": "ok", "file": file_name, "kind": kind, "duration": round(duration, 3)}
+            self._write_manifest()
+
+    def mark_failed(self, name: str, error: Exception) -> None:
+        with self._lock:
+            self.manifest[name] = {"status": "failed", "file": "", "error": str(error)}
+            self._write_manifest()
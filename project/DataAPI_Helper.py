@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from Database_Helper import ReadOnlyConnectionPool
+from QueryService_Helper import HousingTourismQueries
+from StarSchema_Helper import StarSchema
+
+class DataAPI:
+    """
+    This class is a small read-only HTTP/1.1 service (asyncio streams, no framework) over the
+    published database. It serves:
+        - GET /tables: the available tables and the current run ID,
+        - GET /tables/<name>: rows of an output table with keyset pagination (?after=<cursor>&limit=N),
+          column projection (?columns=a,b) and a Period range filter (?period_from=YYYY.MM&period_to=YYYY.MM),
+        - GET /aggregates/<name>: the aggregations of HousingTourismQueries.
+    Every response carries an ETag derived from the pipeline run ID and the request, so clients and
+    caches revalidate with If-None-Match and get 304 until a new load is published. Table reads and
+    aggregates run in worker threads on a pool of read-only connections. Compatibility views of a star-schema load have
+    no rowid, so they are paginated on the rowid of their fact table.
+    """
+    tables = ["sales_rents_2011_2021", "monthly_entry_colombians_foreigners", "monthly_passengers_origin", "monthly_features"]
+    aggregates = ["monthly_travelers", "price_per_m2_by_period", "top_origins", "price_percentiles"]
+    max_limit = 5000
+
+    def __init__(self, database_name: Path = Path('../data') / 'Housing_Tourism_Data.sqlite', pool_size: int = 4):
+        self.pool = ReadOnlyConnectionPool(database_name, size=pool_size)
+        self.queries = HousingTourismQueries(database_name, pool=self.pool)
+        self._columns: Dict[Tuple[str, str], list] = {}
+        self._sources: Dict[Tuple[str, str], Tuple[str, str]] = {}
+
+    def _table_columns(self, conn, table: str) -> list:
+        key = (self.pool.run_id, table)
+        if key not in self._columns:
+            self._columns[key] = [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+        return self._columns[key]
+
+    def _table_source(self, conn, table: str, columns: list) -> Tuple[str, str]:
+        # (FROM clause, row ID column) to paginate the table or the view on
+        key = (self.pool.run_id, table)
+        if key not in self._sources:
+            if StarSchema.is_view(conn, table):
+                self._sources[key] = (f"({StarSchema.select_sql(table, columns, row_id='_Row_ID')})", "_Row_ID")
+            else:
+                self._sources[key] = (f'"{table}"', "rowid")
+        return self._sources[key]
+
+    def _read_table(self, table: str, params: Dict[str, str]) -> Tuple[int, dict]:
+        with self.pool.connection() as conn:
+            available = self._table_columns(conn, table)
+            if not available:
+                return 404, {"error": f"Table '{table}' is not in the database"}
+            columns = [c for c in params.get("columns", "").split(",") if c] or available
+            unknown = [c for c in columns if c not in available]
+            if unknown:
+                return 400, {"error": f"Unknown columns: {unknown}"}
+            try:
+                after = int(params.get("after", 0))
+                limit = int(params.get("limit", 100))
+            except ValueError:
+                return 400, {"error": "'after' and 'limit' must be integers"}
+            # SQLite reads a negative LIMIT as no limit at all
+            if after < 0 or limit < 1:
+                return 400, {"error": "'after' must be >= 0 and 'limit' >= 1"}
+            limit = min(limit, self.max_limit)
+
+            source, row_id = self._table_source(conn, table, available)
+            where, args = [f"{row_id} > ?"], [after]
+            for name, op in (("period_from", ">="), ("period_to", "<=")):
+                if name in params:
+                    if "Period" not in available:
+                        return 400, {"error": f"Table '{table}' has no Period column"}
+                    where.append(f"Period {op} ?")
+                    args.append(params[name])
+            selected = ", ".join(f'"{c}"' for c in columns)
+            sql = f'SELECT {row_id}, {selected} FROM {source} WHERE {" AND ".join(where)} ORDER BY {row_id} LIMIT ?'
+            rows = conn.execute(sql, args + [limit]).fetchall()
+
+        body = {
+            "run_id": self.pool.run_id,
+            "table": table,
+            "columns": columns,
+            "rows": [list(row[1:]) for row in rows],
+            "next_after": rows[-1][0] if len(rows) == limit else None
+        }
+        return 200, body
+
+    def _read_aggregate(self, name: str, params: Dict[str, str]) -> Tuple[int, dict]:
+        kwargs = {}
+        if name == "top_origins":
+            try:
+                kwargs["top_n"] = int(params.get("top_n", 10))
+            except ValueError:
+                return 400, {"error": "'top_n' must be an integer"}
+            kwargs["nationality"] = params.get("nationality")
+        elif name == "price_percentiles":
+            sketches = self.queries.sketches
+            by = [c for c in params.get("by", "Neighborhood").split(",") if c]
+            if params.get("measure", sketches.measures[0]) not in sketches.measures or not set(by) <= set(sketches.group_columns):
+                return 400, {"error": f"'measure' must be one of {sketches.measures}, 'by' a subset of {sketches.group_columns}"}
+            try:
+                kwargs["percentiles"] = [float(p) for p in params.get("percentiles", "0.25,0.5,0.75").split(",")]
+            except ValueError:
+                return 400, {"error": "'percentiles' must be comma-separated numbers"}
+            kwargs.update(measure=params.get("measure", sketches.measures[0]), by=by, research=params.get("research"))
+        df = getattr(self.queries, name)(**kwargs)
+        return 200, {"run_id": self.pool.run_id, "aggregate": name, "columns": list(df.columns),
+                     "rows": json.loads(df.to_json(orient="values"))}
+
+    def handle(self, path: str, query: str) -> Tuple[int, dict]:
+        params = {key: values[-1] for key, values in parse_qs(query).items()}
+        parts = [part for part in path.split("/") if part]
+        if parts == ["tables"]:
+            self.pool.refresh()
+            return 200, {"run_id": self.pool.run_id, "tables": self.tables, "aggregates": self.aggregates}
+        if len(parts) == 2 and parts[0] == "tables" and parts[1] in self.tables:
+            return self._read_table(parts[1], params)
+        if len(parts) == 2 and parts[0] == "aggregates" and parts[1] in self.aggregates:
+            return self._read_aggregate(parts[1], params)
+        return 404, {"error": f"Unknown resource '{path}'"}
+
+    def etag(self, target: str) -> str:
+        self.pool.refresh()
+        return '"' + hashlib.sha1(f"{self.pool.run_id}|{target}".encode()).hexdigest()[:20] + '"'
+
+    async def _respond(self, writer, status: int, body: Optional[bytes], headers: Dict[str, str]) -> None:
+        reasons = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+        lines = [f"HTTP/1.1 {status} {reasons.get(status, 'OK')}"]
+        headers = {**headers, "Content-Length": str(len(body) if body else 0), "Connection": "close"}
+        lines += [f"{key}: {value}" for key, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b""))
+        await writer.drain()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                key, _, value = line.partition(":")
+                headers[key.strip().lower()] = value.strip()
+            if not request_line:
+                return
+            method, target, _ = (request_line.split(" ") + ["", ""])[:3]
+            if method not in ("GET", "HEAD"):
+                await self._respond(writer, 405, None, {"Allow": "GET, HEAD"})
+                return
+
+            # A missing or half-replaced database fails the ETag as well, so both answer with a JSON error
+            url = urlsplit(target)
+            etag = None
+            try:
+                etag = await asyncio.to_thread(self.etag, target)
+                if headers.get("if-none-match") == etag:
+                    await self._respond(writer, 304, None, {"ETag": etag})
+                    return
+                status, payload = await asyncio.to_thread(self.handle, url.path, url.query)
+            except Exception as e:
+                status, payload = 500, {"error": str(e)}
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+            response_headers = {"Content-Type": "application/json; charset=utf-8", "Cache-Control": "no-cache"}
+            if status == 200:
+                response_headers["ETag"] = etag
+            await self._respond(writer, status, None if method == "HEAD" else body, response_headers)
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8000) -> None:
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"[INFO] Serving {self.pool.database_name} on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Read-only HTTP API over the pipeline output database")
+    parser.add_argument('--database', type=Path, default=Path('../data') / 'Housing_Tourism_Data.sqlite')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--pool-size', type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(DataAPI(args.database, pool_size=args.pool_size).serve(args.host, args.port))
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field
+
+@dataclass
+class ValidationRule:
+    """
+    Declarative description of a single data-quality check. A rule is compiled into a vectorized
+    boolean mask (True = row passes) by DataValidator; nothing is evaluated row by row.
+
+    Supported kinds:
+        - "range": min_value <= column <= max_value (either bound optional, nulls pass)
+        - "regex": column fully matches pattern
+        - "enum": column is in allowed (or not in allowed when exclude=True)
+        - "not_null": column is not null
+        - "ratio": column ~= numerator / denominator within a relative tolerance
+          (rows where any operand is null or the denominator is 0 pass)
+    """
+    name: str
+    kind: str
+    column: str
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+    pattern: Optional[str] = None
+    allowed: List[Any] = field(default_factory=list)
+    exclude: bool = False
+    numerator: Optional[str] = None
+    denominator: Optional[str] = None
+    tolerance: float = 0.0
+
+
+class DataValidator:
+    """
+    This class evaluates a list of ValidationRule objects against a DataFrame in a single pass:
+    every rule is compiled into a boolean mask, the masks are stacked into one matrix, and the
+    failing rows are split off into a quarantine table annotated with the rules they broke.
+    Per-rule failure counts are kept for every validated dataset.
+    """
+    def __init__(self):
+        self.quarantine: Dict[str, pd.DataFrame] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def compile_rule(df: pd.DataFrame, rule: ValidationRule) -> np.ndarray:
+        if rule.column not in df.columns:
+            raise KeyError(f"Validation rule '{rule.name}' refers to missing column '{rule.column}'")
+        column = df[rule.column]
+
+        if rule.kind == "range":
+            values = pd.to_numeric(column, errors='coerce')
+            mask = pd.Series(True, index=df.index)
+            if rule.min_value is not None:
+                mask &= ~(values < rule.min_value)
+            if rule.max_value is not None:
+                mask &= ~(values > rule.max_value)
+        elif rule.kind == "regex":
+            mask = column.astype(str).str.fullmatch(rule.pattern, na=False)
+        elif rule.kind == "enum":
+            mask = column.isin(rule.allowed)
+            if rule.exclude:
+                mask = ~mask
+        elif rule.kind == "not_null":
+            mask = column.notna()
+        elif rule.kind == "ratio":
+            values = pd.to_numeric(column, errors='coerce').astype(float)
+            numerator = pd.to_numeric(df[rule.numerator], errors='coerce').astype(float)
+            denominator = pd.to_numeric(df[rule.denominator], errors='coerce').astype(float)
+            checkable = values.notna() & numerator.notna() & denominator.notna() & (denominator != 0)
+            expected = numerator.where(checkable) / denominator.where(checkable)
+            deviation = (values - expected).abs() / expected.abs().clip(lower=1)
+            mask = ~checkable | (deviation <= rule.tolerance)
+        else:
+            raise ValueError(f"Unknown validation rule kind '{rule.kind}' for rule '{rule.name}'")
+
+        return np.asarray(mask.fillna(False), dtype=bool)
+
+    def validate(self, name: str, df: pd.DataFrame, rules: List[ValidationRule]) -> pd.DataFrame:
+        """
+        Applies all rules to df at once, stores failing rows in self.quarantine[name] and the
+        per-rule failure counts in self.stats[name], and returns only the rows that passed.
+        """
+        if df is None or df.empty or not rules:
+            return df
+
+        # One column per rule: True where the row satisfies the rule
+        masks = np.column_stack([self.compile_rule(df, rule) for rule in rules])
+        passed = masks.all(axis=1)
+        self.stats[name] = {rule.name: int((~masks[:, i]).sum()) for i, rule in enumerate(rules)}
+
+        failed = df[~passed].copy()
+        if not failed.empty:
+            rule_names = np.array([rule.name for rule in rules])
+            failed['Failed_Rules'] = [",".join(rule_names[~row]) for row in masks[~passed]]
+        self.quarantine[name] = failed
+
+        print(f"[INFO] Validation of '{name}': {int(passed.sum())} rows passed, {len(failed)} rows quarantined")
+        for rule_name, count in self.stats[name].items():
+            if count:
+                print(f"--Rule '{rule_name}' rejected {count} rows")
+        return df[passed]
+
+    def report(self) -> pd.DataFrame:
+        """Returns the per-rule statistics of all validated datasets as one long table."""
+        rows = [
+            {"Dataset": name, "Rule": rule_name, "Failed_Rows": count}
+            for name, rule_stats in self.stats.items()
+            for rule_name, count in rule_stats.items()
+        ]
+        return pd.DataFrame(rows, columns=["Dataset", "Rule", "Failed_Rows"])
+
+
+class ValidationRules:
+    # Rule sets for each transformed dataset, keyed like the output of Pipeline.transform_data
+    sales_rents_rules = [
+        ValidationRule(name="period_format", kind="regex", column="Period", pattern=r"\d{4}\.\d{2}"),
+        ValidationRule(name="private_area_non_negative", kind="range", column="Private_Area_m2", min_value=0),
+        ValidationRule(name="lot_area_non_negative", kind="range", column="Lot_Area_m2", min_value=0),
+        ValidationRule(name="commercial_price_non_negative", kind="range", column="Commercial_Price_COP", min_value=0),
+        ValidationRule(name="price_per_m2_non_negative", kind="range", column="Price_per_m2_COP", min_value=0),
+        # Price per m2 should match price / private area; the tolerance absorbs rounding and
+        # the areas that the KML layers only report as whole square meters
+        ValidationRule(
+            name="price_per_m2_consistent", kind="ratio", column="Price_per_m2_COP",
+            numerator="Commercial_Price_COP", denominator="Private_Area_m2", tolerance=0.25
+        ),
+    ]
+
+    tourism_1_rules = [
+        ValidationRule(name="number_not_null", kind="not_null", column="Number"),
+        ValidationRule(name="number_non_negative", kind="range", column="Number", min_value=0),
+        ValidationRule(name="nationality_known", kind="enum", column="Nationality", allowed=["Extranjero", "Colombiano"]),
+    ]
+
+    tourism_2_rules = [
+        ValidationRule(name="number_not_null", kind="not_null", column="Number"),
+        ValidationRule(name="number_non_negative", kind="range", column="Number", min_value=0),
+        ValidationRule(name="code_two_capital_letters", kind="regex", column="Code", pattern=r"[A-Z]{2}"),
+        ValidationRule(
+            name="origin_not_placeholder", kind="enum", column="Origin",
+            allowed=["Acuerdo internacional", "Inconsistencia"], exclude=True
+        ),
+    ]
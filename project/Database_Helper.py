@@ -0,0 +1,116 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+class SQLitePublisher:
+    """
+    This class builds the output database in a staging file and publishes it atomically. Writers only
+    ever touch the staging file; on publish the staging database is analyzed, compacted with
+    VACUUM INTO into a fresh file with the configured page size, and renamed over the published
+    database. Readers therefore either see the previous complete load or the new one, never a
+    half-written file, and never block on the loader.
+    """
+    def __init__(self, database_name: Path, page_size: int = 16384):
+        self.database_name = Path(database_name)
+        self.page_size = page_size
+        self.staging_name = self.database_name.with_name(self.database_name.stem + '.staging.sqlite')
+        self.publish_name = self.database_name.with_name(self.database_name.stem + '.publish.sqlite')
+
+    def open_staging(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        """
+        Returns a connection to a fresh staging database. If a published database exists, its content
+        is copied first so that tables not rewritten by this load are preserved. Pass
+        check_same_thread=False when the connection is shared by worker threads (writes must then be
+        serialized by the caller).
+        """
+        for path in (self.staging_name, self.publish_name):
+            if path.exists():
+                path.unlink()
+        conn = sqlite3.connect(self.staging_name, check_same_thread=check_same_thread)
+        if self.database_name.exists():
+            published = sqlite3.connect(self.database_name)
+            try:
+                published.backup(conn)
+            finally:
+                published.close()
+        return conn
+
+    def publish(self, conn: sqlite3.Connection) -> None:
+        """Analyzes and compacts the staging database, then swaps it in by rename. Closes conn."""
+        try:
+            conn.commit()
+            conn.execute("ANALYZE")
+            conn.execute(f"PRAGMA page_size = {int(self.page_size)}")
+            conn.commit()
+            conn.execute("VACUUM INTO ?", (str(self.publish_name),))
+        finally:
+            conn.close()
+        os.replace(self.publish_name, self.database_name)
+        self.staging_name.unlink(missing_ok=True)
+        print(f"[INFO] Published {self.database_name} (page_size={self.page_size})")
+
+
+def connect_readonly(database_name: Path, mmap_size: int = 256 * 1024 * 1024) -> sqlite3.Connection:
+    """
+    Read-only connection factory for consumers of the published database. The file is opened in
+    read-only URI mode, pages are served through a memory map of up to mmap_size bytes, and
+    query_only rejects any statement that would modify the database.
+    """
+    uri = f"file:{Path(database_name).resolve().as_posix()}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+class ReadOnlyConnectionPool:
+    """
+    This class keeps a fixed set of read-only connections to the published database. Because
+    publishing replaces the file by rename, the pool compares the file identity on every acquire and
+    reopens its connections when a new load was published; run_id then reports the new load.
+    """
+    def __init__(self, database_name: Path, size: int = 4):
+        self.database_name = Path(database_name)
+        self.size = size
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._identity = None
+        self._generation = 0
+        self.run_id = None
+
+    def refresh(self) -> None:
+        stat = os.stat(self.database_name)
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if identity == self._identity:
+            return
+        with self._lock:
+            if identity == self._identity:
+                return
+            while not self._idle.empty():
+                self._idle.get_nowait()[1].close()
+            for _ in range(self.size):
+                self._idle.put((self._generation + 1, connect_readonly(self.database_name)))
+            self._generation += 1
+            self._identity = identity
+            conn = self._idle.queue[0][1]
+            try:
+                row = conn.execute("SELECT Run_ID FROM _pipeline_runs ORDER BY Finished_At DESC LIMIT 1").fetchone()
+            except sqlite3.OperationalError:
+                row = None
+            self.run_id = row[0] if row else "file-" + "-".join(str(part) for part in identity)
+
+    @contextmanager
+    def connection(self):
+        self.refresh()
+        generation, conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            # Connections of a previous load are closed instead of returned
+            if generation == self._generation:
+                self._idle.put((generation, conn))
+            else:
+                conn.close()
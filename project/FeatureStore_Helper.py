@@ -0,0 +1,100 @@
+import re
+import numpy as np
+import pandas as pd
+from typing import Sequence
+
+class MonthlyFeatureBuilder:
+    """
+    This class materializes one monthly aligned feature table out of the transformed tourism and
+    housing datasets. Rows are keyed by an integer month index (months since January of base_year)
+    and cover every month between the first and the last observation, so that lags and rolling
+    windows are plain row shifts. The table holds:
+        - tourist counts by nationality,
+        - the share of the top-N origins in the monthly passenger total,
+        - mean, median and count of the price per m2 for each Research type (sales, rents),
+        - rolling means and lags of the tourism and price series.
+    """
+    def __init__(self, base_year: int = 2011, top_n_origins: int = 5,
+                 windows: Sequence[int] = (3, 6, 12), lags: Sequence[int] = (1, 3, 6, 12)):
+        self.base_year = base_year
+        self.top_n_origins = top_n_origins
+        self.windows = list(windows)
+        self.lags = list(lags)
+
+    def month_index(self, period: pd.Series) -> pd.Series:
+        period = period.astype(str)
+        year = pd.to_numeric(period.str[:4], errors='coerce')
+        month = pd.to_numeric(period.str[5:7], errors='coerce')
+        return ((year - self.base_year) * 12 + (month - 1)).astype('Int64')
+
+    @staticmethod
+    def _column_suffix(value) -> str:
+        return re.sub(r'\W+', '_', str(value).strip()).strip('_') or "Unknown"
+
+    def _tourism_features(self, tourism_1: pd.DataFrame) -> pd.DataFrame:
+        counts = tourism_1.assign(Month_Index=self.month_index(tourism_1['Period']))
+        counts = counts.pivot_table(index='Month_Index', columns='Nationality', values='Number', aggfunc='sum')
+        return counts.rename(columns=lambda name: f"Tourists_{self._column_suffix(name)}")
+
+    def _origin_features(self, tourism_2: pd.DataFrame) -> pd.DataFrame:
+        passengers = tourism_2.assign(Month_Index=self.month_index(tourism_2['Period']))
+        monthly_total = passengers.groupby('Month_Index')['Number'].sum()
+        top_origins = passengers.groupby('Origin')['Number'].sum().nlargest(self.top_n_origins).index
+        top = passengers[passengers['Origin'].isin(top_origins)]
+        shares = top.pivot_table(index='Month_Index', columns='Origin', values='Number', aggfunc='sum')
+        shares = shares.div(monthly_total, axis=0)
+        shares = shares.rename(columns=lambda name: f"Origin_Share_{self._column_suffix(name)}")
+        shares['Passengers_Total'] = monthly_total
+        return shares
+
+    def _price_features(self, sales_rents: pd.DataFrame) -> pd.DataFrame:
+        prices = sales_rents.assign(
+            Month_Index=self.month_index(sales_rents['Period']),
+            Price=pd.to_numeric(sales_rents['Price_per_m2_COP'], errors='coerce').astype(float)
+        )
+        stats = prices.groupby(['Month_Index', 'Research'])['Price'].agg(['mean', 'median', 'count'])
+        stats = stats.unstack('Research')
+        stats.columns = [f"Price_m2_{stat.capitalize()}_{self._column_suffix(research)}" for stat, research in stats.columns]
+        return stats
+
+    def build(self, sales_rents: pd.DataFrame, tourism_1: pd.DataFrame, tourism_2: pd.DataFrame) -> pd.DataFrame:
+        parts = []
+        if tourism_1 is not None and not tourism_1.empty:
+            parts.append(self._tourism_features(tourism_1))
+        if tourism_2 is not None and not tourism_2.empty:
+            parts.append(self._origin_features(tourism_2))
+        if sales_rents is not None and not sales_rents.empty:
+            parts.append(self._price_features(sales_rents))
+        if not parts:
+            return pd.DataFrame()
+
+        features = pd.concat(parts, axis=1)
+        features = features[features.index.notna()]
+        full_range = np.arange(int(features.index.min()), int(features.index.max()) + 1)
+        features = features.reindex(full_range)
+        count_columns = [c for c in features.columns if c.startswith(("Tourists_", "Passengers_Total", "Price_m2_Count_"))]
+        features[count_columns] = features[count_columns].fillna(0)
+        features = features.astype(float)
+
+        # Rolling windows and lags of the base series
+        base_columns = [c for c in features.columns if c.startswith(("Tourists_", "Passengers_Total", "Price_m2_Mean_"))]
+        derived = {}
+        for column in base_columns:
+            for window in self.windows:
+                derived[f"{column}_Roll{window}"] = features[column].rolling(window, min_periods=window).mean()
+            for lag in self.lags:
+                derived[f"{column}_Lag{lag}"] = features[column].shift(lag)
+        features = pd.concat([features, pd.DataFrame(derived, index=features.index)], axis=1)
+
+        features.index.name = 'Month_Index'
+        features = features.reset_index()
+        features['Month_Index'] = features['Month_Index'].astype('int32')
+        year, month = np.divmod(features['Month_Index'] + self.base_year * 12, 12)
+        features.insert(1, 'Period', [f"{y}.{m + 1:02d}" for y, m in zip(year, month)])
+        return features
+
+    @staticmethod
+    def to_array(features: pd.DataFrame) -> np.ndarray:
+        """Returns the numeric feature columns as one C-contiguous float64 matrix (rows = months)."""
+        numeric = features.drop(columns=['Month_Index', 'Period'], errors='ignore')
+        return np.ascontiguousarray(numeric.to_numpy(dtype=np.float64))
@@ -0,0 +1,676 @@
+import argparse
+import ast
+import csv
+import hashlib
+import io
+import re
+import sqlite3
+import time
+import zipfile
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+import requests
+from Checkpoint_Helper import RunCheckpoint
+
+@dataclass
+class Token:
+    kind: str
+    text: str
+    line: int
+
+
+@dataclass
+class CellRange:
+    # Zero-based, inclusive bounds; None means the range is open on that side (whole column/row)
+    first_column: Optional[int]
+    first_row: Optional[int]
+    last_column: Optional[int]
+    last_row: Optional[int]
+
+    @staticmethod
+    def column_index(letters: str) -> int:
+        index = 0
+        for letter in letters:
+            index = index * 26 + ord(letter) - ord('A') + 1
+        return index - 1
+
+    @classmethod
+    def from_cells(cls, first: str, last: Optional[str] = None) -> "CellRange":
+        bounds = []
+        for cell in (first, last or first):
+            match = re.fullmatch(r'([A-Z]+)(\d+)', cell)
+            if match is None:
+                raise ValueError(f"Invalid cell reference '{cell}'")
+            bounds.append((cls.column_index(match.group(1)), int(match.group(2)) - 1))
+        return cls(bounds[0][0], bounds[0][1], bounds[1][0], bounds[1][1])
+
+    def cells(self) -> List[Tuple[int, int]]:
+        # (row, column) pairs in row-major order, the order in which CellWriter assigns its values
+        if None in (self.first_column, self.first_row, self.last_column, self.last_row):
+            raise ValueError("Only bounded cell ranges can be written")
+        return [(row, column) for row in range(self.first_row, self.last_row + 1)
+                for column in range(self.first_column, self.last_column + 1)]
+
+
+@dataclass
+class BlockSpec:
+    name: str
+    block_type: str
+    properties: Dict[str, Any]
+
+
+@dataclass
+class ConstraintSpec:
+    name: str
+    constraint_type: str  # e.g. "RegexConstraint", or "Expression" for "constraint X on <type>: <expression>;"
+    properties: Dict[str, Any]
+
+
+@dataclass
+class ValueTypeSpec:
+    name: str
+    base: str
+    constraints: List[str]
+
+
+@dataclass
+class TransformSpec:
+    name: str
+    inputs: List[Tuple[str, str]]
+    output: Tuple[str, str]
+    expression: Any  # compiled code object
+
+
+@dataclass
+class ValueType:
+    name: str
+    primitive: str
+    constraints: List[Callable[[Any], bool]] = field(default_factory=list)
+
+    def check(self, value: Any) -> Any:
+        if not all(constraint(value) for constraint in self.constraints):
+            raise ValueError(f"Value {value!r} violates a constraint of '{self.name}'")
+        return value
+
+    def parse(self, text: str) -> Any:
+        # Raises ValueError for values that are not of this type
+        return self.check(PRIMITIVE_PARSERS[self.primitive](text))
+
+    @property
+    def sqlite_type(self) -> str:
+        return SQLITE_TYPES[self.primitive]
+
+
+def _parse_integer(text: str) -> int:
+    text = text.strip()
+    if not re.fullmatch(r'[+-]?\d+', text):
+        raise ValueError(f"'{text}' is not an integer")
+    return int(text)
+
+
+def _parse_decimal(text: str) -> float:
+    text = text.strip()
+    if ',' in text and '.' not in text:
+        text = text.replace(',', '.')
+    if not re.fullmatch(r'[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?', text):
+        raise ValueError(f"'{text}' is not a decimal")
+    return float(text)
+
+
+def _parse_boolean(text: str) -> bool:
+    lowered = text.strip().lower()
+    if lowered not in ('true', 'false'):
+        raise ValueError(f"'{text}' is not a boolean")
+    return lowered == 'true'
+
+
+PRIMITIVE_PARSERS: Dict[str, Callable[[str], Any]] = {
+    "text": str, "integer": _parse_integer, "decimal": _parse_decimal, "boolean": _parse_boolean}
+PRIMITIVE_CASTS: Dict[str, Callable[[Any], Any]] = {"text": str, "integer": int, "decimal": float, "boolean": bool}
+SQLITE_TYPES = {"text": "TEXT", "integer": "INTEGER", "decimal": "REAL", "boolean": "BOOLEAN"}
+
+
+@dataclass
+class JayveePipeline:
+    name: str
+    pipes: List[List[str]] = field(default_factory=list)
+    blocks: Dict[str, BlockSpec] = field(default_factory=dict)
+    constraints: Dict[str, ConstraintSpec] = field(default_factory=dict)
+    valuetypes: Dict[str, ValueTypeSpec] = field(default_factory=dict)
+    transforms: Dict[str, TransformSpec] = field(default_factory=dict)
+
+    def paths(self) -> List[List[str]]:
+        """
+        Returns every source -> sink path of the block graph. Pipes may share blocks (e.g. one
+        extractor feeding two loaders) or be split over several statements; every block has one input.
+        """
+        inputs, consumers, order = {}, set(), []
+        for pipe in self.pipes:
+            for block in pipe:
+                if block not in order:
+                    order.append(block)
+            for source, target in zip(pipe, pipe[1:]):
+                inputs[target] = source
+                consumers.add(source)
+        paths = []
+        for sink in (block for block in order if block not in consumers):
+            path = [sink]
+            while path[-1] in inputs:
+                path.append(inputs[path[-1]])
+            paths.append(path[::-1])
+        return paths
+
+    def constraint(self, name: str) -> Callable[[Any], bool]:
+        if name not in self.constraints:
+            raise ValueError(f"Unknown constraint '{name}' in pipeline '{self.name}'")
+        spec = self.constraints[name]
+        props = spec.properties
+        if spec.constraint_type == "RegexConstraint":
+            regex = props["regex"]
+            return lambda value: regex.search(str(value)) is not None
+        if spec.constraint_type == "RangeConstraint":
+            lower, upper = props.get("lowerBound", float('-inf')), props.get("upperBound", float('inf'))
+            lower_inclusive, upper_inclusive = props.get("lowerBoundInclusive", True), props.get("upperBoundInclusive", True)
+            return lambda value: ((lower <= value if lower_inclusive else lower < value)
+                                  and (value <= upper if upper_inclusive else value < upper))
+        if spec.constraint_type == "AllowlistConstraint":
+            allowed = set(props["allowlist"])
+            return lambda value: value in allowed
+        if spec.constraint_type == "DenylistConstraint":
+            denied = set(props["denylist"])
+            return lambda value: value not in denied
+        if spec.constraint_type == "LengthConstraint":
+            min_length, max_length = props.get("minLength", 0), props.get("maxLength", float('inf'))
+            return lambda value: min_length <= len(value) <= max_length
+        if spec.constraint_type == "Expression":
+            code = props["expression"]
+            return lambda value: bool(eval(code, {"__builtins__": {}}, {"value": value}))
+        raise ValueError(f"Unsupported constraint type '{spec.constraint_type}' of '{name}'")
+
+    def value_type(self, name: str) -> ValueType:
+        if name in PRIMITIVE_PARSERS:
+            return ValueType(name, name)
+        if name not in self.valuetypes:
+            raise ValueError(f"Unknown value type '{name}' in pipeline '{self.name}'")
+        spec = self.valuetypes[name]
+        base = self.value_type(spec.base)
+        return ValueType(name, base.primitive, base.constraints + [self.constraint(c) for c in spec.constraints])
+
+
+class JayveeParser:
+    """
+    This class parses the subset of the Jayvee language used by the exercises: pipes (A -> B -> C;),
+    blocks with their properties, typed constraints (e.g. RegexConstraint, RangeConstraint) and
+    expression constraints ("constraint X on decimal: value >= 0;"), value types and transforms.
+    Definitions outside of a pipeline are visible in every pipeline of the file. Regex literals are
+    only recognised after "regex:", so a division inside an expression is not mistaken for one.
+    """
+    TOKEN = re.compile(r'''
+        (?P<space>\s+)
+        |(?P<comment>//[^\n]*|/\*.*?\*/)
+        |(?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+        |(?P<number>\d+(?:\.\d+)?)
+        |(?P<name>[A-Za-z_]\w*)
+        |(?P<op>->|>=|<=|==|!=|[{}\[\]();:,<>+\-*/%])
+    ''', re.VERBOSE | re.DOTALL)
+    REGEX_LITERAL = re.compile(r'/((?:\\.|[^/\\\n])+)/([a-z]*)')
+    # Tokens allowed in constraint and transform expressions besides numbers and the bound variables
+    EXPRESSION_OPERATORS = {'(', ')', '+', '-', '*', '/', '%', '<', '>', '<=', '>=', '==', '!=', 'and', 'or', 'not'}
+
+    def __init__(self, source: str):
+        self.tokens = self._tokenize(source)
+        self.pos = 0
+
+    @classmethod
+    def parse_file(cls, path: Path) -> List[JayveePipeline]:
+        return cls(Path(path).read_text(encoding='utf-8')).parse()
+
+    def _tokenize(self, source: str) -> List[Token]:
+        tokens, pos, line = [], 0, 1
+        while pos < len(source):
+            regex_expected = len(tokens) >= 2 and tokens[-2].text == 'regex' and tokens[-1].text == ':'
+            match = self.REGEX_LITERAL.match(source, pos) if regex_expected else None
+            kind = 'regex'
+            if match is None:
+                match = self.TOKEN.match(source, pos)
+                if match is None:
+                    raise ValueError(f"Unexpected character {source[pos]!r} on line {line}")
+                kind = match.lastgroup
+            if kind not in ('space', 'comment'):
+                tokens.append(Token(kind, match.group(), line))
+            line += match.group().count('\n')
+            pos = match.end()
+        return tokens
+
+    def _peek(self, offset: int = 0) -> Optional[Token]:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def _next(self) -> Token:
+        token = self._peek()
+        if token is None:
+            raise ValueError("Unexpected end of file")
+        self.pos += 1
+        return token
+
+    def _expect(self, text: Optional[str] = None, kind: Optional[str] = None) -> Token:
+        token = self._next()
+        if (text is not None and token.text != text) or (kind is not None and token.kind != kind):
+            raise ValueError(f"Expected {text or kind} but found '{token.text}' on line {token.line}")
+        return token
+
+    def _accept(self, text: str) -> bool:
+        token = self._peek()
+        if token is not None and token.text == text:
+            self.pos += 1
+            return True
+        return False
+
+    def parse(self) -> List[JayveePipeline]:
+        shared = JayveePipeline("<file>")
+        pipelines = []
+        while self._peek() is not None:
+            if self._accept('pipeline'):
+                name = self._expect(kind='name').text
+                pipeline = JayveePipeline(name, constraints=dict(shared.constraints),
+                                          valuetypes=dict(shared.valuetypes), transforms=dict(shared.transforms))
+                self._expect('{')
+                while not self._accept('}'):
+                    self._parse_element(pipeline)
+                pipelines.append(pipeline)
+            else:
+                self._parse_element(shared)
+        return pipelines
+
+    def _parse_element(self, pipeline: JayveePipeline) -> None:
+        token = self._next()
+        if token.text == 'block':
+            name = self._expect(kind='name').text
+            self._expect('oftype')
+            block_type = self._expect(kind='name').text
+            pipeline.blocks[name] = BlockSpec(name, block_type, self._parse_properties())
+        elif token.text == 'constraint':
+            name = self._expect(kind='name').text
+            if self._accept('on'):
+                value_type = self._expect(kind='name').text
+                self._expect(':')
+                expression = self._parse_expression({'value'})
+                pipeline.constraints[name] = ConstraintSpec(name, "Expression", {"on": value_type, "expression": expression})
+            else:
+                self._expect('oftype')
+                constraint_type = self._expect(kind='name').text
+                pipeline.constraints[name] = ConstraintSpec(name, constraint_type, self._parse_properties())
+        elif token.text == 'valuetype':
+            name = self._expect(kind='name').text
+            self._expect('oftype')
+            base = self._expect(kind='name').text
+            properties = self._parse_properties()
+            pipeline.valuetypes[name] = ValueTypeSpec(name, base, properties.get("constraints", []))
+        elif token.text == 'transform':
+            name = self._expect(kind='name').text
+            pipeline.transforms[name] = self._parse_transform(name)
+        elif token.kind == 'name':
+            pipe = [token.text]
+            while self._accept('->'):
+                pipe.append(self._expect(kind='name').text)
+            self._expect(';')
+            pipeline.pipes.append(pipe)
+        else:
+            raise ValueError(f"Unexpected '{token.text}' on line {token.line}")
+
+    def _parse_transform(self, name: str) -> TransformSpec:
+        inputs, output, expression = [], None, None
+        self._expect('{')
+        while not self._accept('}'):
+            token = self._expect(kind='name')
+            if token.text in ('from', 'to'):
+                port_name = self._expect(kind='name').text
+                self._expect('oftype')
+                port = (port_name, self._expect(kind='name').text)
+                self._expect(';')
+                if token.text == 'from':
+                    inputs.append(port)
+                else:
+                    output = port
+            else:
+                self._expect(':')
+                expression = self._parse_expression({port_name for port_name, _ in inputs})
+        if output is None or expression is None:
+            raise ValueError(f"Transform '{name}' needs a 'to' port and an output assignment")
+        return TransformSpec(name, inputs, output, expression)
+
+    def _parse_expression(self, variables: set) -> Any:
+        # Translates the expression up to the next ';' into Python and compiles it
+        parts, start = [], self._peek()
+        while not self._accept(';'):
+            token = self._next()
+            if token.kind == 'number' or token.text in variables or token.text in self.EXPRESSION_OPERATORS:
+                parts.append(token.text)
+            elif token.text in ('true', 'false'):
+                parts.append(token.text.capitalize())
+            else:
+                raise ValueError(f"Unsupported expression token '{token.text}' on line {token.line}")
+        return compile(" ".join(parts), f"<jayvee line {start.line}>", "eval")
+
+    def _parse_properties(self) -> Dict[str, Any]:
+        properties = {}
+        self._expect('{')
+        while not self._accept('}'):
+            key = self._expect(kind='name').text
+            self._expect(':')
+            properties[key] = self._parse_value()
+            self._expect(';')
+        return properties
+
+    def _parse_value(self) -> Any:
+        token = self._next()
+        if token.kind == 'string':
+            return ast.literal_eval(token.text)
+        if token.kind == 'number':
+            return float(token.text) if '.' in token.text else int(token.text)
+        if token.text == '-':
+            return -self._parse_value()
+        if token.kind == 'regex':
+            pattern, flags = self.REGEX_LITERAL.fullmatch(token.text).groups()
+            return re.compile(pattern, re.IGNORECASE if 'i' in flags else 0)
+        if token.text == '[':
+            items = []
+            while not self._accept(']'):
+                item = self._parse_value()
+                if self._accept('oftype'):
+                    item = (item, self._expect(kind='name').text)
+                items.append(item)
+                if not self._accept(','):
+                    self._expect(']')
+                    break
+            return items
+        if token.text in ('true', 'false'):
+            return token.text == 'true'
+        next_token = self._peek()
+        if token.text == 'cell' and next_token is not None and next_token.kind == 'name':
+            return CellRange.from_cells(self._next().text)
+        if token.text == 'range' and next_token is not None and next_token.kind == 'name':
+            first = self._next().text
+            self._expect(':')
+            return CellRange.from_cells(first, self._expect(kind='name').text)
+        if token.text == 'column' and next_token is not None and next_token.kind == 'name':
+            column = CellRange.column_index(self._next().text)
+            return CellRange(column, None, column, None)
+        if token.text == 'row' and next_token is not None and next_token.kind == 'number':
+            row = int(self._next().text) - 1
+            return CellRange(None, row, None, row)
+        if token.kind == 'name':
+            # Reference to a constraint, value type or transform
+            return token.text
+        raise ValueError(f"Unexpected value '{token.text}' on line {token.line}")
+
+
+@dataclass
+class JayveeFile:
+    name: str
+    open: Callable[[], io.BufferedIOBase]
+
+
+@dataclass
+class JayveeTable:
+    columns: List[Tuple[str, ValueType]]
+    rows: Iterator[tuple]
+
+
+class JayveeExecutor:
+    """
+    This class runs parsed Jayvee pipelines in-process, without the Jayvee toolchain. Every path of
+    a pipeline is a chain of Python generators: text files are streams of lines, sheets are streams
+    of rows of text, tables are streams of typed tuples and the SQLiteLoader inserts them in batches
+    with executemany. Apart from the downloaded file itself, memory is therefore bounded by the
+    batch size instead of by the size of every intermediate block output. Rows with values that do
+    not match their value type are dropped, like Jayvee does.
+    Downloads are stored in a RunCheckpoint cache directory (the store of the DAG runner), so that a
+    second run, or a second path starting at the same extractor, does not download the file again.
+    """
+    def __init__(self, output_dir: Path = Path('.'), cache_dir: Optional[Path] = Path('../data') / 'cache' / 'jayvee',
+                 batch_size: int = 5000, refresh: bool = False):
+        self.output_dir = Path(output_dir)
+        self.cache = RunCheckpoint(cache_dir) if cache_dir is not None else None
+        self.batch_size = batch_size
+        self.refresh = refresh
+        self._payloads: Dict[str, bytes] = {}
+        self.handlers = {
+            "HttpExtractor": self._http_extractor,
+            "ArchiveInterpreter": self._archive_interpreter,
+            "FilePicker": self._file_picker,
+            "TextFileInterpreter": self._text_file_interpreter,
+            "CSVInterpreter": self._csv_interpreter,
+            "XLSXInterpreter": self._xlsx_interpreter,
+            "SheetPicker": self._sheet_picker,
+            "CellWriter": self._cell_writer,
+            "CellRangeSelector": self._cell_range_selector,
+            "TableInterpreter": self._table_interpreter,
+            "TableTransformer": self._table_transformer,
+            "SQLiteLoader": self._sqlite_loader,
+        }
+
+    def _download(self, url: str, retries: int = 3, timeout: float = 60) -> bytes:
+        for attempt in range(retries):
+            try:
+                response = requests.get(url, timeout=timeout)
+                response.raise_for_status()
+                return response.content
+            except requests.exceptions.RequestException as e:
+                print(f"Attempt {attempt + 1}/{retries} failed for URL: {url} | Error: {e}")
+                if attempt == retries - 1:
+                    raise
+
+    def fetch(self, url: str) -> bytes:
+        if url in self._payloads:
+            return self._payloads[url]
+        key = f"http:{hashlib.sha1(url.encode()).hexdigest()[:16]}"
+        if self.cache is not None and not self.refresh and self.cache.has(key):
+            print(f"[INFO] Using cached download of {url}")
+            payload = self.cache.load(key)
+        else:
+            start = time.perf_counter()
+            payload = self._download(url)
+            if self.cache is not None:
+                self.cache.save(key, payload, time.perf_counter() - start)
+        self._payloads[url] = payload
+        return payload
+
+    def _http_extractor(self, pipeline: JayveePipeline, block: BlockSpec, _) -> JayveeFile:
+        url = block.properties["url"]
+        payload = self.fetch(url)
+        return JayveeFile(Path(urlsplit(url).path).name, lambda: io.BytesIO(payload))
+
+    def _archive_interpreter(self, pipeline: JayveePipeline, block: BlockSpec, file: JayveeFile) -> zipfile.ZipFile:
+        archive_type = block.properties.get("archiveType", "zip")
+        if archive_type != "zip":
+            raise ValueError(f"{block.name}: unsupported archive type '{archive_type}'")
+        return zipfile.ZipFile(file.open())
+
+    def _file_picker(self, pipeline: JayveePipeline, block: BlockSpec, archive: zipfile.ZipFile) -> JayveeFile:
+        member = block.properties["path"].lstrip('/')
+        if member not in archive.namelist():
+            raise ValueError(f"{block.name}: '{member}' is not in the archive")
+        return JayveeFile(member, lambda: archive.open(member))
+
+    def _text_file_interpreter(self, pipeline: JayveePipeline, block: BlockSpec, file: JayveeFile) -> Iterator[str]:
+        encoding = block.properties.get("encoding", "utf-8")
+        # utf-8-sig drops a byte order mark that would otherwise end up in the first header name
+        return io.TextIOWrapper(file.open(), encoding="utf-8-sig" if encoding.lower() == "utf-8" else encoding, newline='')
+
+    def _csv_interpreter(self, pipeline: JayveePipeline, block: BlockSpec, lines: Iterator[str]) -> Iterator[List[str]]:
+        enclosing = block.properties.get("enclosing", '"')
+        escape = block.properties.get("enclosingEscape", enclosing)
+        return csv.reader(lines, delimiter=block.properties.get("delimiter", ","), quotechar=enclosing or None,
+                          doublequote=escape == enclosing, escapechar=None if escape == enclosing else escape)
+
+    def _xlsx_interpreter(self, pipeline: JayveePipeline, block: BlockSpec, file: JayveeFile):
+        try:
+            import openpyxl
+        except ImportError as e:
+            raise RuntimeError(f"{block.name}: reading XLSX files requires openpyxl") from e
+        return openpyxl.load_workbook(file.open(), read_only=True, data_only=True)
+
+    @staticmethod
+    def _cell_text(value: Any) -> str:
+        if value is None:
+            return ""
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    def _sheet_picker(self, pipeline: JayveePipeline, block: BlockSpec, workbook) -> Iterator[List[str]]:
+        sheet = block.properties["sheetName"]
+        if sheet not in workbook.sheetnames:
+            raise ValueError(f"{block.name}: sheet '{sheet}' is not in the workbook")
+        return ([self._cell_text(value) for value in row] for row in workbook[sheet].iter_rows(values_only=True))
+
+    def _cell_writer(self, pipeline: JayveePipeline, block: BlockSpec, rows: Iterator[List[str]]) -> Iterator[List[str]]:
+        values = block.properties["write"]
+        cells = block.properties["at"].cells()
+        if len(values) != len(cells):
+            raise ValueError(f"{block.name}: {len(values)} values for {len(cells)} cells")
+        writes: Dict[int, Dict[int, str]] = {}
+        for (row, column), value in zip(cells, values):
+            writes.setdefault(row, {})[column] = value
+
+        def written():
+            for index, row in enumerate(rows):
+                if index in writes:
+                    row = list(row) + [""] * (max(writes[index]) + 1 - len(row))
+                    for column, value in writes[index].items():
+                        row[column] = value
+                yield row
+        return written()
+
+    def _cell_range_selector(self, pipeline: JayveePipeline, block: BlockSpec, rows: Iterator[List[str]]) -> Iterator[List[str]]:
+        selection = block.properties["select"]
+        first_row = selection.first_row or 0
+        last_row = None if selection.last_row is None else selection.last_row + 1
+        first_column = selection.first_column or 0
+        last_column = None if selection.last_column is None else selection.last_column + 1
+        return (row[first_column:last_column] for row in islice(rows, first_row, last_row))
+
+    def _table_interpreter(self, pipeline: JayveePipeline, block: BlockSpec, rows: Iterator[List[str]]) -> JayveeTable:
+        columns = [(name, pipeline.value_type(type_name)) for name, type_name in block.properties["columns"]]
+        rows = iter(rows)
+        if block.properties.get("header", True):
+            header = next(rows, [])
+            missing = [name for name, _ in columns if name not in header]
+            if missing:
+                raise ValueError(f"{block.name}: columns {missing} are not in the header")
+            indices = [header.index(name) for name, _ in columns]
+        else:
+            indices = list(range(len(columns)))
+
+        def typed():
+            dropped = 0
+            for row in rows:
+                try:
+                    yield tuple(value_type.parse(row[index] if index < len(row) else "")
+                                for index, (_, value_type) in zip(indices, columns))
+                except ValueError:
+                    dropped += 1
+            if dropped:
+                print(f"[INFO] {block.name}: dropped {dropped} invalid rows")
+        return JayveeTable(columns, typed())
+
+    def _table_transformer(self, pipeline: JayveePipeline, block: BlockSpec, table: JayveeTable) -> JayveeTable:
+        transform = pipeline.transforms.get(block.properties["uses"])
+        if transform is None:
+            raise ValueError(f"{block.name}: unknown transform '{block.properties['uses']}'")
+        names = [name for name, _ in table.columns]
+        missing = [name for name in block.properties["inputColumns"] if name not in names]
+        if missing:
+            raise ValueError(f"{block.name}: columns {missing} are not in the table")
+        indices = [names.index(name) for name in block.properties["inputColumns"]]
+        variables = [name for name, _ in transform.inputs]
+        output, output_type = block.properties["outputColumn"], pipeline.value_type(transform.output[1])
+        position = names.index(output) if output in names else len(names)
+        columns = table.columns[:position] + [(output, output_type)] + table.columns[position + 1:]
+        cast = PRIMITIVE_CASTS[output_type.primitive]
+
+        def transformed():
+            dropped = 0
+            for row in table.rows:
+                try:
+                    value = eval(transform.expression, {"__builtins__": {}}, dict(zip(variables, (row[i] for i in indices))))
+                    value = output_type.check(cast(value))
+                except (ValueError, TypeError, ArithmeticError):
+                    dropped += 1
+                    continue
+                yield row[:position] + (value,) + row[position + 1:]
+            if dropped:
+                print(f"[INFO] {block.name}: dropped {dropped} rows with invalid results")
+        return JayveeTable(columns, transformed())
+
+    def _sqlite_loader(self, pipeline: JayveePipeline, block: BlockSpec, table: JayveeTable) -> int:
+        path = self.output_dir / block.properties["file"]
+        name = block.properties["table"]
+        definition = ", ".join(f'"{column}" {value_type.sqlite_type}' for column, value_type in table.columns)
+        insert = f'INSERT INTO "{name}" VALUES ({", ".join("?" * len(table.columns))})'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path)
+        loaded = 0
+        try:
+            if block.properties.get("dropTable", True):
+                conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+            conn.execute(f'CREATE TABLE IF NOT EXISTS "{name}" ({definition})')
+            while batch := list(islice(table.rows, self.batch_size)):
+                conn.executemany(insert, batch)
+                loaded += len(batch)
+            conn.commit()
+        finally:
+            conn.close()
+        print(f"[SUCCESS] Loaded {loaded} rows into table '{name}' of {path}")
+        return loaded
+
+    def run(self, pipeline: JayveePipeline) -> Dict[str, int]:
+        """
+        Executes every source -> sink path of the pipeline.
+
+        Returns:
+            Dict[str, int]: Number of rows loaded by every SQLiteLoader, keyed by block name.
+        """
+        start = time.perf_counter()
+        loaded = {}
+        for path in pipeline.paths():
+            value = None
+            for name in path:
+                block = pipeline.blocks.get(name)
+                if block is None:
+                    raise ValueError(f"Pipeline '{pipeline.name}' uses the undefined block '{name}'")
+                if block.block_type not in self.handlers:
+                    raise ValueError(f"{name}: unsupported block type '{block.block_type}' "
+                                     f"(supported: {', '.join(self.handlers)})")
+                value = self.handlers[block.block_type](pipeline, block, value)
+            loaded[path[-1]] = value
+        print(f"[INFO] Pipeline '{pipeline.name}' finished in {time.perf_counter() - start:.2f}s")
+        return loaded
+
+    def run_file(self, path: Path) -> Dict[str, int]:
+        loaded = {}
+        for pipeline in JayveeParser.parse_file(path):
+            loaded.update(self.run(pipeline))
+        return loaded
+
+
+if __name__ == '__main__':
+    exercises = sorted((Path(__file__).resolve().parent.parent / 'exercises').glob('*.jv'))
+    parser = argparse.ArgumentParser(description="Runs Jayvee pipelines (.jv) in-process")
+    parser.add_argument('files', nargs='*', type=Path, default=exercises, help="Jayvee files (default: all exercises)")
+    parser.add_argument('--output-dir', type=Path, default=Path('.'), help="Directory the SQLiteLoader files are relative to")
+    parser.add_argument('--cache-dir', type=Path, default=Path('../data') / 'cache' / 'jayvee')
+    parser.add_argument('--no-cache', action='store_true', help="Do not store or reuse downloads")
+    parser.add_argument('--refresh', action='store_true', help="Download again and update the cache")
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    executor = JayveeExecutor(args.output_dir, None if args.no_cache else args.cache_dir,
+                              batch_size=args.batch_size, refresh=args.refresh)
+    for jv_file in args.files:
+        print(f"[INFO] Running {jv_file.name}...")
+        executor.run_file(jv_file)
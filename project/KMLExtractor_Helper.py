@@ -1,9 +1,19 @@
 import xml.etree.ElementTree as ET
 import pandas as pd
+import pyarrow as pa
 import requests
+import asyncio
+import aiohttp
 import re
-from typing import Dict, List
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
+from NumericParser_Helper import NumericColumnParser
+from Profiling_Helper import profile_call, profiled
 
 @dataclass
 class KMLFieldMapping:
@@ -16,38 +26,160 @@ class KMLDataExtractor:
     perform transformations on them based on mappings defined for each type of dataset (input as a dictionary),
     convert them into CSV files and finally they are combined to generate a CSV file out of 22 datasets
      (11 datasets for rent offers from 2011-2021 and 11 datasets for sale offers from 2011-2021)
+    With arrow=True the per-year frames are combined as Arrow tables (chunked, without copying)
+    and returned as pyarrow-backed DataFrames.
+    process_multiple_years parses the layers on a process pool (parse_processes, all CPUs by default):
+    layers larger than chunk_bytes are split into chunks of whole placemarks, and all chunks are queued
+    largest first, so the pool stays busy until the last small chunk instead of waiting on the largest
+    year. The chunks are reassembled per year, in year order, before the numeric columns are parsed.
+    While profiling is enabled every chunk is profiled in its worker, and the profiles of the chunks of
+    a year are merged into that year's 'process_year_<year>' profile (chunk parsing only; the numeric
+    columns are parsed in this process, within the enclosing stage).
     """
-    def __init__(self, year_mappings: Dict[int, KMLFieldMapping]):
+    output_columns = [
+        "Fecha", "Investigacion", "Predio", "Estado", "Barrio", "Estrato",
+        "Area Privada", "Area Lote", "Valor Comercial", "Valor M2",
+        "Longitude", "Latitude"
+    ]
+    numeric_columns = ["Area Privada", "Area Lote", "Valor Comercial", "Valor M2"]
+    # Keys of self.metrics[year]; the N/A rates are only known for years that produced rows
+    metric_columns = ["Year", "Placemarks", "Without_Point", "Rows", "Parse_Seconds", "Rows_per_Second",
+                      "Payload_Bytes"] + [f"NA_Rate_{column.replace(' ', '_')}" for column in output_columns[:-2]]
+
+    def __init__(self, year_mappings: Dict[int, KMLFieldMapping], arrow: bool = False,
+                 parse_processes: Optional[int] = None, chunk_bytes: int = 2_000_000):
         self.year_mappings = year_mappings
+        self.arrow = arrow
+        self.parse_processes = parse_processes
+        # 0 disables splitting: one task per year
+        self.chunk_bytes = chunk_bytes
+        self.numeric_parser = NumericColumnParser()
+        self.unparsed_values: Dict[Tuple[int, str], int] = {}
+        # Parse-quality and throughput metrics of the last processing of each year
+        self.metrics: Dict[int, Dict[str, float]] = {}
+        # Task count, wall time and tail latency of the last parallel parse stage
+        self.schedule: Dict[str, float] = {}
+        # Set by Pipeline when profiling is enabled
+        self.profiler = None
+
+    def fetch_kml(self, url: str, timeout: float = 60) -> bytes:
+        # Returns the raw KML payload; errors are propagated to the caller
+        response = requests.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.content
 
-    def download_kml(self, url: str) -> ET.Element:
+    def download_kml(self, url: str, timeout: float = 60) -> ET.Element:
         try:
-            response = requests.get(url)
-            response.raise_for_status()
+            content = self.fetch_kml(url, timeout=timeout)
             #print(f"Successfully downloaded KML file from {url}")
             #print(f"Successfully downloaded KML file")
-            return ET.fromstring(response.content)
+            return ET.fromstring(content)
         except requests.RequestException as e:
             print(f"Failed to download KML from {url}: {e}")
             return None
 
+    namespace = {'kml': 'http://www.opengis.net/kml/2.2'}
+
+    def _placemark_row(self, placemark: ET.Element) -> List:
+        # Returns [name, description, latitude, longitude], or None for placemarks without a Point
+        name = placemark.find("kml:name", self.namespace)
+        description = placemark.find("kml:description", self.namespace)
+        point = placemark.find(".//kml:Point/kml:coordinates", self.namespace)
+        name = name.text if name is not None else "N/A"
+        description = description.text if description is not None else "N/A"
+        if point is None:
+            return None
+        coords = point.text.strip().split(",")
+        longitude, latitude = coords[0], coords[1]
+        return [name, description, latitude, longitude]
+
     def extract_basic_data(self, root: ET.Element) -> List[List]:
+        return self._extract_rows(root)[0]
+
+    def _extract_rows(self, root: ET.Element) -> Tuple[List[List], int]:
+        # Returns the rows of all placemarks with a Point and the total number of placemarks
         if root is None:
             print("Error: KML root is None. Skipping extraction.")
-            return []
-        namespace = {'kml': 'http://www.opengis.net/kml/2.2'}
+            return [], 0
         data = []
-        for placemark in root.findall(".//kml:Placemark", namespace):
-            name = placemark.find("kml:name", namespace)
-            description = placemark.find("kml:description", namespace)
-            point = placemark.find(".//kml:Point/kml:coordinates", namespace)
-            name = name.text if name is not None else "N/A"
-            description = description.text if description is not None else "N/A"
-            if point is not None:
-                coords = point.text.strip().split(",")
-                longitude, latitude = coords[0], coords[1]
-                data.append([name, description, latitude, longitude])
-        return data
+        placemarks = root.findall(".//kml:Placemark", self.namespace)
+        for placemark in placemarks:
+            row = self._placemark_row(placemark)
+            if row is not None:
+                data.append(row)
+        return data, len(placemarks)
+
+    def iter_placemarks(self, source: str, timeout: float = 60) -> Iterator[List]:
+        """
+        Streams the placemark rows of a KML layer without building the whole tree. source is a URL or
+        a local file (e.g. a raw payload checkpoint); the download stops as soon as iteration stops.
+        """
+        placemark_tag = f"{{{self.namespace['kml']}}}Placemark"
+        response = None
+        if str(source).startswith(("http://", "https://")):
+            response = requests.get(source, stream=True, timeout=timeout)
+            response.raise_for_status()
+            response.raw.decode_content = True
+            stream = response.raw
+        else:
+            stream = open(Path(source), 'rb')
+        try:
+            for _, element in ET.iterparse(stream, events=("end",)):
+                if element.tag == placemark_tag:
+                    row = self._placemark_row(element)
+                    element.clear()
+                    if row is not None:
+                        yield row
+        finally:
+            stream.close()
+            if response is not None:
+                response.close()
+
+    def preview(self, year: int, source: str, rows: int = 100, reservoir: bool = False, seed: int = 0) -> pd.DataFrame:
+        """
+        Applies the mapping of one year to the first rows placemarks of source (or to a reservoir
+        sample of that size over the whole layer) and prints how often each field was found, i.e.
+        did not fall back to "N/A", together with the parse timing. Meant for iterating on KMLMappings
+        without running the pipeline.
+        """
+        mapping = self.year_mappings.get(year)
+        if mapping is None:
+            raise KeyError(f"No mapping found for year {year}")
+
+        start = time.perf_counter()
+        if reservoir:
+            rng = random.Random(seed)
+            sample = []
+            for seen, row in enumerate(self.iter_placemarks(source)):
+                if seen < rows:
+                    sample.append(row)
+                else:
+                    slot = rng.randint(0, seen)
+                    if slot < rows:
+                        sample[slot] = row
+        else:
+            sample = []
+            for row in self.iter_placemarks(source):
+                sample.append(row)
+                if len(sample) >= rows:
+                    break
+        read_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parsed = [self.parse_description(row[1], mapping.patterns) for row in sample]
+        parse_time = time.perf_counter() - start
+
+        result = pd.DataFrame(parsed, columns=list(mapping.patterns))
+        print(f"Preview of year {year}: {len(sample)} placemarks ({'reservoir sample' if reservoir else 'first rows'})")
+        print(f"--Read: {read_time:.3f}s | Parse: {parse_time * 1000:.1f}ms "
+              f"({len(sample) / parse_time if parse_time else float('inf'):.0f} rows/s)")
+        for field in mapping.patterns:
+            # Placemarks without a description have no value at all (NaN), which is not a match either
+            hits = int((result[field].notna() & (result[field] != "N/A")).sum()) if len(result) else 0
+            rate = hits / len(result) if len(result) else 0.0
+            flag = "" if rate >= 0.9 else "  <-- check pattern"
+            print(f"--{field:<20} {rate:6.1%} ({hits}/{len(result)}){flag}")
+        return result
 
     def parse_description(self, description: str, patterns: Dict[str, str]) -> Dict[str, str]:
         result = {}
@@ -64,22 +196,74 @@ class KMLDataExtractor:
                     result[key] = "N/A"
         return result
 
+    async def fetch_kml_async(self, session: aiohttp.ClientSession, url: str) -> bytes:
+        # Errors are propagated so that the caller can record a per-source status
+        async with session.get(url) as response:
+            response.raise_for_status()
+            return await response.read()
+
+    @profiled("process_year_{0}")
     def process_year(self, year: int, url: str) -> pd.DataFrame:
         #print(f"Processing year {year} with URL: {url}")
         print(f"Processing year {year} dataset:")
-        root = self.download_kml(url)
-        basic_data = self.extract_basic_data(root)
+        try:
+            payload = self.fetch_kml(url)
+        except requests.RequestException as e:
+            print(f"Failed to download KML from {url}: {e}")
+            payload = None
+        return self.process_payload(year, payload)
+
+    def process_payload(self, year: int, payload: bytes) -> pd.DataFrame:
+        root = ET.fromstring(payload) if payload else None
+        return self.process_root(year, root, payload_size=len(payload) if payload else 0)
+
+    async def process_year_async(self, year: int, url: str, session: aiohttp.ClientSession,
+                                 semaphore: asyncio.Semaphore, deadline: float) -> Tuple[pd.DataFrame, str]:
+        """
+        Async counterpart of process_year. The download waits for a slot of the shared semaphore and
+        the source (download + parse) is cancelled once it exceeds the deadline in seconds, counted
+        from the moment the slot is acquired. Returns the DataFrame together with a status: "ok",
+        "empty", "timeout" or "failed: <error>".
+        """
+        loop = asyncio.get_running_loop()
+        print(f"Processing year {year} dataset (async):")
+        try:
+            async with semaphore:
+                started = loop.time()
+                payload = await asyncio.wait_for(self.fetch_kml_async(session, url), timeout=deadline)
+            # Parsing is CPU bound; keep it off the event loop
+            df = await asyncio.wait_for(asyncio.to_thread(self.process_payload, year, payload),
+                                        timeout=max(deadline - (loop.time() - started), 0))
+        except asyncio.TimeoutError:
+            print(f"Deadline of {deadline}s exceeded for year {year}. Skipping.")
+            return pd.DataFrame(), "timeout"
+        except (aiohttp.ClientError, ET.ParseError) as e:
+            print(f"Failed to download KML from {url}: {e}")
+            return pd.DataFrame(), f"failed: {e}"
+        return df, "ok" if not df.empty else "empty"
+
+    def process_root(self, year: int, root: ET.Element, payload_size: int = 0) -> pd.DataFrame:
+        start = time.perf_counter()
+        basic_data, placemark_count = self._extract_rows(root)
+        self.metrics[year] = {
+            "Year": year, "Placemarks": placemark_count, "Without_Point": placemark_count - len(basic_data),
+            "Rows": 0, "Parse_Seconds": 0.0, "Rows_per_Second": 0.0, "Payload_Bytes": payload_size
+        }
         if not basic_data:
             print(f"No data extracted for year {year}")
             return pd.DataFrame()  # Return empty DataFrame if no data extracted
 
-        df = pd.DataFrame(basic_data, columns=['Name', 'Description', 'Latitude', 'Longitude'])
-        
         mapping = self.year_mappings.get(year)
         if mapping is None:
             print(f"No mapping found for year {year}. Skipping.")
             return pd.DataFrame()  # Return empty DataFrame if mapping is missing
 
+        final_df = self._mapped_rows(mapping, basic_data)
+        return self._finish_year(year, final_df, time.perf_counter() - start)
+
+    def _mapped_rows(self, mapping: KMLFieldMapping, basic_data: List[List]) -> pd.DataFrame:
+        # Applies the year's patterns to the placemark rows; the values are still strings
+        df = pd.DataFrame(basic_data, columns=['Name', 'Description', 'Latitude', 'Longitude'])
         processed_data = []
         for _, row in df.iterrows():
             desc_info = self.parse_description(row['Description'], mapping.patterns)
@@ -100,31 +284,230 @@ class KMLDataExtractor:
         })
         
         # Retain only the columns of interest
-        final_df = final_df.reindex(columns=[
-            "Fecha", "Investigacion", "Predio", "Estado", "Barrio", "Estrato",
-            "Area Privada", "Area Lote", "Valor Comercial", "Valor M2",
-            "Longitude", "Latitude"
-        ])
+        return final_df.reindex(columns=self.output_columns)
+
+    def _finish_year(self, year: int, final_df: pd.DataFrame, parse_seconds: float) -> pd.DataFrame:
+        # Completes self.metrics[year] and parses the numeric columns of the whole year at once
+        start = time.perf_counter()
+
+        # Share of rows where a field fell back to "N/A" (or is missing from the year's mapping)
+        na_rates = {f"NA_Rate_{column.replace(' ', '_')}": float((final_df[column].isna() | (final_df[column] == "N/A")).mean())
+                    for column in self.output_columns[:-2]}
+
+        # Price and area columns: one number format is inferred per (year, column)
+        for column in self.numeric_columns:
+            parsed, unparsed = self.numeric_parser.parse(final_df[column])
+            if unparsed.any():
+                self.unparsed_values[(year, column)] = int(unparsed.sum())
+                examples = final_df.loc[unparsed, column].head(3).tolist()
+                print(f"[WARNING] {int(unparsed.sum())} unparsable values in '{column}' for year {year}, e.g. {examples}")
+            final_df[column] = parsed
         
+        parse_seconds += time.perf_counter() - start
+        self.metrics[year].update({
+            "Rows": len(final_df),
+            "Parse_Seconds": round(parse_seconds, 4),
+            "Rows_per_Second": round(len(final_df) / parse_seconds, 1) if parse_seconds else 0.0,
+            **na_rates
+        })
+
         #print(f"Processed {len(final_df)} rows for year {year}")
         print(f"[SUCCESS] Processed {len(final_df)} rows")
         return final_df
 
     def process_multiple_years(self, url_dict: Dict[int, str]) -> pd.DataFrame:
         dataframes = []
-        for year, url in url_dict.items():
-            if year in self.year_mappings:
-                df = self.process_year(year, url)
-                if not df.empty:
-                    dataframes.append(df)
-            else:
-                print(f"Year {year} is not supported in year mappings.")
+        if (self.parse_processes or os.cpu_count() or 1) > 1:
+            for year in url_dict:
+                if year not in self.year_mappings:
+                    print(f"Year {year} is not supported in year mappings.")
+            years = [year for year in url_dict if year in self.year_mappings]
+            dataframes = [df for df in self._process_layers(self._download_layers(years, url_dict)) if not df.empty]
+        else:
+            for year, url in url_dict.items():
+                if year in self.year_mappings:
+                    df = self.process_year(year, url)
+                    if not df.empty:
+                        dataframes.append(df)
+                else:
+                    print(f"Year {year} is not supported in year mappings.")
         if not dataframes:
             print("No valid dataframes to concatenate.")
             return pd.DataFrame()  # Return an empty DataFrame if none were processed
-        unified_df = pd.concat(dataframes, ignore_index=True)
+        unified_df = self.concat(dataframes)
         return unified_df
 
+    def _download_layers(self, years: List[int], url_dict: Dict[int, str], workers: int = 8) -> Dict[int, bytes]:
+        # Downloads are I/O bound and run on threads; a failed download leaves the year without payload
+        def _download(year):
+            print(f"Processing year {year} dataset:")
+            try:
+                return self.fetch_kml(url_dict[year])
+            except requests.RequestException as e:
+                print(f"Failed to download KML from {url_dict[year]}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(years, executor.map(_download, years)))
+
+    placemark_pattern = re.compile(rb'<(?:\w+:)?Placemark\b.*?</(?:\w+:)?Placemark\s*>', re.S)
+
+    def placemark_chunks(self, payload: bytes) -> List[bytes]:
+        """
+        Splits a KML payload into standalone KML documents of consecutive placemarks, each about
+        chunk_bytes long. The placemark byte offsets come from one scan over the payload (no tree is
+        built); every chunk repeats the payload's header up to the <kml> tag, so namespaces still apply.
+        A payload of at most chunk_bytes is returned as its only chunk.
+        """
+        if not self.chunk_bytes or len(payload) <= self.chunk_bytes:
+            return [payload]
+        root_tag = re.search(rb'<(?:\w+:)?kml\b[^>]*>', payload)
+        if root_tag is None:
+            return [payload]
+        header, footer = payload[:root_tag.end()], b"</kml>"
+
+        chunks, start, end = [], None, None
+        for match in self.placemark_pattern.finditer(payload, root_tag.end()):
+            if start is not None and match.end() - start > self.chunk_bytes:
+                chunks.append(header + payload[start:end] + footer)
+                start = None
+            if start is None:
+                start = match.start()
+            end = match.end()
+        if start is not None:
+            chunks.append(header + payload[start:end] + footer)
+        return chunks or [payload]
+
+    @staticmethod
+    def _tail_seconds(finished: List[float], workers: int, wall: float) -> float:
+        # Tail latency: from the first worker running out of tasks to the end of the stage. The queue is
+        # empty once the last `workers` tasks are running, so a worker first goes idle when the earliest
+        # of them finishes, finished[-workers]
+        first_idle = finished[-workers] if workers <= len(finished) else wall
+        return wall - first_idle
+
+    def _process_layers(self, payloads: Dict[int, bytes]) -> List[pd.DataFrame]:
+        """
+        Parses the downloaded layers on a process pool and returns one frame per year, in the order of
+        payloads. Idle workers take the next queued task, and tasks are queued largest first, so the
+        parse stage ends with the small chunks. A year whose chunks cannot be parsed is parsed whole.
+        """
+        tasks = [(year, index, chunk) for year, payload in payloads.items() if payload
+                 for index, chunk in enumerate(self.placemark_chunks(payload))]
+        tasks.sort(key=lambda task: len(task[2]), reverse=True)
+        workers = min(self.parse_processes or os.cpu_count() or 1, len(tasks)) or 1
+
+        results: Dict[int, Dict[int, Tuple]] = {year: {} for year in payloads}
+        profiles: Dict[int, List[Tuple]] = {year: [] for year in payloads}
+        profile_mode = self.profiler.mode if self.profiler is not None and self.profiler.enabled else None
+        interval = self.profiler.interval if profile_mode else 0.0
+        failed = set()
+        finished, task_seconds = [], []
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(profile_call, profile_mode, interval, _parse_chunk, self.year_mappings[year], chunk):
+                       (year, index) for year, index, chunk in tasks}
+            for future in as_completed(futures):
+                year, index = futures[future]
+                try:
+                    results[year][index], *profile = future.result()
+                    profiles[year].append(profile)
+                    task_seconds.append(results[year][index][3])
+                except ET.ParseError as e:
+                    print(f"[WARNING] Chunk {index} of year {year} could not be parsed ({e}), parsing the year whole")
+                    failed.add(year)
+                finished.append(time.perf_counter() - start)
+
+        wall = time.perf_counter() - start
+        self.schedule = {
+            "Tasks": len(tasks), "Workers": workers, "Parse_Wall_Seconds": round(wall, 4),
+            "Parse_Tail_Seconds": round(self._tail_seconds(finished, workers, wall), 4),
+            "Largest_Task_Seconds": round(max(task_seconds, default=0.0), 4),
+        }
+        print(f"[INFO] Parsed {len(tasks)} KML tasks on {workers} processes in {wall:.2f}s "
+              f"(tail {self.schedule['Parse_Tail_Seconds']:.2f}s)")
+
+        if profile_mode:
+            for year in payloads:
+                if profiles[year]:
+                    self.profiler.merge(f"process_year_{year}", *zip(*profiles[year]))
+
+        dataframes = []
+        for year, payload in payloads.items():
+            chunks = [results[year][index] for index in sorted(results[year])]
+            if not payload or year in failed:
+                dataframes.append(self.process_payload(year, payload))
+                continue
+            placemark_count = sum(chunk[1] for chunk in chunks)
+            rows = sum(chunk[2] for chunk in chunks)
+            self.metrics[year] = {
+                "Year": year, "Placemarks": placemark_count, "Without_Point": placemark_count - rows,
+                "Rows": 0, "Parse_Seconds": 0.0, "Rows_per_Second": 0.0, "Payload_Bytes": len(payload)
+            }
+            frames = [chunk[0] for chunk in chunks if chunk[0] is not None]
+            if not frames:
+                print(f"No data extracted for year {year}")
+                dataframes.append(pd.DataFrame())
+                continue
+            final_df = pd.concat(frames, ignore_index=True)
+            dataframes.append(self._finish_year(year, final_df, sum(chunk[3] for chunk in chunks)))
+        return dataframes
+
+    def concat(self, dataframes: List[pd.DataFrame]) -> pd.DataFrame:
+        if not self.arrow:
+            return pd.concat(dataframes, ignore_index=True)
+        # Each year becomes one chunk of the Arrow columns; nothing is copied into a new block
+        tables = [pa.Table.from_pandas(df, preserve_index=False) for df in dataframes]
+        unified = pa.concat_tables(tables, promote_options="default")
+        return unified.to_pandas(types_mapper=pd.ArrowDtype)
+
+    async def process_multiple_years_async(self, url_dict: Dict[int, str], session: aiohttp.ClientSession,
+                                           semaphore: asyncio.Semaphore, deadline: float,
+                                           total_deadline: Optional[float] = None) -> Tuple[pd.DataFrame, Dict[int, str]]:
+        """
+        Runs process_year_async for every supported year. Years still running after total_deadline
+        seconds are cancelled ("cancelled"), and a year raising an unexpected error gets the status
+        "failed: <error>"; the other years are kept in both cases.
+        """
+        years = [year for year in url_dict if year in self.year_mappings]
+        for year in url_dict:
+            if year not in self.year_mappings:
+                print(f"Year {year} is not supported in year mappings.")
+        tasks = {year: asyncio.create_task(self.process_year_async(year, url_dict[year], session, semaphore, deadline))
+                 for year in years}
+        pending = set()
+        if tasks:
+            _, pending = await asyncio.wait(tasks.values(), timeout=total_deadline)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        statuses, dataframes = {}, []
+        for year, task in tasks.items():
+            if task in pending:
+                statuses[year] = "cancelled"
+            elif task.exception() is not None:
+                statuses[year] = f"failed: {task.exception()}"
+                print(f"Failed to process year {year}: {task.exception()}")
+            else:
+                df, statuses[year] = task.result()
+                if not df.empty:
+                    dataframes.append(df)
+        if not dataframes:
+            print("No valid dataframes to concatenate.")
+            return pd.DataFrame(), statuses
+        return self.concat(dataframes), statuses
+
+
+def _parse_chunk(mapping: KMLFieldMapping, chunk: bytes) -> Tuple[Optional[pd.DataFrame], int, int, float]:
+    # Runs in a worker process of KMLDataExtractor._process_layers; returns the string rows of the
+    # chunk, its placemark count, the number of placemarks with a Point and the parse time
+    start = time.perf_counter()
+    extractor = KMLDataExtractor({})
+    basic_data, placemark_count = extractor._extract_rows(ET.fromstring(chunk))
+    final_df = extractor._mapped_rows(mapping, basic_data) if basic_data else None
+    return final_df, placemark_count, len(basic_data), time.perf_counter() - start
+
 
 class KMLMappings:
     # Sample Year Mappings for Sales and Rents
@@ -0,0 +1,242 @@
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from scipy.stats import t as student_t
+from Database_Helper import connect_readonly
+
+
+def _sufficient_statistics(x: np.ndarray, y: np.ndarray, spans: np.ndarray, weights: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Weighted sums of every (span, lag, tourism series, price series) pair over the months, for every
+    row of `weights` at once. x is (lags, tourism, months), y is (prices, months), spans is
+    (spans, months) and weights is (replicates, months). Returns arrays of shape
+    (spans, lags, tourism, prices, replicates).
+    """
+    valid = (~np.isnan(x))[None, :, :, None, :] & (~np.isnan(y))[None, None, None, :, :] & spans[:, None, None, None, :]
+    shape = valid.shape[:-1]
+    months = valid.shape[-1]
+    x0 = np.nan_to_num(x)[None, :, :, None, :]
+    y0 = np.nan_to_num(y)[None, None, None, :, :]
+    mask = valid.astype(np.float64)
+    w = weights.T
+    # Every statistic is one (pairs x months) @ (months x replicates) product
+    sums = {
+        "n": mask.reshape(-1, months) @ w,
+        "x": (mask * x0).reshape(-1, months) @ w,
+        "y": (mask * y0).reshape(-1, months) @ w,
+        "xx": (mask * x0 * x0).reshape(-1, months) @ w,
+        "yy": (mask * y0 * y0).reshape(-1, months) @ w,
+        "xy": (mask * x0 * y0).reshape(-1, months) @ w,
+    }
+    return {key: value.reshape(shape + (weights.shape[0],)) for key, value in sums.items()}
+
+
+def _fits(sums: Dict[str, np.ndarray], min_observations: int) -> Dict[str, np.ndarray]:
+    n = sums["n"]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sxx = sums["xx"] - sums["x"] ** 2 / n
+        syy = sums["yy"] - sums["y"] ** 2 / n
+        sxy = sums["xy"] - sums["x"] * sums["y"] / n
+        r = np.clip(sxy / np.sqrt(sxx * syy), -1, 1)
+        slope = sxy / sxx
+        intercept = (sums["y"] - slope * sums["x"]) / n
+        df = n - 2
+        slope_stderr = np.sqrt((1 - r ** 2) * syy / sxx / df)
+        t_stat = r * np.sqrt(df / np.maximum(1 - r ** 2, 1e-300))
+    fits = {"Correlation": r, "Slope": slope, "Intercept": intercept, "Slope_Stderr": slope_stderr, "T": t_stat}
+    too_few = n < min_observations
+    for value in fits.values():
+        value[too_few] = np.nan
+    return fits
+
+
+def _block_bootstrap_weights(months: int, replicates: int, block_size: int, rng: np.random.Generator) -> np.ndarray:
+    # Moving block bootstrap: consecutive months are resampled together to keep their autocorrelation
+    block_size = max(1, min(block_size, months))
+    blocks = -(-months // block_size)
+    starts = rng.integers(0, months - block_size + 1, size=(replicates, blocks))
+    positions = (starts[:, :, None] + np.arange(block_size)).reshape(replicates, -1)[:, :months]
+    flat = (np.arange(replicates)[:, None] * months + positions).ravel()
+    return np.bincount(flat, minlength=replicates * months).reshape(replicates, months).astype(np.float64)
+
+
+def _analyze_window(task: dict) -> Dict[str, np.ndarray]:
+    # Runs in a worker process when LagRegressionAnalyzer.processes is set: one rolling window
+    x, y, spans = task["x"], task["y"], task["spans"]
+    sums = _sufficient_statistics(x, y, spans, np.ones((1, x.shape[-1])))
+    result = {key: value[..., 0] for key, value in _fits(sums, task["min_observations"]).items()}
+    result["N"] = sums["n"][..., 0]
+
+    if task["bootstrap"]:
+        rng = np.random.default_rng(task["seed"])
+        correlations, slopes = [], []
+        for start in range(0, task["bootstrap"], task["chunk"]):
+            weights = _block_bootstrap_weights(x.shape[-1], min(task["chunk"], task["bootstrap"] - start),
+                                               task["block_size"], rng)
+            replicate = _fits(_sufficient_statistics(x, y, spans, weights), task["min_observations"])
+            correlations.append(replicate["Correlation"])
+            slopes.append(replicate["Slope"])
+        alpha = (1 - task["confidence"]) / 2 * 100
+        for name, values in (("Correlation", np.concatenate(correlations, axis=-1)), ("Slope", np.concatenate(slopes, axis=-1))):
+            with np.errstate(invalid='ignore'):
+                low, high = np.nanpercentile(values, [alpha, 100 - alpha], axis=-1)
+            result[f"{name}_Low"], result[f"{name}_High"] = low, high
+    return result
+
+
+class LagRegressionAnalyzer:
+    """
+    This class relates every tourism series (tourists by nationality, passenger total and the
+    shares of the top origins) to every housing price series (monthly mean and median price per
+    m2 for sales and rents) of the 'monthly_features' table. For every combination of
+        - rolling window (trailing mean of the tourism series over w months),
+        - lag (tourism series shifted by L months),
+        - period span (e.g. 2011-2019 vs 2021),
+        - tourism series and price series,
+    it reports the Pearson correlation and the OLS fit price ~ tourism (slope, intercept, slope
+    standard error, p-value), as scipy.stats.linregress would on the pairwise complete months.
+    All lags, spans and series pairs of a window are computed together from weighted sufficient
+    statistics, i.e. a handful of matrix products. Moving block bootstrap confidence intervals reuse
+    the same products with resampling weights and can be spread over a process pool (one window per
+    task).
+    """
+    tourism_prefixes = ("Tourists_", "Origin_Share_", "Passengers_Total")
+    price_prefixes = ("Price_m2_Mean_", "Price_m2_Median_")
+
+    def __init__(self, lags: Sequence[int] = range(0, 13), windows: Sequence[int] = (1, 3, 6, 12),
+                 spans: Optional[Dict[str, Tuple[Optional[str], Optional[str]]]] = None, min_observations: int = 12,
+                 bootstrap: int = 0, block_size: int = 6, confidence: float = 0.95, processes: Optional[int] = None,
+                 bootstrap_chunk: int = 200, seed: int = 0):
+        self.lags = np.asarray(list(lags), dtype=int)
+        self.windows = list(windows)
+        self.spans = spans or {"All": (None, None)}
+        self.min_observations = min_observations
+        self.bootstrap = bootstrap
+        self.block_size = block_size
+        self.confidence = confidence
+        self.processes = processes
+        self.bootstrap_chunk = bootstrap_chunk
+        self.seed = seed
+
+    @staticmethod
+    def load_features(database_name: Path = Path('../data') / 'Housing_Tourism_Data.sqlite') -> pd.DataFrame:
+        conn = connect_readonly(database_name)
+        try:
+            return pd.read_sql_query("SELECT * FROM monthly_features ORDER BY Month_Index", conn)
+        finally:
+            conn.close()
+
+    @classmethod
+    def series(cls, features: pd.DataFrame) -> Tuple[List[str], List[str]]:
+        # Base series only; the _Roll and _Lag columns of the feature table are recomputed here
+        base = [c for c in features.columns if not any(f"_{kind}" in c for kind in ("Roll", "Lag"))]
+        return ([c for c in base if c.startswith(cls.tourism_prefixes)],
+                [c for c in base if c.startswith(cls.price_prefixes)])
+
+    def _span_masks(self, features: pd.DataFrame) -> np.ndarray:
+        period = features['Period'].astype(str)
+        masks = []
+        for start, end in self.spans.values():
+            mask = np.ones(len(features), dtype=bool)
+            if start is not None:
+                mask &= (period >= start).to_numpy()
+            if end is not None:
+                mask &= (period <= end).to_numpy()
+            masks.append(mask)
+        return np.vstack(masks)
+
+    def _lagged(self, values: np.ndarray) -> np.ndarray:
+        # (series, months) -> (lags, series, months); month t holds the value of month t - lag
+        months = values.shape[-1]
+        source = np.arange(months)[None, :] - self.lags[:, None]
+        lagged = values[:, np.clip(source, 0, months - 1)].transpose(1, 0, 2)
+        lagged[np.broadcast_to((source < 0)[:, None, :], lagged.shape)] = np.nan
+        return lagged
+
+    def run(self, features: pd.DataFrame) -> pd.DataFrame:
+        """
+        Returns one row per (Window, Lag, Span, Tourism_Series, Price_Series) with N, Correlation, R2,
+        Slope, Intercept, Slope_Stderr and P_Value, plus Correlation_Low/High and Slope_Low/High with
+        bootstrap > 0.
+        """
+        features = features.sort_values('Month_Index').reset_index(drop=True)
+        tourism_columns, price_columns = self.series(features)
+        if not tourism_columns or not price_columns:
+            raise ValueError("The feature table has no tourism or no price series")
+        tourism = features[tourism_columns].astype(float)
+        y = features[price_columns].astype(float).to_numpy().T
+        spans = self._span_masks(features)
+
+        # Centering leaves correlations and slopes unchanged and keeps the sums of squares well conditioned
+        y_means = np.nanmean(y, axis=1)
+        x_means, tasks = [], []
+        for number, window in enumerate(self.windows):
+            x = tourism.rolling(window, min_periods=window).mean().to_numpy().T
+            x_means.append(np.nanmean(x, axis=1))
+            tasks.append({"x": self._lagged(x - x_means[-1][:, None]), "y": y - y_means[:, None], "spans": spans,
+                          "min_observations": self.min_observations, "bootstrap": self.bootstrap,
+                          "block_size": self.block_size, "confidence": self.confidence,
+                          "chunk": self.bootstrap_chunk, "seed": self.seed + number})
+        if self.processes and self.bootstrap and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=self.processes) as executor:
+                results = list(executor.map(_analyze_window, tasks))
+        else:
+            results = [_analyze_window(task) for task in tasks]
+
+        frames = []
+        index = pd.MultiIndex.from_product([list(self.spans), self.lags, tourism_columns, price_columns],
+                                           names=["Span", "Lag", "Tourism_Series", "Price_Series"])
+        for window, x_mean, result in zip(self.windows, x_means, results):
+            frame = pd.DataFrame({name: values.ravel() for name, values in result.items() if name != "T"}, index=index)
+            df = frame["N"] - 2
+            with np.errstate(invalid='ignore'):
+                frame["P_Value"] = 2 * student_t.sf(np.abs(result["T"].ravel()), df.where(df > 0))
+            frame["R2"] = frame["Correlation"] ** 2
+            # Undo the centering for the intercept: y = a + b * x  <=>  y - my = (a - my + b * mx) + b * (x - mx)
+            mx = np.broadcast_to(x_mean[None, None, :, None], result["Slope"].shape).ravel()
+            my = np.broadcast_to(y_means[None, None, None, :], result["Slope"].shape).ravel()
+            frame["Intercept"] = frame["Intercept"] + my - frame["Slope"] * mx
+            frame.insert(0, "Window", window)
+            frames.append(frame.reset_index())
+
+        columns = ["Window", "Lag", "Span", "Tourism_Series", "Price_Series", "N", "Correlation", "R2", "Slope",
+                   "Intercept", "Slope_Stderr", "P_Value"]
+        if self.bootstrap:
+            columns += ["Correlation_Low", "Correlation_High", "Slope_Low", "Slope_High"]
+        results = pd.concat(frames, ignore_index=True)[columns]
+        results["N"] = results["N"].astype(int)
+        print(f"[INFO] Fitted {len(results)} lag/window combinations "
+              f"({len(tourism_columns)} tourism x {len(price_columns)} price series)")
+        return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Lagged correlations and OLS fits between tourism and housing price series")
+    parser.add_argument('--database', type=Path, default=Path('../data') / 'Housing_Tourism_Data.sqlite')
+    parser.add_argument('--max-lag', type=int, default=12)
+    parser.add_argument('--windows', type=int, nargs='+', default=[1, 3, 6, 12])
+    parser.add_argument('--span', action='append', default=[], metavar='NAME=FROM:TO',
+                        help="period span, e.g. pre_covid=2011.01:2019.12 (repeatable; default: all months)")
+    parser.add_argument('--bootstrap', type=int, default=0, help="bootstrap replicates for confidence intervals")
+    parser.add_argument('--block-size', type=int, default=6)
+    parser.add_argument('--processes', type=int, default=None, help="worker processes for the bootstrap")
+    parser.add_argument('--top', type=int, default=20, help="rows to print, by absolute correlation")
+    parser.add_argument('--output', type=Path, help="write all results to this CSV file")
+    args = parser.parse_args()
+
+    spans = {}
+    for span in args.span:
+        name, _, bounds = span.partition('=')
+        start, _, end = bounds.partition(':')
+        spans[name] = (start or None, end or None)
+    analyzer = LagRegressionAnalyzer(lags=range(args.max_lag + 1), windows=args.windows, spans=spans or None,
+                                     bootstrap=args.bootstrap, block_size=args.block_size, processes=args.processes)
+    results = analyzer.run(LagRegressionAnalyzer.load_features(args.database))
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"[SUCCESS] Results written to {args.output}")
+    top = results.reindex(results["Correlation"].abs().sort_values(ascending=False).index).head(args.top)
+    print(top.to_string(index=False))
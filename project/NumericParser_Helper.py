@@ -0,0 +1,85 @@
+import pandas as pd
+from typing import Dict, Optional, Tuple
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class NumberFormat:
+    thousands: Optional[str]
+    decimal: str
+
+
+class NumericColumnParser:
+    """
+    This class converts whole text columns of Colombian prices and areas (e.g. "$ 1.250.000,50",
+    "350,000,000", "85") into floats. The thousands and decimal separators are inferred once per
+    column from a sample of its values, and the column is then converted in one vectorized pass
+    with a precompiled translation table. Values that still cannot be converted become NaN and are
+    reported as unparsed instead of raising; placeholders such as "N/A" count as missing.
+    """
+    MISSING_VALUES = {"", "N/A", "NA", "-"}
+    # Characters that never carry numeric information in the KML descriptions
+    NOISE = "$ \u00a0"
+
+    def __init__(self, sample_size: int = 200):
+        self.sample_size = sample_size
+        self._tables: Dict[NumberFormat, dict] = {}
+
+    @classmethod
+    def _strip(cls, value: str) -> str:
+        return value.translate(str.maketrans("", "", cls.NOISE))
+
+    def infer_format(self, values: pd.Series) -> NumberFormat:
+        """Votes on the role of '.' and ',' over a sample of the non-missing values."""
+        present = values.dropna().astype(str)
+        present = present[~present.str.strip().isin(self.MISSING_VALUES)]
+        if len(present) > self.sample_size:
+            present = present.sample(self.sample_size, random_state=0)
+
+        votes = {",": 0, ".": 0}  # positive: thousands separator, negative: decimal separator
+        for raw in present:
+            value = self._strip(raw)
+            positions = {sep: value.rfind(sep) for sep in votes if sep in value}
+            if len(positions) == 2:
+                # Both present: the last one is the decimal separator
+                decimal = max(positions, key=positions.get)
+                thousands = "," if decimal == "." else "."
+                votes[thousands] += 1
+                votes[decimal] -= 1
+            elif len(positions) == 1:
+                sep = next(iter(positions))
+                groups = value.split(sep)
+                if len(groups) > 2 or (len(groups[-1]) == 3 and groups[0].isdigit()):
+                    votes[sep] += 1
+                else:
+                    votes[sep] -= 1
+
+        if votes["."] > 0 and votes["."] >= votes[","]:
+            return NumberFormat(thousands=".", decimal=",")
+        if votes[","] > 0:
+            return NumberFormat(thousands=",", decimal=".")
+        if votes[","] < 0:
+            return NumberFormat(thousands=None, decimal=",")
+        return NumberFormat(thousands=None, decimal=".")
+
+    def _table(self, number_format: NumberFormat) -> dict:
+        if number_format not in self._tables:
+            mapping = {char: None for char in self.NOISE}
+            if number_format.thousands:
+                mapping[number_format.thousands] = None
+            mapping[number_format.decimal] = "."
+            self._tables[number_format] = str.maketrans(mapping)
+        return self._tables[number_format]
+
+    def parse(self, values: pd.Series, number_format: Optional[NumberFormat] = None) -> Tuple[pd.Series, pd.Series]:
+        """
+        Returns the column as float64 and a boolean mask of the values that were present but could not
+        be parsed. The format is inferred from the column itself unless given.
+        """
+        number_format = number_format or self.infer_format(values)
+        text = values.astype(object).where(values.notna(), None).astype(str).str.strip()
+        missing = values.isna() | text.isin(self.MISSING_VALUES)
+        parsed = pd.to_numeric(text.where(~missing).str.translate(self._table(number_format)), errors='coerce')
+        parsed = parsed.astype('float64')
+        unparsed = ~missing & parsed.isna()
+        return parsed, unparsed
+
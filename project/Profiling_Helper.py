@@ -0,0 +1,179 @@
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Tuple
+
+class StageProfiler:
+    """
+    This class profiles pipeline stages on demand. For every stage it can write:
+        - <stage>.pstats: deterministic cProfile statistics (open with pstats or snakeviz),
+        - <stage>.collapsed: stacks sampled every `interval` seconds in the collapsed format used by
+          py-spy and flamegraph.pl ("frame;frame;frame count" per line).
+    The mode is "cprofile", "sample" or "all". Nested stages get their own files; while a nested
+    stage runs, the cProfile of the enclosing stage is paused (only one profiler can be active per
+    thread), whereas the sampler of the enclosing stage keeps sampling.
+    Profiling is off unless enabled, e.g. through the PIPELINE_PROFILE and PIPELINE_PROFILE_INTERVAL
+    environment variables (see from_env).
+    """
+    MODES = ("cprofile", "sample", "all")
+
+    def __init__(self, output_dir: Optional[Path] = None, mode: Optional[str] = None, interval: float = 0.005):
+        if mode is not None and mode not in self.MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}', expected one of {self.MODES}")
+        self.output_dir = Path(output_dir) if output_dir else None
+        self.mode = mode
+        self.interval = interval
+        self._local = threading.local()
+        self._names_lock = threading.Lock()
+        self._used_names = Counter()
+
+    @classmethod
+    def from_env(cls, output_dir: Path, mode: Optional[str] = None, interval: Optional[float] = None) -> "StageProfiler":
+        mode = mode or os.environ.get("PIPELINE_PROFILE") or None
+        if mode in ("1", "true", "yes"):
+            mode = "all"
+        interval = interval or float(os.environ.get("PIPELINE_PROFILE_INTERVAL", 0.005))
+        return cls(output_dir if mode else None, mode, interval)
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode is not None and self.output_dir is not None
+
+    def _file_stem(self, name: str) -> Path:
+        # The same stage may run several times (e.g. process_year for sales and rents)
+        with self._names_lock:
+            self._used_names[name] += 1
+            count = self._used_names[name]
+        return self.output_dir / (name if count == 1 else f"{name}_{count}")
+
+    def _sample(self, thread_id: int, stop: threading.Event, samples: Counter) -> None:
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                samples[";".join(reversed(stack))] += 1
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stem = self._file_stem(name)
+        stack = getattr(self._local, "profiles", None)
+        if stack is None:
+            stack = self._local.profiles = []
+
+        profile = sampler = None
+        samples, stop = Counter(), threading.Event()
+        if self.mode in ("cprofile", "all"):
+            if stack:
+                stack[-1].disable()
+            profile = cProfile.Profile()
+            stack.append(profile)
+            profile.enable()
+        if self.mode in ("sample", "all"):
+            sampler = threading.Thread(target=self._sample, args=(threading.get_ident(), stop, samples), daemon=True)
+            sampler.start()
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+                stack.pop()
+                profile.dump_stats(stem.with_suffix(".pstats"))
+                if stack:
+                    stack[-1].enable()
+            if sampler is not None:
+                stop.set()
+                sampler.join()
+                with open(stem.with_suffix(".collapsed"), "w", encoding="utf-8") as f:
+                    for frames, count in samples.most_common():
+                        f.write(f"{frames} {count}\n")
+            print(f"[INFO] Profiled stage '{name}' ({elapsed:.2f}s) -> {stem}")
+
+    def merge(self, name: str, profiles: List[Optional[dict]], samples: List[Optional[Counter]]) -> None:
+        """
+        Writes the profiles of one stage that ran in pieces outside of this process (see profile_call),
+        e.g. the chunks of a KML layer parsed on a process pool: the cProfile statistics are added up
+        into <stage>.pstats and the sampled stacks into <stage>.collapsed.
+        """
+        if not self.enabled:
+            return
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stem = self._file_stem(name)
+        profiles = [stats for stats in profiles if stats is not None]
+        samples = [counts for counts in samples if counts is not None]
+        if profiles:
+            merged = pstats.Stats()
+            for stats in profiles:
+                part = pstats.Stats()
+                part.stats = stats
+                part.get_top_level_stats()
+                merged.add(part)
+            merged.dump_stats(stem.with_suffix(".pstats"))
+        if samples:
+            with open(stem.with_suffix(".collapsed"), "w", encoding="utf-8") as f:
+                for frames, count in sum(samples, Counter()).most_common():
+                    f.write(f"{frames} {count}\n")
+        print(f"[INFO] Profiled stage '{name}' from {max(len(profiles), len(samples))} worker calls -> {stem}")
+
+
+def profile_call(mode: Optional[str], interval: float, func: Callable, *args) -> Tuple[Any, Optional[dict], Optional[Counter]]:
+    """
+    Runs func(*args) under the given profiling mode and returns the result together with the raw
+    cProfile statistics and the sampled stack counts (None when the mode does not record them).
+    Meant to run in a worker process; the parent writes the files with StageProfiler.merge.
+    """
+    if mode is None:
+        return func(*args), None, None
+    profile = sampler = None
+    samples, stop = Counter(), threading.Event()
+    if mode in ("cprofile", "all"):
+        profile = cProfile.Profile()
+    if mode in ("sample", "all"):
+        sampler = threading.Thread(target=StageProfiler(None, mode, interval)._sample,
+                                   args=(threading.get_ident(), stop, samples), daemon=True)
+        sampler.start()
+    try:
+        result = profile.runcall(func, *args) if profile is not None else func(*args)
+    finally:
+        if sampler is not None:
+            stop.set()
+            sampler.join()
+    stats = None
+    if profile is not None:
+        profile.create_stats()
+        stats = profile.stats
+    return result, stats, samples if sampler is not None else None
+
+
+def profiled(stage_name: str):
+    """
+    Method decorator running the call inside self.profiler.stage(). stage_name may refer to the
+    positional arguments of the call, e.g. "process_year_{0}". Objects without a profiler run as is.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            profiler = getattr(self, "profiler", None)
+            if profiler is None or not profiler.enabled:
+                return func(self, *args, **kwargs)
+            with profiler.stage(stage_name.format(*args)):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
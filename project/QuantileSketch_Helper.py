@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Sequence, Tuple
+
+class PriceSketches:
+    """
+    This class keeps mergeable t-digest sketches of the price columns for every
+    (Research, Neighborhood, Stratum, Period) group. A sketch is a list of centroids (Mean, Weight)
+    stored as rows of a DataFrame, so all groups are compressed together in one vectorized pass:
+    the centroids are sorted by (group, mean), and consecutive centroids share a bucket while their
+    quantile maps to the same unit of the t-digest scale function
+        k(q) = compression / (2 * pi) * asin(2q - 1),
+    which keeps the tails precise and the middle coarse. The smallest and largest centroid of every
+    group are never merged, so minimum and maximum stay exact.
+    Raw values are centroids of weight 1, so building, adding new data and rolling groups up (e.g.
+    all months of a neighborhood) are the same merge operation, and percentiles are answered from
+    at most ~compression/2 centroids per group instead of from the rows.
+    """
+    group_columns = ["Research", "Neighborhood", "Stratum", "Period"]
+    measures = ["Price_per_m2_COP", "Commercial_Price_COP"]
+
+    def __init__(self, compression: float = 100, chunk_size: int = 100_000):
+        self.compression = compression
+        self.chunk_size = chunk_size
+
+    def _scale(self, q: np.ndarray) -> np.ndarray:
+        return self.compression / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1))
+
+    def _compress(self, groups: np.ndarray, means: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        order = np.lexsort((means, groups))
+        groups, means, weights = groups[order], means[order], weights[order]
+        n = len(groups)
+        starts = np.r_[True, groups[1:] != groups[:-1]]
+        ends = np.r_[starts[1:], True]
+
+        # Quantile of every centroid's midpoint within its group
+        start_positions = np.flatnonzero(starts)
+        sizes = np.diff(np.r_[start_positions, n])
+        cumulative = np.cumsum(weights)
+        before_group = np.repeat(cumulative[start_positions] - weights[start_positions], sizes)
+        totals = np.repeat(np.add.reduceat(weights, start_positions), sizes)
+        bucket = np.floor(self._scale((cumulative - before_group - weights / 2) / totals))
+
+        breaks = starts | ends | np.r_[True, starts[:-1]] | np.r_[True, bucket[1:] != bucket[:-1]]
+        segment = np.cumsum(breaks) - 1
+        merged_weights = np.bincount(segment, weights)
+        merged_means = np.bincount(segment, weights * means) / merged_weights
+        return groups[breaks], merged_means, merged_weights
+
+    def merge(self, *sketches: pd.DataFrame, by: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Merges sketch frames (columns Measure, <group columns>, Mean, Weight) into one sketch per
+        Measure and group. With `by`, the groups are rolled up to those columns first.
+        """
+        by = list(self.group_columns if by is None else by)
+        columns = ["Measure"] + by
+        frames = [sketch for sketch in sketches if sketch is not None and not sketch.empty]
+        if not frames:
+            return pd.DataFrame(columns=columns + ["Mean", "Weight"])
+        centroids = pd.concat(frames, ignore_index=True)
+
+        codes = centroids.groupby(columns, dropna=False, sort=False, observed=True).ngroup().to_numpy()
+        groups, means, weights = self._compress(codes, centroids["Mean"].to_numpy('float64'),
+                                                centroids["Weight"].to_numpy('float64'))
+        first = pd.Series(np.arange(len(codes))).groupby(codes).first().to_numpy()
+        merged = centroids[columns].iloc[first[groups]].reset_index(drop=True)
+        merged["Mean"] = means
+        merged["Weight"] = weights
+        return merged
+
+    def _points(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Every present value is a centroid of weight 1
+        frames = []
+        for measure in self.measures:
+            if measure not in df.columns:
+                continue
+            values = pd.to_numeric(df[measure], errors='coerce').astype('float64')
+            present = values.notna().to_numpy()
+            points = df.loc[present, self.group_columns].reset_index(drop=True)
+            points.insert(0, "Measure", measure)
+            points["Mean"] = values.to_numpy()[present]
+            points["Weight"] = 1.0
+            frames.append(points)
+        return pd.concat(frames, ignore_index=True) if frames else None
+
+    def build(self, df: Optional[pd.DataFrame], previous: Optional[pd.DataFrame] = None) -> Optional[pd.DataFrame]:
+        """
+        Builds the sketches of a transformed sales/rents frame chunk by chunk, merging every chunk into
+        the sketches built so far (and into `previous`, if given), so memory stays bounded by the chunk
+        size plus the centroids.
+        """
+        if df is None or df.empty:
+            return previous
+        sketches = previous
+        for start in range(0, len(df), self.chunk_size):
+            sketches = self.merge(sketches, self._points(df.iloc[start:start + self.chunk_size]))
+        print(f"[INFO] Built {len(sketches)} price sketch centroids for "
+              f"{sketches.groupby(['Measure'] + self.group_columns, dropna=False).ngroups} groups")
+        return sketches
+
+    def quantiles(self, sketches: pd.DataFrame, percentiles: Sequence[float] = (0.25, 0.5, 0.75),
+                  measure: str = "Price_per_m2_COP", by: Sequence[str] = ("Neighborhood",),
+                  filters: Optional[Dict[str, object]] = None) -> pd.DataFrame:
+        """
+        Returns one row per group of `by` with the count and the requested percentiles of `measure`,
+        interpolated between centroid midpoints. `filters` restricts the groups first, e.g.
+        {"Research": "Venta"}.
+        """
+        selected = sketches[sketches["Measure"] == measure]
+        for column, value in (filters or {}).items():
+            selected = selected[selected[column] == value]
+        rolled = self.merge(selected, by=by)
+
+        by = list(by)
+        rows = []
+        for key, centroids in rolled.groupby(by, dropna=False, sort=True, observed=True):
+            means, weights = centroids["Mean"].to_numpy(), centroids["Weight"].to_numpy()
+            total = weights.sum()
+            midpoints = np.cumsum(weights) - weights / 2
+            values = np.interp(np.asarray(percentiles) * total, midpoints, means)
+            key = key if isinstance(key, tuple) else (key,)
+            rows.append(list(key) + [total] + list(values))
+        return pd.DataFrame(rows, columns=by + ["Count"] + [f"P{round(p * 100, 2):g}" for p in percentiles])
@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import threading
+import pandas as pd
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Sequence, Tuple
+from Database_Helper import connect_readonly
+from QuantileSketch_Helper import PriceSketches
+
+class HousingTourismQueries:
+    """
+    This class exposes the aggregations used by the analysis notebook on top of the published
+    database. Results are kept in an in-process LRU cache keyed by the run ID of the load that
+    produced them: when the pipeline publishes a new database (detected through the file identity,
+    since publishing replaces the file by rename), the connection is reopened, the new run ID is
+    read from '_pipeline_runs' and all cached results are dropped.
+    With a ReadOnlyConnectionPool, queries run on the pool's connections (and its run ID) instead of
+    a connection of their own, so the instance can be shared between threads.
+    """
+    def __init__(self, database_name: Path = Path('../data') / 'Housing_Tourism_Data.sqlite', max_entries: int = 128,
+                 pool=None):
+        self.database_name = Path(database_name)
+        self.max_entries = max_entries
+        self.pool = pool
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._file_identity: Optional[Tuple[int, int, int]] = None
+        self.run_id: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.sketches = PriceSketches()
+
+    def _refresh(self) -> None:
+        stat = os.stat(self.database_name)
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if identity == self._file_identity:
+            return
+        if self._conn is not None:
+            self._conn.close()
+        self._conn = connect_readonly(self.database_name)
+        self._file_identity = identity
+        try:
+            row = self._conn.execute("SELECT Run_ID FROM _pipeline_runs ORDER BY Finished_At DESC LIMIT 1").fetchone()
+            run_id = row[0] if row else None
+        except sqlite3.OperationalError:
+            run_id = None
+        # Databases written before run IDs existed fall back to the file identity
+        run_id = run_id or "file-" + "-".join(str(part) for part in identity)
+        if run_id != self.run_id:
+            self._cache.clear()
+            self.run_id = run_id
+
+    def _cached(self, cache_key: tuple) -> Optional[pd.DataFrame]:
+        with self._cache_lock:
+            if cache_key not in self._cache:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(cache_key)
+            self.hits += 1
+            return self._cache[cache_key].copy()
+
+    def _store(self, cache_key: tuple, result: pd.DataFrame) -> pd.DataFrame:
+        with self._cache_lock:
+            self._cache[cache_key] = result
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return result.copy()
+
+    def _query(self, key: tuple, sql: str, params: tuple = ()) -> pd.DataFrame:
+        if self.pool is not None:
+            with self.pool.connection() as conn:
+                with self._cache_lock:
+                    if self.pool.run_id != self.run_id:
+                        self._cache.clear()
+                        self.run_id = self.pool.run_id
+                cache_key = (self.pool.run_id,) + key
+                cached = self._cached(cache_key)
+                if cached is not None:
+                    return cached
+                return self._store(cache_key, pd.read_sql_query(sql, conn, params=params))
+
+        self._refresh()
+        cache_key = (self.run_id,) + key
+        cached = self._cached(cache_key)
+        if cached is not None:
+            return cached
+        return self._store(cache_key, pd.read_sql_query(sql, self._conn, params=params))
+
+    def monthly_travelers(self) -> pd.DataFrame:
+        """Monthly totals of Colombian and foreign travelers, one row per Period."""
+        return self._query(
+            ("monthly_travelers",),
+            """
+            SELECT Period,
+                   SUM(CASE WHEN Nationality = 'Colombiano' THEN Number ELSE 0 END) AS Colombians,
+                   SUM(CASE WHEN Nationality = 'Extranjero' THEN Number ELSE 0 END) AS Foreigners
+            FROM monthly_entry_colombians_foreigners
+            GROUP BY Period
+            ORDER BY Period
+            """
+        )
+
+    def price_per_m2_by_period(self) -> pd.DataFrame:
+        """Average price per m2 for each Period and Research type (sales vs rents)."""
+        return self._query(
+            ("price_per_m2_by_period",),
+            """
+            SELECT Period, Research, AVG(Price_per_m2_COP) AS Avg_Price_per_m2_COP, COUNT(*) AS Offers
+            FROM sales_rents_2011_2021
+            WHERE Price_per_m2_COP IS NOT NULL
+            GROUP BY Period, Research
+            ORDER BY Period, Research
+            """
+        )
+
+    def top_origins(self, top_n: int = 10, nationality: Optional[str] = None) -> pd.DataFrame:
+        """The top_n origins by number of passengers for every year, optionally for one Nationality."""
+        return self._query(
+            ("top_origins", top_n, nationality),
+            """
+            SELECT Year, Origin, Passengers, Rank FROM (
+                SELECT Year, Origin, Passengers,
+                       ROW_NUMBER() OVER (PARTITION BY Year ORDER BY Passengers DESC) AS Rank
+                FROM (
+                    SELECT SUBSTR(Period, 1, 4) AS Year, Origin, SUM(Number) AS Passengers
+                    FROM monthly_passengers_origin
+                    WHERE (? IS NULL OR Nationality = ?)
+                    GROUP BY Year, Origin
+                )
+            )
+            WHERE Rank <= ?
+            ORDER BY Year, Rank
+            """,
+            (nationality, nationality, top_n)
+        )
+
+    def price_percentiles(self, percentiles: Sequence[float] = (0.25, 0.5, 0.75), measure: str = "Price_per_m2_COP",
+                          by: Sequence[str] = ("Neighborhood",), research: Optional[str] = None) -> pd.DataFrame:
+        """Percentiles of a price column per group of `by`, answered from the stored price sketches."""
+        sketches = self._query(
+            ("price_sketches", measure, research),
+            "SELECT * FROM price_sketches WHERE Measure = ? AND (? IS NULL OR Research = ?)",
+            (measure, research, research)
+        )
+        return self.sketches.quantiles(sketches, percentiles, measure=measure, by=list(by))
+
+    def clear(self) -> None:
+        with self._cache_lock:
+            self._cache.clear()
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+            self._file_identity = None
@@ -0,0 +1,116 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List
+from dataclasses import dataclass, field
+
+@dataclass
+class Task:
+    name: str
+    func: Callable[..., Any]
+    dependencies: List[str] = field(default_factory=list)
+    checkpoint: bool = False
+
+
+class TaskGraph:
+    """
+    This class is a small task-graph scheduler. Tasks declare the tasks they depend on and receive
+    the results of those dependencies as positional arguments, in the declared order. Tasks are
+    started on a thread pool as soon as all of their dependencies have finished, so independent
+    chains (e.g. one KML year and one tourism CSV) overlap. When a task fails, the tasks that
+    depend on it are skipped while the rest of the graph keeps running. Tasks added with
+    checkpoint=True are persisted through a RunCheckpoint, and restored instead of re-executed when
+    the graph is run again over the same run directory.
+    """
+    def __init__(self):
+        self.tasks: Dict[str, Task] = {}
+        self.results: Dict[str, Any] = {}
+        self.status: Dict[str, str] = {}
+        self.durations: Dict[str, float] = {}
+
+    def add(self, name: str, func: Callable[..., Any], dependencies: List[str] = (), checkpoint: bool = False) -> str:
+        if name in self.tasks:
+            raise ValueError(f"Task '{name}' is already defined")
+        self.tasks[name] = Task(name, func, list(dependencies), checkpoint)
+        return name
+
+    def topological_order(self) -> List[str]:
+        for task in self.tasks.values():
+            missing = [dep for dep in task.dependencies if dep not in self.tasks]
+            if missing:
+                raise ValueError(f"Task '{task.name}' depends on undefined tasks: {missing}")
+        remaining = {name: len(task.dependencies) for name, task in self.tasks.items()}
+        dependents = {name: [] for name in self.tasks}
+        for task in self.tasks.values():
+            for dep in task.dependencies:
+                dependents[dep].append(task.name)
+        ready = [name for name, count in remaining.items() if count == 0]
+        order = []
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for dependent in dependents[name]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+        if len(order) != len(self.tasks):
+            cyclic = sorted(set(self.tasks) - set(order))
+            raise ValueError(f"Task graph contains a cycle involving: {cyclic}")
+        return order
+
+    def _run_task(self, task: Task, checkpoint=None) -> Any:
+        start = time.perf_counter()
+        try:
+            result = task.func(*(self.results[dep] for dep in task.dependencies))
+        except Exception as e:
+            self.durations[task.name] = time.perf_counter() - start
+            if checkpoint is not None and task.checkpoint:
+                checkpoint.mark_failed(task.name, e)
+            raise
+        self.durations[task.name] = time.perf_counter() - start
+        if checkpoint is not None and task.checkpoint:
+            checkpoint.save(task.name, result, self.durations[task.name])
+        return result
+
+    def run(self, max_workers: int = 8, checkpoint=None) -> Dict[str, Any]:
+        """
+        Executes the graph and returns the results of all tasks that succeeded, keyed by task name.
+        With a checkpoint (RunCheckpoint), checkpointed tasks that already succeeded are restored.
+        """
+        order = self.topological_order()
+        pending = list(order)
+        running = {}
+
+        if checkpoint is not None:
+            for name in order:
+                if self.tasks[name].checkpoint and checkpoint.has(name):
+                    self.results[name] = checkpoint.load(name)
+                    self.status[name] = "ok"
+                    self.durations[name] = 0.0
+                    pending.remove(name)
+            restored = len(order) - len(pending)
+            if restored:
+                print(f"[INFO] Restored {restored} task results from checkpoint {checkpoint.run_dir}")
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while pending or running:
+                for name in list(pending):
+                    dep_status = [self.status.get(dep) for dep in self.tasks[name].dependencies]
+                    if any(status in ("failed", "skipped") for status in dep_status):
+                        self.status[name] = "skipped"
+                        pending.remove(name)
+                        print(f"[INFO] Skipping task '{name}' because a dependency did not succeed")
+                    elif all(status == "ok" for status in dep_status):
+                        running[executor.submit(self._run_task, self.tasks[name], checkpoint)] = name
+                        pending.remove(name)
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.results[name] = future.result()
+                        self.status[name] = "ok"
+                    except Exception as e:
+                        self.status[name] = "failed"
+                        print(f"Task '{name}' failed: {e}")
+        return self.results
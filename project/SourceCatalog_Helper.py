@@ -0,0 +1,68 @@
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+from dataclasses import dataclass
+from KMLExtractor_Helper import KMLFieldMapping, KMLMappings
+
+@dataclass
+class SourceSpec:
+    city: str
+    kind: str
+    url: str
+    year: Optional[int] = None
+    mapping: Optional[str] = None
+
+
+class SourceCatalog:
+    """
+    This class reads the catalog of datasets the pipeline can process from a JSON config file.
+    Every entry declares its city, kind ("sales"/"rents" KML layers, or the tourism CSVs "tourism_1",
+    "foreigners" and "colombians"), URL and, for KML layers, the year and the mapping family. A
+    mapping family "<family>" refers to KMLMappings.<family>_year_mappings.
+    """
+    KML_KINDS = ("sales", "rents")
+    CSV_KINDS = ("tourism_1", "foreigners", "colombians")
+
+    def __init__(self, sources: List[SourceSpec]):
+        self.sources = sources
+
+    @classmethod
+    def load(cls, path: Path) -> "SourceCatalog":
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+        sources = [SourceSpec(**entry) for entry in config["datasets"]]
+        for spec in sources:
+            if spec.kind not in cls.KML_KINDS + cls.CSV_KINDS:
+                raise ValueError(f"Unknown dataset kind '{spec.kind}' for {spec.city} in {path}")
+            if spec.kind in cls.KML_KINDS and spec.year is None:
+                raise ValueError(f"KML dataset {spec.city}/{spec.kind} in {path} has no year")
+        return cls(sources)
+
+    def cities(self) -> List[str]:
+        return sorted({spec.city for spec in self.sources})
+
+    def for_city(self, city: str) -> List[SourceSpec]:
+        specs = [spec for spec in self.sources if spec.city == city]
+        if not specs:
+            raise KeyError(f"City '{city}' is not declared in the source catalog")
+        return specs
+
+    def kml_urls(self, city: str, kind: str) -> Dict[int, str]:
+        return {spec.year: spec.url for spec in self.for_city(city) if spec.kind == kind}
+
+    def kml_mappings(self, city: str, kind: str) -> Dict[int, KMLFieldMapping]:
+        """Year mappings for one city and kind, taken from each source's mapping family."""
+        mappings = {}
+        for spec in self.for_city(city):
+            if spec.kind != kind:
+                continue
+            family = getattr(KMLMappings, f"{spec.mapping or kind}_year_mappings", None)
+            if family is None:
+                raise ValueError(f"Unknown mapping family '{spec.mapping}' for {city}/{kind}/{spec.year}")
+            if spec.year in family:
+                mappings[spec.year] = family[spec.year]
+        return mappings
+
+    def csv_url(self, city: str, kind: str) -> Optional[str]:
+        urls = [spec.url for spec in self.for_city(city) if spec.kind == kind]
+        return urls[0] if urls else None
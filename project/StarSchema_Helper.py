@@ -0,0 +1,129 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+@dataclass(frozen=True)
+class Dimension:
+    table: str
+    key: str
+    columns: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class FactTable:
+    table: str
+    dimensions: Tuple[str, ...]
+
+
+class StarSchema:
+    """
+    This class stores the output tables as a star schema. The repeated text columns of an output
+    table are replaced by integer surrogate keys into small dimension tables (neighborhood, property,
+    origin, nationality, period), so the fact tables only hold integers and measures. A view with the
+    historic table name and column order joins them back, so readers of the output database see the
+    same tables as before.
+    Surrogate keys are stable across loads: the dimension tables are read from the staging database
+    (a copy of the published one) and only values not seen before get new keys.
+    """
+    dimensions: Dict[str, Dimension] = {
+        "neighborhood": Dimension("dim_neighborhood", "Neighborhood_ID", ("Neighborhood",)),
+        # Research and Condition only have a handful of values, so they share the property dimension
+        "property": Dimension("dim_property", "Property_ID", ("Research", "Property", "Condition")),
+        "origin": Dimension("dim_origin", "Origin_ID", ("Code", "Origin")),
+        "nationality": Dimension("dim_nationality", "Nationality_ID", ("Nationality",)),
+        "period": Dimension("dim_period", "Period_ID", ("Period",)),
+    }
+    # Output table (name of the compatibility view) -> fact table
+    facts: Dict[str, FactTable] = {
+        "sales_rents_2011_2021": FactTable("fact_sales_rents", ("period", "property", "neighborhood")),
+        "monthly_entry_colombians_foreigners": FactTable("fact_entry_colombians_foreigners", ("nationality", "period")),
+        "monthly_passengers_origin": FactTable("fact_passengers_origin", ("origin", "period", "nationality")),
+    }
+
+    @classmethod
+    def internal_tables(cls) -> List[str]:
+        return [d.table for d in cls.dimensions.values()] + [f.table for f in cls.facts.values()]
+
+    @staticmethod
+    def _relation_type(conn: sqlite3.Connection, name: str) -> Optional[str]:
+        row = conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    @classmethod
+    def is_view(cls, conn: sqlite3.Connection, name: str) -> bool:
+        return name in cls.facts and cls._relation_type(conn, name) == 'view'
+
+    @classmethod
+    def drop_view(cls, conn: sqlite3.Connection, name: str) -> None:
+        # Used before writing a plain table where an earlier star-schema load left a view
+        if cls.is_view(conn, name):
+            conn.execute(f'DROP VIEW "{name}"')
+            conn.execute(f'DROP TABLE IF EXISTS "{cls.facts[name].table}"')
+
+    @classmethod
+    def select_sql(cls, view: str, columns: List[str], row_id: Optional[str] = None) -> str:
+        """
+        Returns the SELECT joining the fact table of `view` with its dimensions, producing `columns`
+        in the given order. With row_id, the rowid of the fact table is returned first under that name,
+        which allows keyset pagination over the view.
+        """
+        fact = cls.facts[view]
+        sources = {column: f"d_{name}" for name in fact.dimensions for column in cls.dimensions[name].columns}
+        selected = [f'f.rowid AS "{row_id}"'] if row_id else []
+        selected += [f'{sources.get(column, "f")}."{column}" AS "{column}"' for column in columns]
+        joins = [f'LEFT JOIN "{cls.dimensions[name].table}" d_{name} '
+                 f'ON d_{name}."{cls.dimensions[name].key}" = f."{cls.dimensions[name].key}"'
+                 for name in fact.dimensions]
+        return f'SELECT {", ".join(selected)} FROM "{fact.table}" f ' + " ".join(joins)
+
+    def _surrogate_keys(self, conn: sqlite3.Connection, dimension: Dimension, df: pd.DataFrame) -> np.ndarray:
+        columns = list(dimension.columns)
+        quoted = ", ".join(f'"{column}"' for column in columns)
+        conn.execute(f'CREATE TABLE IF NOT EXISTS "{dimension.table}" ("{dimension.key}" INTEGER PRIMARY KEY, '
+                     + ", ".join(f'"{column}" TEXT' for column in columns) + ")")
+        existing = {tuple(row[1:]): row[0] for row in
+                    conn.execute(f'SELECT "{dimension.key}", {quoted} FROM "{dimension.table}"')}
+
+        # Only the distinct combinations are looked up; every row then takes the key of its group
+        codes = df.groupby(columns, dropna=False, sort=False, observed=True).ngroup().to_numpy()
+        first = pd.Series(np.arange(len(df))).groupby(codes).first().to_numpy()
+        combinations = [tuple(None if pd.isna(value) else str(value) for value in row)
+                        for row in df[columns].iloc[first].itertuples(index=False)]
+
+        keys = np.empty(len(combinations), dtype='int64')
+        next_key = max(existing.values(), default=0) + 1
+        new_rows = []
+        for code, combination in enumerate(combinations):
+            if combination not in existing:
+                existing[combination] = next_key
+                new_rows.append((next_key,) + combination)
+                next_key += 1
+            keys[code] = existing[combination]
+        if new_rows:
+            conn.executemany(f'INSERT INTO "{dimension.table}" VALUES ({", ".join("?" * (len(columns) + 1))})', new_rows)
+            print(f"[INFO] Added {len(new_rows)} new keys to '{dimension.table}'")
+        return keys[codes]
+
+    def write(self, conn: sqlite3.Connection, view: str, df: pd.DataFrame) -> None:
+        """
+        Writes `df` as the fact table of `view` (replacing it), extends the dimension tables and
+        (re)creates the view with the columns of `df` in their order.
+        """
+        fact = self.facts[view]
+        dimension_columns = {column for name in fact.dimensions for column in self.dimensions[name].columns}
+        fact_df = df[[c for c in df.columns if c not in dimension_columns]].reset_index(drop=True)
+        for position, name in enumerate(fact.dimensions):
+            dimension = self.dimensions[name]
+            fact_df.insert(position, dimension.key, self._surrogate_keys(conn, dimension, df))
+
+        relation = self._relation_type(conn, view)
+        if relation is not None:
+            conn.execute(f'DROP {relation.upper()} "{view}"')
+        fact_df.to_sql(fact.table, conn, index=False, if_exists='replace')
+        for name in fact.dimensions:
+            key = self.dimensions[name].key
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{fact.table}_{key}" ON "{fact.table}" ("{key}")')
+        conn.execute(f'CREATE VIEW "{view}" AS {self.select_sql(view, list(df.columns))}')
+        print(f"Saving data to fact table '{fact.table}' with view '{view}'.")
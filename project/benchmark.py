@@ -0,0 +1,86 @@
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from prettytable import PrettyTable
+from pipeline import Pipeline
+
+
+def run_child(mode, schedule):
+    """
+        Runs extract, transform and load once in this process and prints the stage timings and the
+        peak resident set size as JSON, of this process and of the largest KML parse worker (the
+        process pool's workers are children of this process). Each mode runs in its own process so
+        that peak RSS is not shared between modes. The KML layers are parsed in placemark chunks, largest first
+        (schedule 'chunks'), or one task per year ('years'); the wall time and tail latency of the
+        parse stage are reported for sales and rents together.
+    """
+    # Keep the pipeline's progress output away from the JSON result on stdout
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            pipeline = Pipeline(database_name=Path(tmp) / 'benchmark.sqlite', arrow=(mode == 'arrow'))
+            extractors = (pipeline.sales_extractor, pipeline.rents_extractor)
+            if schedule == 'years':
+                for extractor in extractors:
+                    extractor.chunk_bytes = 0
+            timings = {}
+            start = time.perf_counter()
+            data = pipeline.extract_data()
+            timings['extract_s'] = time.perf_counter() - start
+            timings['parse_wall_s'] = sum(e.schedule.get('Parse_Wall_Seconds', 0.0) for e in extractors)
+            timings['parse_tail_s'] = sum(e.schedule.get('Parse_Tail_Seconds', 0.0) for e in extractors)
+
+            start = time.perf_counter()
+            transformed = pipeline.transform_data(data)
+            timings['transform_s'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            pipeline.save_data_to_sqlite({
+                "sales_rents_2011_2021": transformed["sales_rents"],
+                "monthly_entry_colombians_foreigners": transformed["tourism_1"],
+                "monthly_passengers_origin": transformed["tourism_2"],
+                "monthly_features": transformed["monthly_features"],
+                "price_sketches": transformed["price_sketches"]
+            })
+            timings['load_s'] = time.perf_counter() - start
+    finally:
+        sys.stdout = stdout
+
+    # ru_maxrss is reported in KiB on Linux; RUSAGE_CHILDREN covers the terminated (joined) pool workers
+    timings['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    timings['peak_rss_workers_mb'] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(json.dumps(timings))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark of the pipeline stages and their memory profile")
+    parser.add_argument('--modes', nargs='+', default=['pandas', 'arrow'], choices=['pandas', 'arrow'])
+    parser.add_argument('--schedules', nargs='+', default=['chunks'], choices=['chunks', 'years'],
+                        help="KML parse scheduling: placemark chunks largest first, or one task per year")
+    parser.add_argument('--child', choices=['pandas', 'arrow'], help=argparse.SUPPRESS)
+    parser.add_argument('--schedule', choices=['chunks', 'years'], default='chunks', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.schedule)
+        sys.exit(0)
+
+    table = PrettyTable()
+    table.field_names = ["Mode", "Schedule", "Extract (s)", "Parse wall (s)", "Parse tail (s)",
+                         "Transform (s)", "Load (s)", "Peak RSS (MB)", "Peak RSS workers (MB)"]
+    for mode in args.modes:
+        for schedule in args.schedules:
+            print(f"[INFO] Benchmarking mode '{mode}' with schedule '{schedule}'...")
+            output = subprocess.run([sys.executable, __file__, '--child', mode, '--schedule', schedule],
+                                    check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            table.add_row([mode, schedule, f"{result['extract_s']:.1f}", f"{result['parse_wall_s']:.1f}",
+                           f"{result['parse_tail_s']:.1f}", f"{result['transform_s']:.1f}",
+                           f"{result['load_s']:.1f}", f"{result['peak_rss_mb']:.0f}",
+                           f"{result['peak_rss_workers_mb']:.0f}"])
+    print(table)
@@ -1,8 +1,28 @@
 from KMLExtractor_Helper import KMLDataExtractor, KMLMappings
+from DataValidator_Helper import DataValidator, ValidationRules
+from Database_Helper import SQLitePublisher
+from FeatureStore_Helper import MonthlyFeatureBuilder
+from QuantileSketch_Helper import PriceSketches
+from Scheduler_Helper import TaskGraph
+from Checkpoint_Helper import RunCheckpoint
+from SourceCatalog_Helper import SourceCatalog
+from ChangeCapture_Helper import ChangeCapture
+from StarSchema_Helper import StarSchema
+from Canonicalizer_Helper import NameCanonicalizer
+from Profiling_Helper import StageProfiler, profiled
 import pandas as pd
+import requests
 import sqlite3
+import asyncio
+import argparse
+import threading
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import aiohttp
+from io import StringIO, BytesIO
 from pathlib import Path
 from datetime import datetime
+from uuid import uuid4
 
 class Pipeline:
     """
@@ -10,53 +30,63 @@ class Pipeline:
         related to housing and tourism into a SQLite database. The pipeline integrates sales, rents, 
         and tourism data, applying transformations to standardize and clean the data before saving it.
 
+        The datasets of a city (KML layers per year and tourism CSVs) are read from the source catalog 
+        ('sources.json' by default); run_catalog runs many cities in parallel, one process per shard.
+
         Attributes:
             base_path (Path): Directory path for data storage.
+            city (str): City of the source catalog processed by this pipeline.
+            catalog (SourceCatalog): Declared datasets, URLs and mapping families.
+            arrow (bool): Keep the data in pyarrow-backed DataFrames from extraction to loading.
             database_name (Path): Path to the SQLite database file.
             sales_urls (dict): URLs for KML files containing sales data per year.
             rents_urls (dict): URLs for KML files containing rent data per year.
             sales_extractor (KMLDataExtractor): Extractor for sales data using year mappings.
             rents_extractor (KMLDataExtractor): Extractor for rents data using year mappings.
-            entry_colombians_foreigners_url (str): URL for monthly entry data of Colombians and foreigners.
-            foreigners_country_origin_url (str): URL for data on foreigners by country of origin.
-            colombians_city_origin_url (str): URL for data on Colombians by city of origin.
+            entry_colombians_foreigners_url (str): URL for monthly entry data of Colombians and foreigners (None if not cataloged).
+            foreigners_country_origin_url (str): URL for data on foreigners by country of origin (None if not cataloged).
+            colombians_city_origin_url (str): URL for data on Colombians by city of origin (None if not cataloged).
+            validator (DataValidator): Rule engine that quarantines invalid rows during transformation.
+            canonicalizer (NameCanonicalizer): Maps the spellings of 'Barrio', 'Predio' and 'Origin' to 
+                canonical names using the alias dictionary persisted in '../data/canonical_aliases.json'.
+            publisher (SQLitePublisher): Stages the load and atomically publishes the database file.
+            feature_builder (MonthlyFeatureBuilder): Builds the monthly aligned feature table.
+            price_sketches (PriceSketches): Builds the mergeable price quantile sketches per 
+                (Research, Neighborhood, Stratum, Period).
+            runs_path (Path): Directory holding one checkpoint directory per task-graph run.
+            run_id (str): Identifier of this pipeline run, recorded in the '_pipeline_runs' table.
+            profiler (StageProfiler): Opt-in per-stage profiler (profile argument, --profile or the 
+                PIPELINE_PROFILE environment variable) writing into runs/<run_id>/profiles.
+            star_schema (StarSchema): Writes the output tables as integer fact tables with dimension tables 
+                and compatibility views (None for plain tables).
         """
         
-    def __init__(self):
+    def __init__(self, city='Medellin', catalog_path=None, database_name=None, arrow=False,
+                 profile=None, profile_interval=None, star_schema=False):
         self.base_path = Path('../data') # Target directory
         self.base_path.mkdir(parents=True, exist_ok=True)
-        self.database_name = self.base_path / 'Housing_Tourism_Data.sqlite'
-        self.sales_urls = {
-            2011: "https://www.google.com/maps/d/kml?mid=1o-MfPNEPgt7FFjuk7bR1WC8DGN5mwkgf&resourcekey&forcekml=1",
-            2012: "https://www.google.com/maps/d/kml?mid=1Vqq1_g9nCJ969sN-v4S7RNRkCXXTUK0r&resourcekey&forcekml=1",
-            2013: "https://www.google.com/maps/d/kml?mid=14FYOHIyYMj365G1mMuGk0Az2YqncYySZ&resourcekey&forcekml=1",
-            2014: "https://www.google.com/maps/d/kml?mid=1uBZjSi53_njkmAvXlVr2Q6Ynlt04s15i&resourcekey&forcekml=1",
-            2015: "https://www.google.com/maps/d/kml?mid=1t1QNWWZjkvRKG0zEtjNRILNzGfrk896M&resourcekey&forcekml=1",
-            2016: "https://www.google.com/maps/d/kml?mid=1Vmf5hKsaFQlo94BNYZ5vv5cattIIipq8&resourcekey&forcekml=1",
-            2017: "https://www.google.com/maps/d/kml?mid=1ImJDRhXErEbezl5PXilxV3FXyNovW0Rb&resourcekey&forcekml=1",
-            2018: "https://www.google.com/maps/d/kml?mid=1T9jpU6erir832dc2X_ljBgHOhveE3Zwy&resourcekey&forcekml=1",
-            2019: "https://www.google.com/maps/d/kml?mid=1YVqcLo3KcaN9Ujou77FKqyhpOhy92fg&resourcekey&forcekml=1",
-            2020: "https://www.google.com/maps/d/kml?mid=1X1bAtSD5S1M0fxif3RWBNz-ju2q6HfU&resourcekey&forcekml=1",
-            2021: "https://www.google.com/maps/d/kml?mid=1dvXgm6Xb_hHjsVqhh6FWcZuq1g1pjTI&resourcekey&forcekml=1"
-        }
-        self.rents_urls = {
-            2011: "https://www.google.com/maps/d/kml?mid=1hx3Ita6dQP3XhOs4H_-bqLxPgeAS76hQ&resourcekey&forcekml=1",
-            2012: "https://www.google.com/maps/d/kml?mid=1i14McURm1oNP1HsZ9TxuMgQcOf5xndl2&resourcekey&forcekml=1",
-            2013: "https://www.google.com/maps/d/kml?mid=11OVliCLwxfpuT4M0M1TREbqGFwN5XB6C&resourcekey&forcekml=1",
-            2014: "https://www.google.com/maps/d/kml?mid=1NzdDw2en09GQGYpZCM1B9EDDTOOOYzeb&resourcekey&forcekml=1",
-            2015: "https://www.google.com/maps/d/kml?mid=1VjJslKQ9xtXJHHQ9PYew_gDvy0kovaDS&resourcekey&forcekml=1",
-            2016: "https://www.google.com/maps/d/kml?mid=1okB4ruto0NlDy-sYKdGg5py8zLn0U-QM&resourcekey&forcekml=1",
-            2017: "https://www.google.com/maps/d/kml?mid=1pQVhOAY7_5XMLgDOISpgI1hZrS5vToMF&resourcekey&forcekml=1",
-            2018: "https://www.google.com/maps/d/kml?mid=1lRnic0sQSU_BpdtcPOBJ4UD3ctgk8hSp&resourcekey&forcekml=1",
-            2019: "https://www.google.com/maps/d/kml?mid=1y6Gj9EvlMyRfdSRjc21tWJEEa41gr9E&resourcekey&forcekml=1",
-            2020: "https://www.google.com/maps/d/kml?mid=1iMEcsfAfac13-MwCDJdCCoazDbQQhvQ&resourcekey&forcekml=1",
-            2021: "https://www.google.com/maps/d/kml?mid=1RJNbIHsnWIcaS4uyb4hCCGjGypME59M&resourcekey&forcekml=1"
-        }
-        self.sales_extractor = KMLDataExtractor(KMLMappings.sales_year_mappings)
-        self.rents_extractor = KMLDataExtractor(KMLMappings.rents_year_mappings)
-        self.entry_colombians_foreigners_url = 'https://medata.gov.co/sites/default/files/distribution/1-010-04-000188/ingreso_mensual_de_extranjeros_y_colombianos_por_punto_migratorio_jose_maria_cordova.csv'
-        self.foreigners_country_origin_url = 'https://medata.gov.co/sites/default/files/distribution/1-010-04-000194/llegada_mensual_de_extranjeros_por_pais_de_residencia_por_punto_migratorio.csv'
-        self.colombians_city_origin_url = 'https://medata.gov.co/sites/default/files/distribution/1-010-04-000196/llegada_pasajeros_mensual_por_aeropuerto_de_origen_nacional.csv'
+        self.database_name = Path(database_name) if database_name else self.base_path / 'Housing_Tourism_Data.sqlite'
+        self.publisher = SQLitePublisher(self.database_name)
+        self.runs_path = self.base_path / 'runs'
+        self.feature_builder = MonthlyFeatureBuilder()
+        self.price_sketches = PriceSketches()
+        self.run_id = f"{datetime.now():%Y%m%dT%H%M%S}-{uuid4().hex[:8]}"
+        self.profiler = StageProfiler.from_env(self.runs_path / self.run_id / 'profiles', profile, profile_interval)
+        self.city = city
+        self.arrow = arrow
+        self.catalog = SourceCatalog.load(catalog_path or Path(__file__).with_name('sources.json'))
+        self.sales_urls = self.catalog.kml_urls(city, "sales")
+        self.rents_urls = self.catalog.kml_urls(city, "rents")
+        self.sales_extractor = KMLDataExtractor(self.catalog.kml_mappings(city, "sales"), arrow=arrow)
+        self.rents_extractor = KMLDataExtractor(self.catalog.kml_mappings(city, "rents"), arrow=arrow)
+        self.sales_extractor.profiler = self.profiler
+        self.rents_extractor.profiler = self.profiler
+        self.entry_colombians_foreigners_url = self.catalog.csv_url(city, "tourism_1")
+        self.foreigners_country_origin_url = self.catalog.csv_url(city, "foreigners")
+        self.colombians_city_origin_url = self.catalog.csv_url(city, "colombians")
+        self.validator = DataValidator()
+        self.canonicalizer = NameCanonicalizer(self.base_path / 'canonical_aliases.json')
+        self.star_schema = StarSchema() if star_schema else None
 
     
     def _download_csv(self, url, retries=3, timeout=10):
@@ -74,7 +104,17 @@ class Pipeline:
                     print(f"Failed to download after {retries} attempts. Skipping URL: {url}")
                     return pd.DataFrame()  # Return an empty DataFrame if all attempts fail
                 
+
+
+    def _read_csv_source(self, url):
+        # Cities without a cataloged tourism dataset get an empty frame
+        if not url:
+            return pd.DataFrame()
+        if self.arrow:
+            return pd.read_csv(url, engine='pyarrow', dtype_backend='pyarrow')
+        return pd.read_csv(url)
                 
+    @profiled("extract_data")
     def extract_data(self):
         """
         Extracts data from multiple sources, including sales and rent KML files, and CSV files 
@@ -95,9 +135,9 @@ class Pipeline:
         rents_data = self.rents_extractor.process_multiple_years(self.rents_urls)
 
         # Extract tourism datasets
-        tourism_1 = pd.read_csv(self.entry_colombians_foreigners_url)
-        foreigners = pd.read_csv(self.foreigners_country_origin_url)
-        colombians = pd.read_csv(self.colombians_city_origin_url)
+        tourism_1 = self._read_csv_source(self.entry_colombians_foreigners_url)
+        foreigners = self._read_csv_source(self.foreigners_country_origin_url)
+        colombians = self._read_csv_source(self.colombians_city_origin_url)
 
         print("[SUCCESS] Data extraction completed [1/3]")
         print("------------------------------------------------------------\n")
@@ -109,11 +149,97 @@ class Pipeline:
             "colombians": colombians
         }
 
+
+    async def _download_csv_async(self, session, semaphore, url, deadline):
+        # The deadline starts once a download slot is free, so queued sources do not time out unread
+        async def _download():
+            async with session.get(url) as response:
+                response.raise_for_status()
+                return await response.text()
+
+        async with semaphore:
+            content = await asyncio.wait_for(_download(), timeout=deadline)
+        return pd.read_csv(StringIO(content))
+
+    async def extract_data_async(self, concurrency=8, source_deadline=120, total_deadline=None):
+        """
+        Async counterpart of extract_data, meant to be awaited from an existing event loop. All sources 
+        share one HTTP session and a semaphore limiting the number of concurrent downloads. Every source 
+        is cancelled when it exceeds source_deadline seconds, counted from the moment it gets a download 
+        slot, and sources still running when total_deadline expires are cancelled as stragglers; every 
+        KML year is its own source, so the years finished before the total deadline are kept. Failed 
+        sources do not abort the run.
+
+        Args:
+            concurrency (int): Maximum number of simultaneous downloads.
+            source_deadline (float): Deadline in seconds for each source (download + parse), not counting 
+                the wait for a download slot.
+            total_deadline (float, optional): Deadline in seconds for the whole extraction.
+
+        Returns:
+            dict: The same datasets as extract_data (empty DataFrames for missing sources), plus:
+                - "status": dict mapping each source (e.g. "sales_2015", "tourism_1") to "ok", 
+                  "empty", "timeout", "cancelled" or "failed: <error>".
+        """
+        print("Extracting data from all sources (async)...")
+        semaphore = asyncio.Semaphore(concurrency)
+        csv_urls = {
+            "tourism_1": self.entry_colombians_foreigners_url,
+            "foreigners": self.foreigners_country_origin_url,
+            "colombians": self.colombians_city_origin_url
+        }
+
+        async with aiohttp.ClientSession() as session:
+            # The KML tasks apply total_deadline to each year themselves and keep the finished years
+            tasks = {
+                "sales_data": asyncio.create_task(self.sales_extractor.process_multiple_years_async(
+                    self.sales_urls, session, semaphore, source_deadline, total_deadline)),
+                "rents_data": asyncio.create_task(self.rents_extractor.process_multiple_years_async(
+                    self.rents_urls, session, semaphore, source_deadline, total_deadline)),
+            }
+            csv_tasks = [asyncio.create_task(self._download_csv_async(session, semaphore, url, source_deadline))
+                         for url in csv_urls.values()]
+            tasks.update(zip(csv_urls, csv_tasks))
+
+            done, pending = await asyncio.wait(csv_tasks, timeout=total_deadline)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, tasks["sales_data"], tasks["rents_data"], return_exceptions=True)
+
+        data, status = {}, {}
+        for name, task in tasks.items():
+            prefix = name.split("_")[0]
+            if task in pending:
+                data[name] = pd.DataFrame()
+                status[name] = "cancelled"
+            elif name.endswith("_data") and task.exception() is not None:
+                data[name] = pd.DataFrame()
+                status[prefix] = f"failed: {task.exception()}"
+                print(f"Failed to extract the {prefix} layers: {task.exception()}")
+            elif name.endswith("_data"):
+                df, year_status = task.result()
+                data[name] = df
+                status.update({f"{prefix}_{year}": value for year, value in year_status.items()})
+            elif task.exception() is not None:
+                error = task.exception()
+                data[name] = pd.DataFrame()
+                status[name] = "timeout" if isinstance(error, asyncio.TimeoutError) else f"failed: {error}"
+                print(f"Failed to download CSV for '{name}': {status[name]}")
+            else:
+                data[name] = task.result()
+                status[name] = "ok"
+
+        print(f"[SUCCESS] Data extraction completed [1/3] ({sum(v == 'ok' for v in status.values())}/{len(status)} sources ok)")
+        print("------------------------------------------------------------\n")
+        data["status"] = status
+        return data
     
     def transform_data(self, data):
         """
         Transforms the extracted datasets by cleaning, standardizing, and applying domain-specific 
-        transformations. Combines and prepares data for further analysis and loading.
+        transformations. Combines and prepares data for further analysis and loading. Each transformed 
+        dataset is then validated against its rule set in ValidationRules; failing rows are kept in 
+        self.validator.quarantine instead of being silently dropped.
 
         Args:
             data (dict): A dictionary containing extracted datasets.
@@ -123,48 +249,62 @@ class Pipeline:
                 - "sales_rents": Combined and cleaned sales and rents data.
                 - "tourism_1": Transformed data for monthly entries of Colombians and foreigners.
                 - "tourism_2": Combined and cleaned data for monthly passengers with city/country of origin.
+                - "monthly_features": Monthly aligned tourism and housing features keyed by Month_Index.
+                - "price_sketches": t-digest centroids of the prices per (Research, Neighborhood, Stratum, Period).
         """
         
         print("Transforming all datasets...")
         sales_rents_data = self._transform_sales_rents_data(data["sales_data"], data["rents_data"])
-        tourism_data_1 = self._transform_tourism_data_1(data["tourism_1"])
-        tourism_data_2 = self._transform_tourism_data_2(data["foreigners"], data["colombians"])
+        tourism_data_1 = self._transform_tourism_data_1(data["tourism_1"]) if not data["tourism_1"].empty else None
+        tourism_data_2 = (self._transform_tourism_data_2(data["foreigners"], data["colombians"])
+                          if not (data["foreigners"].empty or data["colombians"].empty) else None)
+
+        sales_rents_data = self.validator.validate("sales_rents", sales_rents_data, ValidationRules.sales_rents_rules)
+        tourism_data_1 = self.validator.validate("tourism_1", tourism_data_1, ValidationRules.tourism_1_rules)
+        tourism_data_2 = self.validator.validate("tourism_2", tourism_data_2, ValidationRules.tourism_2_rules)
+
+        monthly_features = self.feature_builder.build(sales_rents_data, tourism_data_1, tourism_data_2)
+        price_sketches = self.price_sketches.build(sales_rents_data)
 
         print("[SUCCESS] Data transformation completed [2/3]")
         print("------------------------------------------------------------\n")
         return {
             "sales_rents": sales_rents_data,
             "tourism_1": tourism_data_1,
-            "tourism_2": tourism_data_2
+            "tourism_2": tourism_data_2,
+            "monthly_features": monthly_features,
+            "price_sketches": price_sketches
         }
 
+    @profiled("_transform_sales_rents_data")
     def _transform_sales_rents_data(self, sales_data, rents_data):
-        if sales_data.empty or rents_data.empty:
+        if sales_data.empty and rents_data.empty:
             print("No sales or rents data to transform.")
             return None
 
-        unified_data = pd.concat([sales_data, rents_data], ignore_index=True)
-
-        # Filtering rows where 'Predio' starts with specific keywords
-        filtered_data = unified_data[unified_data['Predio'].str.startswith(('APARTAMENTO', 'CASA'), na=False)].copy()
+        unified_data = self.sales_extractor.concat([df for df in (sales_data, rents_data) if not df.empty])
+        return self._transform_kml_data(unified_data)
 
-        # Formatting the 'Fecha' column
-        filtered_data['Fecha'] = filtered_data['Fecha'].apply(self._format_fecha)
+    def _transform_kml_data(self, unified_data):
+        # Spellings vary across the yearly layers; canonical names keep e.g. 'Apartamento' in the filter below
+        # and one group per neighborhood
+        unified_data = self.canonicalizer.canonicalize(unified_data, 'Predio')
+        unified_data = self.canonicalizer.canonicalize(unified_data, 'Barrio')
 
-        # Cleaning 'Valor Comercial'
-        filtered_data['Valor Comercial'] = filtered_data.apply(
-            lambda row: self._clean_valor_comercial(row['Valor Comercial'], row['Valor M2']), axis=1)
+        # Filtering rows where 'Predio' starts with specific keywords and formatting the 'Fecha' column
+        # (assign returns a new frame, so the columns below are not written into a slice of unified_data)
+        filtered_data = unified_data[unified_data['Predio'].str.startswith(('APARTAMENTO', 'CASA'), na=False)]
+        filtered_data = filtered_data.assign(Fecha=filtered_data['Fecha'].apply(self._format_fecha))
 
-        # Converting columns to numeric
+        # 'Valor Comercial', 'Valor M2' and the areas are parsed per year by KMLDataExtractor
         filtered_data['Area Privada'] = pd.to_numeric(filtered_data['Area Privada'], errors='coerce')
         filtered_data['Valor M2'] = pd.to_numeric(filtered_data['Valor M2'], errors='coerce')
         filtered_data['Area Lote'] = pd.to_numeric(filtered_data['Area Lote'], errors='coerce')
+        filtered_data['Valor Comercial'] = pd.to_numeric(filtered_data['Valor Comercial'], errors='coerce')
 
         # Filling missing 'Valor M2' values
-        filtered_data['Valor M2'] = filtered_data.apply(
-            lambda row: row['Valor Comercial'] / row['Area Privada'] if pd.isna(row['Valor M2']) and row['Area Privada'] > 0 else row['Valor M2'],
-            axis=1
-        )
+        private_area = filtered_data['Area Privada'].where(filtered_data['Area Privada'] > 0)
+        filtered_data['Valor M2'] = filtered_data['Valor M2'].fillna(filtered_data['Valor Comercial'] / private_area)
         
         # Round 'Valor Comercial', 'Area Lote' and 'Valor M2' to integers
         filtered_data['Valor Comercial'] = filtered_data['Valor Comercial'].round().astype('Int64')
@@ -172,7 +312,7 @@ class Pipeline:
         filtered_data['Area Lote'] = filtered_data['Area Lote'].fillna(0).round().astype('Int32')
         
         # Rename column headers from Spanish to English
-        filtered_data.rename(columns={
+        filtered_data = filtered_data.rename(columns={
             "Fecha": "Period",
             "Investigacion": "Research",
             "Predio": "Property",
@@ -185,19 +325,25 @@ class Pipeline:
             "Valor M2": "Price_per_m2_COP",
             "Longitude": "Longitude",
             "Latitude": "Latitude"
-        }, inplace=True)
-        
+        })
+
+        if self.arrow:
+            # Repetitive text columns become pandas categories (codes + categories). This is not an Arrow
+            # dictionary array and it converts the column: pandas groupby(dropna=False) returns wrong
+            # groups on dictionary-typed ArrowDtype columns with missing values
+            for column in ("Research", "Property", "Condition", "Neighborhood"):
+                filtered_data[column] = filtered_data[column].astype('category')
         
         return filtered_data
 
+    @profiled("_transform_tourism_data_1")
     def _transform_tourism_data_1(self, tourism_1):
         # Dropping and renaming columns
-        tourism_1.drop(columns=['ing_indic'], inplace=True, errors='ignore')
-        tourism_1.rename(columns={
+        tourism_1 = tourism_1.drop(columns=['ing_indic'], errors='ignore').rename(columns={
             'ing_nacionalidad': 'Nationality',
             'ing_periodo': 'Period',
             'ing_valor': 'Number'
-        }, inplace=True)
+        })
 
         # Formatting and filtering
         tourism_1['Period'] = tourism_1['Period'].astype(str).apply(lambda x: f"{x[:4]}.{x[4:]}")
@@ -206,28 +352,27 @@ class Pipeline:
 
         return tourism_1
 
+    @profiled("_transform_tourism_data_2")
     def _transform_tourism_data_2(self, foreigners, colombians):
         # Transform foreigners data
-        foreigners.drop(columns=['lle_indicador'], inplace=True, errors='ignore')
-        foreigners.rename(columns={
+        foreigners = foreigners.drop(columns=['lle_indicador'], errors='ignore').rename(columns={
             'lle_codigo': 'Code',
             'lle_origenpax': 'Origin',
             'lle_periodo': 'Period',
             'lle_valor': 'Number'
-        }, inplace=True)
+        })
         foreigners['Nationality'] = "Extranjero"
         foreigners['Period'] = foreigners['Period'].astype(str).apply(lambda x: f"{x[:4]}.{x[4:]}")
         foreigners['Period_numeric'] = foreigners['Period'].apply(lambda x: float(x[:4]))
         foreigners = foreigners[foreigners['Period_numeric'] >= 2011].drop(columns=['Period_numeric'])
 
         # Transform Colombians data
-        colombians.drop(columns=['lle_indicador'], inplace=True, errors='ignore')
-        colombians.rename(columns={
+        colombians = colombians.drop(columns=['lle_indicador'], errors='ignore').rename(columns={
             'lle_codigo': 'Code',
             'lle_llegadanal': 'Origin',
             'lle_periodo': 'Period',
             'lle_valor': 'Number'
-        }, inplace=True)
+        })
         colombians['Nationality'] = "Colombiano"
         colombians['Period'] = colombians['Period'].astype(str).apply(lambda x: f"{x[:4]}.{x[4:]}")
         colombians['Period_numeric'] = colombians['Period'].apply(lambda x: float(x[:4]))
@@ -235,14 +380,11 @@ class Pipeline:
         colombians['Code'] = "CO"
 
         # Combine both datasets
-        combined_data = pd.concat([foreigners, colombians], ignore_index=True)   
-        # Delete rows with specific values in the "Origin" column
-        combined_data = combined_data[~combined_data['Origin'].isin(["Acuerdo internacional", "Inconsistencia"])]
-        # Delete rows with "Number" < 0 (passengers is always positive quantity)
-        combined_data = combined_data[combined_data['Number'] >= 0]
-        # Delete rows where "Code" does not match exactly two capital letters
+        combined_data = pd.concat([foreigners, colombians], ignore_index=True)
+        combined_data = self.canonicalizer.canonicalize(combined_data, 'Origin')
+        # Placeholder origins, negative passenger counts and malformed codes are rejected
+        # by ValidationRules.tourism_2_rules in transform_data
         combined_data['Code'] = combined_data['Code'].astype(str)
-        combined_data = combined_data[combined_data['Code'].str.match(r'^[A-Z]{2}$')]
         
         return combined_data
 
@@ -257,20 +399,19 @@ class Pipeline:
                 return fecha
         return date_obj.strftime('%Y.%m')
 
-    @staticmethod
-    def _clean_valor_comercial(valor, valor_m2):
-        if pd.isna(valor):
-            return None
-        if pd.isna(valor_m2):
-            valor = valor.replace('.', '').replace(',', '.')
-        elif ',' in valor:
-            valor = valor.replace(',', '')
-        return float(valor)
-
+    @profiled("save_data_to_sqlite")
     def save_data_to_sqlite(self, data):
         """
         Saves the transformed datasets to an SQLite database. Each dataset is stored as a separate 
-        table, with existing tables being replaced.
+        table, with existing tables being replaced. Rows quarantined during validation are stored in 
+        'quarantine_<dataset>' side tables and the per-rule counts in '_validation_stats'. Pending 
+        fuzzy-match suggestions of the canonical name dictionary are listed in '_canonical_suggestions', 
+        and the dictionary is saved once the load is published. The run ID is appended to '_pipeline_runs' so that readers can detect a new load, and the rows inserted, deleted 
+        or updated since the previous run of each table are appended to '_changes' with the run ID. 
+        Parse-quality and throughput metrics of every KML source are appended to '_run_metrics'.
+
+        The load is written to a staging database and then published (ANALYZE, VACUUM INTO a fresh 
+        file and atomic rename), so readers using connect_readonly never see a half-written load.
 
         Args:
             data (dict): A dictionary containing transformed datasets, where keys are table names 
@@ -280,13 +421,68 @@ class Pipeline:
             Success messages indicating data has been saved to the database.
         """
         
-        with sqlite3.connect(self.database_name) as conn:
-            for table_name, df in data.items():
-                if df is not None and not df.empty:
+        conn = self.publisher.open_staging()
+        try:
+            self._write_tables(conn, data)
+            self._write_load_metadata(conn, data)
+        except Exception:
+            conn.close()
+            raise
+        self.publisher.publish(conn)
+        self.canonicalizer.save()
+        print("[SUCCESS] Data loading completed [3/3]")
+        print("------------------------------------------------------------\n")
+
+    def _write_tables(self, conn, data):
+        for table_name, df in data.items():
+            if df is not None and not df.empty:
+                previous = self._read_previous_table(conn, table_name)
+                if self.star_schema is not None and table_name in StarSchema.facts:
+                    self.star_schema.write(conn, table_name, df)
+                else:
+                    StarSchema.drop_view(conn, table_name)
                     df.to_sql(table_name, conn, index=False, if_exists='replace')
                     print(f"Saving data to table '{table_name}' in {self.database_name}.")
-            print("[SUCCESS] Data loading completed [3/3]")
-            print("------------------------------------------------------------\n")
+                if previous is not None:
+                    changes = ChangeCapture.diff(table_name, previous, df, self.run_id)
+                    changes.to_sql("_changes", conn, index=False, if_exists='append')
+
+    @staticmethod
+    def _read_previous_table(conn, table_name):
+        # The staging database starts as a copy of the published one, so this is the previous run's version
+        # (a table, or the compatibility view of a star-schema load)
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type IN ('table', 'view') AND name = ?", (table_name,)).fetchone()
+        if not exists:
+            return None
+        return pd.read_sql_query(f'SELECT * FROM "{table_name}"', conn)
+
+    def _write_load_metadata(self, conn, data):
+        for dataset, quarantined in self.validator.quarantine.items():
+            quarantined.to_sql(f"quarantine_{dataset}", conn, index=False, if_exists='replace')
+        self.validator.report().to_sql("_validation_stats", conn, index=False, if_exists='replace')
+        self.canonicalizer.report().to_sql("_canonical_suggestions", conn, index=False, if_exists='replace')
+        pd.DataFrame([{
+            "Run_ID": self.run_id,
+            "Finished_At": datetime.now().isoformat(timespec='seconds'),
+            "Tables": ",".join(name for name, df in data.items() if df is not None and not df.empty)
+        }]).to_sql("_pipeline_runs", conn, index=False, if_exists='append')
+        metrics = self._run_metrics()
+        if not metrics.empty:
+            # Tables written by older runs may lack a metric column
+            existing = {row[1] for row in conn.execute('PRAGMA table_info("_run_metrics")')}
+            for column in (c for c in metrics.columns if existing and c not in existing):
+                conn.execute(f'ALTER TABLE "_run_metrics" ADD COLUMN "{column}"')
+            metrics.to_sql("_run_metrics", conn, index=False, if_exists='append')
+        conn.commit()
+
+    def _run_metrics(self):
+        # One row per KML source of this run, see KMLDataExtractor.metrics; the columns are always
+        # KMLDataExtractor.metric_columns, whichever sources succeeded
+        rows = []
+        for kind, extractor in (("sales", self.sales_extractor), ("rents", self.rents_extractor)):
+            for year, metrics in sorted(extractor.metrics.items()):
+                rows.append({"Run_ID": self.run_id, "Source": f"{kind}_{year}", **metrics})
+        return pd.DataFrame(rows).reindex(columns=["Run_ID", "Source"] + KMLDataExtractor.metric_columns)
 
     def run_pipeline(self):
         # Extract data
@@ -299,10 +495,274 @@ class Pipeline:
         self.save_data_to_sqlite({
             "sales_rents_2011_2021": transformed_data["sales_rents"],
             "monthly_entry_colombians_foreigners": transformed_data["tourism_1"],
-            "monthly_passengers_origin": transformed_data["tourism_2"]
+            "monthly_passengers_origin": transformed_data["tourism_2"],
+            "monthly_features": transformed_data["monthly_features"],
+            "price_sketches": transformed_data["price_sketches"]
         })
 
+    def _fetch_payload(self, url, retries=3, timeout=30):
+        """Download a raw payload with retry logic, raising the last error if all attempts fail."""
+        for attempt in range(retries):
+            try:
+                response = requests.get(url, timeout=timeout)
+                response.raise_for_status()
+                return response.content
+            except requests.exceptions.RequestException as e:
+                print(f"Attempt {attempt + 1}/{retries} failed for URL: {url} | Error: {e}")
+                if attempt == retries - 1:
+                    raise
 
-if __name__ == '__main__':
-    pipeline = Pipeline()
+    def run_pipeline_dag(self, max_workers=8, resume_from=None):
+        """
+        Runs the pipeline as a task graph instead of three global stages. Every KML year and every 
+        tourism CSV is its own extract -> parse -> transform chain, each output table is loaded as soon 
+        as the chains it depends on are done, and the database is published once all loads finished. 
+        Downloads (I/O) and parsing/transforming (CPU) of different sources therefore overlap, and the 
+        critical path is the slowest single source instead of the sum of all sources.
+
+        The raw payload, parsed frame and transformed frame of every source are checkpointed with their 
+        status in runs/<run_id>/. A failed source makes the run stop before publishing; resuming the run 
+        restores every successful checkpoint and only retries the sources that failed.
+
+        Args:
+            max_workers (int): Size of the worker pool executing the tasks.
+            resume_from (Path, optional): Run directory of a previous run to resume.
+
+        Returns:
+            TaskGraph: The executed graph, with per-task status and durations.
+        """
+        if resume_from is not None:
+            self.run_id = Path(resume_from).name
+            self.profiler.output_dir = self.runs_path / self.run_id / 'profiles'
+            print(f"Resuming run {self.run_id}...")
+        checkpoint = RunCheckpoint(self.runs_path / self.run_id)
+
+        graph = TaskGraph()
+        conn = self.publisher.open_staging(check_same_thread=False)
+        load_lock = threading.Lock()
+        loaded = {}
+
+        def load(table_name):
+            def _load(df):
+                with load_lock:
+                    self._write_tables(conn, {table_name: df})
+                    loaded[table_name] = df
+            return _load
+
+        # One chain per KML source
+        kml_transforms = []
+        for kind, extractor, urls in (("sales", self.sales_extractor, self.sales_urls),
+                                      ("rents", self.rents_extractor, self.rents_urls)):
+            for year, url in urls.items():
+                if year not in extractor.year_mappings:
+                    print(f"Year {year} is not supported in year mappings.")
+                    continue
+                source = f"{kind}_{year}"
+                graph.add(f"extract:{source}", lambda url=url, extractor=extractor: extractor.fetch_kml(url),
+                          checkpoint=True)
+                graph.add(f"parse:{source}",
+                          lambda payload, year=year, extractor=extractor: extractor.process_payload(year, payload),
+                          [f"extract:{source}"], checkpoint=True)
+                kml_transforms.append(graph.add(
+                    f"transform:{source}",
+                    lambda df: self._transform_kml_data(df) if not df.empty else None,
+                    [f"parse:{source}"], checkpoint=True
+                ))
+
+        def combine_sales_rents(*frames):
+            frames = [df for df in frames if df is not None and not df.empty]
+            if not frames:
+                print("No sales or rents data to transform.")
+                return None
+            combined = self.sales_extractor.concat(frames)
+            return self.validator.validate("sales_rents", combined, ValidationRules.sales_rents_rules)
+
+        # Validation is cheap and records the quarantine of this run, so it is never restored
+        graph.add("validate:sales_rents", combine_sales_rents, kml_transforms)
+
+        # One chain per tourism CSV
+        csv_urls = {
+            "tourism_1": self.entry_colombians_foreigners_url,
+            "foreigners": self.foreigners_country_origin_url,
+            "colombians": self.colombians_city_origin_url
+        }
+        for source, url in csv_urls.items():
+            if url:
+                graph.add(f"extract:{source}", lambda url=url: self._fetch_payload(url), checkpoint=True)
+                graph.add(f"parse:{source}", lambda payload: self._read_csv_source(BytesIO(payload)), [f"extract:{source}"], checkpoint=True)
+            else:
+                graph.add(f"parse:{source}", lambda: pd.DataFrame())
+        graph.add("transform:tourism_1", lambda df: self._transform_tourism_data_1(df) if not df.empty else None,
+                  ["parse:tourism_1"], checkpoint=True)
+        graph.add("transform:tourism_2",
+                  lambda foreigners, colombians: (self._transform_tourism_data_2(foreigners, colombians)
+                                                  if not (foreigners.empty or colombians.empty) else None),
+                  ["parse:foreigners", "parse:colombians"], checkpoint=True)
+        graph.add("validate:tourism_1", lambda df: self.validator.validate(
+            "tourism_1", df, ValidationRules.tourism_1_rules), ["transform:tourism_1"])
+        graph.add("validate:tourism_2", lambda df: self.validator.validate(
+            "tourism_2", df, ValidationRules.tourism_2_rules), ["transform:tourism_2"])
+        graph.add("transform:monthly_features", self.feature_builder.build,
+                  ["validate:sales_rents", "validate:tourism_1", "validate:tourism_2"])
+        graph.add("transform:price_sketches", self.price_sketches.build, ["validate:sales_rents"])
+
+        # Loads and publish
+        loads = [
+            graph.add("load:sales_rents_2011_2021", load("sales_rents_2011_2021"), ["validate:sales_rents"]),
+            graph.add("load:monthly_entry_colombians_foreigners", load("monthly_entry_colombians_foreigners"), ["validate:tourism_1"]),
+            graph.add("load:monthly_passengers_origin", load("monthly_passengers_origin"), ["validate:tourism_2"]),
+            graph.add("load:monthly_features", load("monthly_features"), ["transform:monthly_features"]),
+            graph.add("load:price_sketches", load("price_sketches"), ["transform:price_sketches"]),
+        ]
+
+        try:
+            graph.run(max_workers=max_workers, checkpoint=checkpoint)
+            failed = [name for name, status in graph.status.items() if status != "ok"]
+            if failed:
+                raise RuntimeError(f"Pipeline tasks did not succeed: {failed}. "
+                                   f"Retry them with: python pipeline.py --resume {self.run_id}")
+            self._write_load_metadata(conn, loaded)
+        except Exception:
+            conn.close()
+            raise
+        self.publisher.publish(conn)
+        self.canonicalizer.save()
+
+        critical = max(graph.durations, key=graph.durations.get)
+        print(f"[SUCCESS] Task graph completed: {len(graph.tasks)} tasks, {len(loads)} tables loaded "
+              f"(slowest task '{critical}' took {graph.durations[critical]:.1f}s)")
+        print("------------------------------------------------------------\n")
+        return graph
+
+def _run_city_shard(city, catalog_path, shards_path):
+    # Runs in a worker process: one city, one shard database
+    pipeline = Pipeline(city=city, catalog_path=catalog_path, database_name=Path(shards_path) / f"{city}.sqlite")
+    # The shards already use one process each; their KML layers are parsed in process
+    pipeline.sales_extractor.parse_processes = pipeline.rents_extractor.parse_processes = 1
     pipeline.run_pipeline()
+    return city, pipeline.database_name
+
+
+def merge_shards(shard_databases, database_name):
+    """
+    Combines the shard databases written by run_catalog into one database. Tables with the same name 
+    are concatenated across shards with a leading 'City' column; the result is published atomically.
+
+    Args:
+        shard_databases (dict): Mapping of city to the path of its shard database.
+        database_name (Path): Path of the merged database.
+    """
+    tables = {}
+    for city, shard in shard_databases.items():
+        conn = sqlite3.connect(shard)
+        try:
+            # Star-schema shards are merged through their views, since surrogate keys differ per shard
+            names = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%'")]
+            for name in (name for name in names if name not in StarSchema.internal_tables()):
+                df = pd.read_sql_query(f'SELECT * FROM "{name}"', conn)
+                df.insert(0, 'City', city)
+                tables.setdefault(name, []).append(df)
+        finally:
+            conn.close()
+
+    publisher = SQLitePublisher(database_name)
+    conn = publisher.open_staging()
+    try:
+        for name, frames in tables.items():
+            pd.concat(frames, ignore_index=True).to_sql(name, conn, index=False, if_exists='replace')
+            print(f"Merged table '{name}' from {len(frames)} shards into {database_name}.")
+    except Exception:
+        conn.close()
+        raise
+    publisher.publish(conn)
+
+
+def run_catalog(catalog_path=None, cities=None, processes=None, database_name=None):
+    """
+    Runs the pipeline for many cities of the source catalog, one shard (city) per worker process. 
+    Each shard writes its own database under ../data/shards/, and the shards are merged at the end.
+
+    Args:
+        catalog_path (Path, optional): Source catalog; defaults to 'sources.json' next to this file.
+        cities (list, optional): Cities to process; defaults to every city of the catalog.
+        processes (int, optional): Number of worker processes; defaults to the number of CPUs.
+        database_name (Path, optional): Merged database; defaults to ../data/Housing_Tourism_Cities.sqlite.
+
+    Returns:
+        dict: Mapping of city to "ok" or "failed: <error>".
+    """
+    catalog_path = Path(catalog_path or Path(__file__).with_name('sources.json')).resolve()
+    cities = cities or SourceCatalog.load(catalog_path).cities()
+    shards_path = Path('../data') / 'shards'
+    shards_path.mkdir(parents=True, exist_ok=True)
+
+    status, shard_databases = {}, {}
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {executor.submit(_run_city_shard, city, catalog_path, shards_path): city for city in cities}
+        for future in as_completed(futures):
+            city = futures[future]
+            try:
+                _, shard_databases[city] = future.result()
+                status[city] = "ok"
+            except Exception as e:
+                status[city] = f"failed: {e}"
+                print(f"Shard for city '{city}' failed: {e}")
+
+    if shard_databases:
+        merge_shards(dict(sorted(shard_databases.items())),
+                     Path(database_name) if database_name else Path('../data') / 'Housing_Tourism_Cities.sqlite')
+    print(f"[SUCCESS] Catalog run completed: {sum(v == 'ok' for v in status.values())}/{len(status)} cities")
+    return status
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Housing and tourism data pipeline")
+    parser.add_argument('--dag', action='store_true', help="run the per-source task graph instead of the sequential stages")
+    parser.add_argument('--workers', type=int, default=8, help="worker pool size for --dag")
+    parser.add_argument('--resume', nargs='?', const='latest', metavar='RUN_ID',
+                        help="resume a checkpointed --dag run (default: the latest run) and retry only failed sources")
+    parser.add_argument('--city', default='Medellin', help="city of the source catalog to process")
+    parser.add_argument('--catalog', type=Path, default=None, help="source catalog file (default: sources.json)")
+    parser.add_argument('--all-cities', action='store_true',
+                        help="process every city of the catalog in parallel shards and merge them")
+    parser.add_argument('--processes', type=int, default=None, help="worker processes for --all-cities")
+    parser.add_argument('--arrow', action='store_true', help="use pyarrow-backed DataFrames through all stages")
+    parser.add_argument('--star-schema', action='store_true',
+                        help="load integer fact and dimension tables behind views with the usual table names")
+    parser.add_argument('--profile', nargs='?', const='all', choices=StageProfiler.MODES,
+                        help="write .pstats and collapsed-stack files per stage into the run directory; KML chunks "
+                             "parsed on the process pool are profiled in their workers and merged per year")
+    parser.add_argument('--profile-interval', type=float, default=None, help="sampling interval in seconds for --profile")
+    parser.add_argument('--preview', choices=['sales', 'rents'],
+                        help="preview the KML mapping of one kind on a few placemarks instead of running the pipeline")
+    parser.add_argument('--years', type=int, nargs='+', help="years to preview (default: all years of the kind)")
+    parser.add_argument('--rows', type=int, default=100, help="placemarks per year for --preview")
+    parser.add_argument('--reservoir', action='store_true', help="--preview a reservoir sample instead of the first rows")
+    parser.add_argument('--source', help="local KML file to --preview instead of the cataloged URL (one year only)")
+    args = parser.parse_args()
+
+    if args.preview:
+        pipeline = Pipeline(city=args.city, catalog_path=args.catalog)
+        extractor = pipeline.sales_extractor if args.preview == 'sales' else pipeline.rents_extractor
+        urls = pipeline.sales_urls if args.preview == 'sales' else pipeline.rents_urls
+        for year in args.years or sorted(urls):
+            extractor.preview(year, args.source or urls[year], rows=args.rows, reservoir=args.reservoir)
+        sys.exit(0)
+
+    if args.all_cities:
+        run_catalog(args.catalog, processes=args.processes)
+        sys.exit(0)
+
+    pipeline = Pipeline(city=args.city, catalog_path=args.catalog, arrow=args.arrow,
+                        profile=args.profile, profile_interval=args.profile_interval, star_schema=args.star_schema)
+    if args.resume:
+        run_dir = (RunCheckpoint.latest_run_dir(pipeline.runs_path) if args.resume == 'latest'
+                   else pipeline.runs_path / args.resume)
+        if run_dir is None or not run_dir.exists():
+            parser.error(f"No checkpointed run found for '{args.resume}' in {pipeline.runs_path}")
+        pipeline.run_pipeline_dag(max_workers=args.workers, resume_from=run_dir)
+    elif args.dag:
+        pipeline.run_pipeline_dag(max_workers=args.workers)
+    else:
+        pipeline.run_pipeline()
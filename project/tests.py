@@ -1,11 +1,37 @@
 import os
 import sys
+import asyncio
+import tempfile
 import unittest
 import sqlite3
+import subprocess
+import json
+import threading
+import time
+import pstats
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from pathlib import Path
 from io import StringIO
 from tqdm import tqdm
-from pipeline import Pipeline
+from pipeline import Pipeline, merge_shards
+from Database_Helper import connect_readonly
+from StarSchema_Helper import StarSchema
+from QueryService_Helper import HousingTourismQueries
+from LagAnalytics_Helper import LagRegressionAnalyzer
+from Canonicalizer_Helper import NameCanonicalizer, normalize_key
+from DataAPI_Helper import DataAPI
+from Scheduler_Helper import TaskGraph
+from Checkpoint_Helper import RunCheckpoint
+from SourceCatalog_Helper import SourceCatalog
+from ChangeCapture_Helper import ChangeCapture
+from NumericParser_Helper import NumberFormat, NumericColumnParser
+from Profiling_Helper import StageProfiler, profiled
+from FeatureStore_Helper import MonthlyFeatureBuilder
+from JayveeExecutor_Helper import JayveeExecutor, JayveeParser
+from KMLExtractor_Helper import KMLDataExtractor, KMLMappings
+import pandas as pd
+from aiohttp import web
 from sqlalchemy import create_engine, inspect
 from sqlalchemy.exc import OperationalError
 from sqlalchemy.sql import text
@@ -56,6 +82,8 @@ class PipelineAutomatedTesting(unittest.TestCase):
                         "sales_rents_2011_2021": transformed_data["sales_rents"],
                         "monthly_entry_colombians_foreigners": transformed_data["tourism_1"],
                         "monthly_passengers_origin": transformed_data["tourism_2"],
+                        "monthly_features": transformed_data["monthly_features"],
+                        "price_sketches": transformed_data["price_sketches"],
                     })
                     pbar.update(1)  # Loading completed
                 except Exception as e:
@@ -89,7 +117,7 @@ class PipelineAutomatedTesting(unittest.TestCase):
             Ensures the SQLite database was successfully created by the pipeline.
             - Verifies the existence of the database file.
         """
-        print("\n[1/6] Validating: SQLite database creation...")
+        print("\n[1/13] Validating: SQLite database creation...")
         self.assertTrue(os.path.exists(self.db_path), f"Database file '{self.db_path}' does not exist.")
 
     
@@ -98,7 +126,7 @@ class PipelineAutomatedTesting(unittest.TestCase):
             Ensures the SQLite database is valid and can be connected.
         """
         try:
-            print("[2/6] Validating: SQLite database is valid...")
+            print("[2/13] Validating: SQLite database is valid...")
             with sqlite3.connect(self.db_path) as conn:
                 conn.cursor().execute("SELECT 1")
             
@@ -110,14 +138,15 @@ class PipelineAutomatedTesting(unittest.TestCase):
         """
             Verifies that all expected tables are present in the SQLite database.
 
-            - Uses SQLAlchemy's inspect to list the tables in the database.
+            - Uses SQLAlchemy's inspect to list the tables and views in the database (a star-schema load
+              publishes the output tables as compatibility views).
             - Asserts the existence of key tables: sales_rents_2011_2021, monthly_entry_colombians_foreigners, and monthly_passengers_origin.
         """
-        print("[3/6] Validating: Expected tables are present in the database...")
+        print("[3/13] Validating: Expected tables are present in the database...")
         inspector = inspect(self.engine)
 
         try:
-            tables = inspector.get_table_names()
+            tables = inspector.get_table_names() + inspector.get_view_names()
             expected_tables = ["sales_rents_2011_2021", "monthly_entry_colombians_foreigners", "monthly_passengers_origin"]
             for table in expected_tables:
                 self.assertIn(table, tables, f"Table '{table}' not found in the database.")
@@ -132,7 +161,7 @@ class PipelineAutomatedTesting(unittest.TestCase):
             - Queries the count of rows in each table.
             - Asserts that none of the tables are empty.
         """
-        print("[4/6] Validating: Tables are non-empty...")
+        print("[4/13] Validating: Tables are non-empty...")
         with self.engine.connect() as connection:
             try:
                 table_row_counts = {
@@ -155,7 +184,7 @@ class PipelineAutomatedTesting(unittest.TestCase):
             - Checks that each table contains the expected columns.
             - Ensures the structure of the tables matches the predefined schema.
         """
-        print("[5/6] Validating: Column integrity for all tables...")
+        print("[5/13] Validating: Column integrity for all tables...")
         with self.engine.connect() as connection:
             try:
                 # Define expected columns for each table
@@ -194,7 +223,7 @@ class PipelineAutomatedTesting(unittest.TestCase):
         - Ensures numerical columns have non-negative values.
         - Validates categorical values in specific columns.
         """
-        print("[6/6] Validating: Sanity checks on data...")
+        print("[6/13] Validating: Sanity checks on data...")
         with self.engine.connect() as connection:
             # Sanity check for `monthly_entry_colombians_foreigners`
             result = connection.execute(text("SELECT MIN(Number), MAX(Number) FROM monthly_entry_colombians_foreigners")).fetchone()
@@ -227,10 +256,804 @@ class PipelineAutomatedTesting(unittest.TestCase):
                 self.assertGreater(max_value, min_value, f"Max value should be greater than min value in column '{column}' of 'sales_rents_2011_2021'.")
 
 
+    def test_07_validation_side_tables(self):
+        """
+        Verifies that the validation engine persisted its quarantine tables and per-rule statistics.
+        - Ensures a quarantine table exists for every validated dataset.
+        - Ensures quarantined rows record which rules they failed.
+        """
+        print("[7/13] Validating: Quarantine tables and validation statistics...")
+        tables = inspect(self.engine).get_table_names()
+        self.assertIn("_validation_stats", tables, "Table '_validation_stats' not found in the database.")
+        with self.engine.connect() as connection:
+            datasets = {row[0] for row in connection.execute(text("SELECT DISTINCT Dataset FROM _validation_stats")).fetchall()}
+            self.assertEqual(datasets, {"sales_rents", "tourism_1", "tourism_2"})
+            for dataset in datasets:
+                table = f"quarantine_{dataset}"
+                self.assertIn(table, tables, f"Table '{table}' not found in the database.")
+                result = connection.execute(text(f"SELECT COUNT(*) FROM {table}")).fetchone()[0]
+                if result:
+                    missing = connection.execute(text(f"SELECT COUNT(*) FROM {table} WHERE Failed_Rules IS NULL OR Failed_Rules = ''")).fetchone()[0]
+                    self.assertEqual(missing, 0, f"Quarantined rows without failed rules in '{table}'.")
+
+    def test_08_published_database_readonly(self):
+        """
+        Verifies the published database and its read-only access path.
+        - Ensures the staging file was removed after publishing.
+        - Ensures ANALYZE statistics are present.
+        - Ensures read-only connections reject writes.
+        """
+        print("[8/13] Validating: Published database and read-only connections...")
+        self.assertFalse(self.pipeline.publisher.staging_name.exists(), "Staging database was not cleaned up.")
+        conn = connect_readonly(self.db_path)
+        try:
+            stats = conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0]
+            self.assertGreater(stats, 0, "No ANALYZE statistics found in the published database.")
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("CREATE TABLE should_fail (x INTEGER)")
+        finally:
+            conn.close()
+
+    def test_09_run_metrics(self):
+        """
+        Verifies that the parse-quality and throughput metrics of this run were persisted.
+        - Ensures '_run_metrics' has one row per KML source of the run.
+        - Ensures N/A rates are valid fractions.
+        """
+        print("[9/13] Validating: Run metrics of the KML sources...")
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                text("SELECT Source, Placemarks, \"Rows\", NA_Rate_Fecha FROM _run_metrics WHERE Run_ID = :run_id"),
+                {"run_id": self.pipeline.run_id}
+            ).fetchall()
+        expected = len(self.pipeline.sales_urls) + len(self.pipeline.rents_urls)
+        self.assertEqual(len(rows), expected, "Missing run metrics for some KML sources.")
+        for source, placemarks, row_count, na_rate in rows:
+            self.assertGreaterEqual(placemarks, row_count, f"More rows than placemarks for '{source}'.")
+            self.assertTrue(0 <= na_rate <= 1, f"Invalid N/A rate for '{source}'.")
+
+    def test_10_star_schema_views(self):
+        """
+        Verifies that the star-schema load mode reproduces the output tables through its views.
+        - Ensures every view returns the same rows and columns as the plain table.
+        - Ensures the fact tables hold integer keys instead of the text columns.
+        """
+        print("[10/13] Validating: Star-schema fact tables and compatibility views...")
+        star = sqlite3.connect(":memory:")
+        try:
+            for table, fact in StarSchema.facts.items():
+                with self.engine.connect() as connection:
+                    original = pd.read_sql_query(text(f"SELECT * FROM {table}"), connection)
+                StarSchema().write(star, table, original)
+                roundtrip = pd.read_sql_query(f'SELECT * FROM "{table}"', star)
+                pd.testing.assert_frame_equal(original, roundtrip, check_dtype=False)
+
+                fact_columns = {row[1]: row[2] for row in star.execute(f'PRAGMA table_info("{fact.table}")')}
+                for name in fact.dimensions:
+                    dimension = StarSchema.dimensions[name]
+                    self.assertEqual(fact_columns.get(dimension.key), "INTEGER", f"Missing key '{dimension.key}' in '{fact.table}'.")
+                    self.assertFalse(set(dimension.columns) & set(fact_columns), f"Text columns left in '{fact.table}'.")
+        finally:
+            star.close()
+
+
+    def test_11_price_sketches(self):
+        """
+        Verifies that percentiles answered from the stored price sketches match the loaded data.
+        - Ensures counts, minimum and maximum per Research type are exact.
+        - Ensures the sketched median is within 5% of the exact median.
+        """
+        print("[11/13] Validating: Price quantile sketches...")
+        with self.engine.connect() as connection:
+            prices = pd.read_sql_query(text("SELECT Research, Price_per_m2_COP FROM sales_rents_2011_2021 "
+                                            "WHERE Price_per_m2_COP IS NOT NULL"), connection)
+        exact = prices.groupby("Research")["Price_per_m2_COP"].agg(["count", "min", "max", "median"])
+        queries = HousingTourismQueries(self.db_path)
+        try:
+            sketched = queries.price_percentiles((0, 0.5, 1), by=("Research",)).set_index("Research")
+        finally:
+            queries.close()
+        for research, row in exact.iterrows():
+            self.assertEqual(sketched.loc[research, "Count"], row["count"], f"Wrong count for '{research}'.")
+            self.assertAlmostEqual(sketched.loc[research, "P0"], row["min"], msg=f"Wrong minimum for '{research}'.")
+            self.assertAlmostEqual(sketched.loc[research, "P100"], row["max"], msg=f"Wrong maximum for '{research}'.")
+            self.assertLessEqual(abs(sketched.loc[research, "P50"] - row["median"]), 0.05 * abs(row["median"]),
+                                 f"Sketched median too far from the exact median for '{research}'.")
+
+    def test_12_lag_regression(self):
+        """
+        Verifies the lag regression analyzer on the loaded monthly features.
+        - Ensures one row per window, lag, tourism series and price series.
+        - Ensures correlations lie in [-1, 1] and R2 is the squared correlation.
+        """
+        print("[12/13] Validating: Lag correlations and regressions...")
+        features = LagRegressionAnalyzer.load_features(self.db_path)
+        tourism_columns, price_columns = LagRegressionAnalyzer.series(features)
+        analyzer = LagRegressionAnalyzer(lags=range(4), windows=(1, 3), min_observations=3)
+        results = analyzer.run(features)
+        self.assertEqual(len(results), 2 * 4 * len(tourism_columns) * len(price_columns), "Unexpected number of fits.")
+        fitted = results.dropna(subset=["Correlation"])
+        self.assertFalse(fitted.empty, "No lag combination could be fitted.")
+        self.assertTrue(fitted["Correlation"].between(-1, 1).all(), "Correlations outside [-1, 1].")
+        self.assertTrue(((fitted["R2"] - fitted["Correlation"] ** 2).abs() < 1e-9).all(), "R2 is not the squared correlation.")
+
+    def test_13_canonical_names(self):
+        """
+        Verifies that neighborhoods, property types and origins are stored under one canonical name.
+        - Ensures no two stored values only differ in case, accents, punctuation or spacing.
+        - Ensures the pending suggestions of the canonical dictionary are listed.
+        """
+        print("[13/13] Validating: Canonical neighborhood, property and origin names...")
+        columns = {"sales_rents_2011_2021": ["Neighborhood", "Property"], "monthly_passengers_origin": ["Origin"]}
+        with self.engine.connect() as connection:
+            for table, table_columns in columns.items():
+                for column in table_columns:
+                    values = [row[0] for row in connection.execute(
+                        text(f'SELECT DISTINCT "{column}" FROM {table} WHERE "{column}" IS NOT NULL')).fetchall()]
+                    keys = pd.Series(values, dtype=object).map(normalize_key)
+                    duplicated = sorted(set(pd.Series(values)[keys.duplicated(keep=False).to_numpy()]))
+                    self.assertEqual(duplicated, [], f"Several spellings of the same name in {table}.{column}.")
+        self.assertIn("_canonical_suggestions", inspect(self.engine).get_table_names(),
+                      "Table '_canonical_suggestions' not found in the database.")
+
+
+def _save_aliases(aliases_path, names):
+    # Runs in a worker process, like a city shard of run_catalog
+    canonicalizer = NameCanonicalizer(aliases_path)
+    for name in names:
+        canonicalizer.canonicalize(pd.DataFrame({"Barrio": [name]}), "Barrio")
+        canonicalizer.save()
+
+
+class ComponentTesting(unittest.TestCase):
+    """
+        Offline tests of the pipeline components on small local fixtures; they need no network access
+        and do not depend on the pipeline run of PipelineAutomatedTesting.
+    """
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name)
+        # Keep the components' progress output out of the test report
+        self.quiet = redirect_stdout(StringIO())
+        self.quiet.__enter__()
+
+    def tearDown(self):
+        self.quiet.__exit__(None, None, None)
+        self.tmp.cleanup()
+
+    def _write_database(self, name, tables, run_id="run-1"):
+        database = self.path / name
+        conn = sqlite3.connect(database)
+        try:
+            for table, df in tables.items():
+                df.to_sql(table, conn, index=False, if_exists='replace')
+            pd.DataFrame([{"Run_ID": run_id, "Finished_At": "2024-01-01T00:00:00", "Tables": ",".join(tables)}]).to_sql(
+                "_pipeline_runs", conn, index=False, if_exists='append')
+            conn.commit()
+        finally:
+            conn.close()
+        return database
+
+    def test_data_api_rejects_invalid_pagination(self):
+        """
+        Verifies the pagination parameters and the error handling of the HTTP API.
+        - Ensures 'limit' < 1 and 'after' < 0 are rejected with 400 instead of reading the whole table.
+        - Ensures a missing database answers with a JSON error instead of dropping the connection.
+        """
+        database = self._write_database("api.sqlite", {"monthly_entry_colombians_foreigners": pd.DataFrame(
+            {"Nationality": ["Extranjero", "Colombiano"] * 3, "Period": ["2015.01", "2015.01", "2015.02", "2015.02",
+                                                                     "2015.03", "2015.03"], "Number": range(6)})})
+        api = DataAPI(database)
+        for query in ("limit=-1", "limit=0", "after=-1"):
+            status, _ = api.handle("/tables/monthly_entry_colombians_foreigners", query)
+            self.assertEqual(status, 400, f"'{query}' was not rejected.")
+        status, body = api.handle("/tables/monthly_entry_colombians_foreigners", "limit=4")
+        self.assertEqual((status, len(body["rows"]), body["next_after"]), (200, 4, 4))
+        status, body = api.handle("/aggregates/monthly_travelers", "")
+        self.assertEqual((status, body["run_id"], len(body["rows"])), (200, "run-1", 3))
+
+        async def request():
+            server = await asyncio.start_server(api.handle_connection, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /tables HTTP/1.1\r\n\r\n")
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return response.decode()
+
+        os.remove(database)
+        response = asyncio.run(request())
+        self.assertTrue(response.startswith("HTTP/1.1 500"), "A missing database did not answer with 500.")
+        self.assertIn('"error"', response)
+
+    def test_query_cache_invalidated_by_new_run(self):
+        """
+        Verifies the run-keyed cache of HousingTourismQueries.
+        - Ensures a repeated aggregation is served from the cache.
+        - Ensures publishing a database with a new run ID drops the cached results.
+        """
+        def entries(numbers):
+            return {"monthly_entry_colombians_foreigners": pd.DataFrame(
+                {"Nationality": ["Colombiano", "Extranjero"], "Period": ["2015.01", "2015.01"], "Number": numbers})}
+
+        database = self._write_database("queries.sqlite", entries([10, 5]), run_id="run-1")
+        queries = HousingTourismQueries(database)
+        try:
+            first = queries.monthly_travelers()
+            self.assertEqual((queries.run_id, queries.misses, queries.hits), ("run-1", 1, 0))
+            pd.testing.assert_frame_equal(queries.monthly_travelers(), first)
+            self.assertEqual(queries.hits, 1)
+
+            # Publishing replaces the file by rename, like SQLitePublisher
+            os.replace(self._write_database("next.sqlite", entries([20, 7]), run_id="run-2"), database)
+            second = queries.monthly_travelers()
+            self.assertEqual((queries.run_id, queries.misses), ("run-2", 2))
+            self.assertEqual(second[["Colombians", "Foreigners"]].values.tolist(), [[20, 7]])
+            self.assertEqual(list(queries._cache), [("run-2", "monthly_travelers")])
+        finally:
+            queries.close()
+
+    def test_task_graph_order_and_failure(self):
+        """
+        Verifies the dependency handling of the TaskGraph scheduler.
+        - Ensures a task starts after its dependencies and receives their results in the declared order.
+        - Ensures the dependents of a failing task are skipped while the independent tasks still run.
+        - Ensures cycles and undefined dependencies are rejected.
+        """
+        started, lock = [], threading.Lock()
+
+        def task(name, func):
+            def run(*args):
+                with lock:
+                    started.append(name)
+                return func(*args)
+            return run
+
+        def fail():
+            raise RuntimeError("source unavailable")
+
+        graph = TaskGraph()
+        graph.add("extract:a", task("extract:a", lambda: 2))
+        graph.add("extract:b", task("extract:b", lambda: 3))
+        graph.add("transform", task("transform", lambda a, b: a - b), ["extract:b", "extract:a"])
+        graph.add("load", task("load", lambda value: value * 10), ["transform"])
+        graph.add("extract:c", task("extract:c", fail))
+        graph.add("load:c", task("load:c", lambda value: value), ["extract:c"])
+        results = graph.run(max_workers=4)
+
+        self.assertEqual(results["load"], 10)
+        self.assertLess(max(started.index("extract:a"), started.index("extract:b")), started.index("transform"))
+        self.assertLess(started.index("transform"), started.index("load"))
+        self.assertEqual(graph.status, {"extract:a": "ok", "extract:b": "ok", "transform": "ok", "load": "ok",
+                                        "extract:c": "failed", "load:c": "skipped"})
+        self.assertNotIn("load:c", started)
+
+        cyclic = TaskGraph()
+        cyclic.add("a", lambda b: b, ["b"])
+        cyclic.add("b", lambda a: a, ["a"])
+        with self.assertRaises(ValueError):
+            cyclic.topological_order()
+        undefined = TaskGraph()
+        undefined.add("a", lambda b: b, ["b"])
+        with self.assertRaises(ValueError):
+            undefined.topological_order()
+
+    def test_checkpoint_resume(self):
+        """
+        Verifies that a resumed task graph restores its checkpointed results.
+        - Ensures raw payloads and DataFrames are restored without running their tasks again.
+        - Ensures only the failed task and its skipped dependents run on resume.
+        """
+        calls = {"download": 0, "parse": 0, "tourism": 0, "load": 0}
+        attempts = {"tourism": 0}
+
+        def counted(name, func):
+            def run(*args):
+                calls[name] += 1
+                return func(*args)
+            return run
+
+        def tourism():
+            attempts["tourism"] += 1
+            if attempts["tourism"] == 1:
+                raise ConnectionError("timeout")
+            return pd.DataFrame({"Period": ["2015.01"], "Number": [4]})
+
+        def build():
+            graph = TaskGraph()
+            graph.add("extract:kml", counted("download", lambda: b"<kml/>"), checkpoint=True)
+            graph.add("transform:kml", counted("parse", lambda payload: pd.DataFrame({"Bytes": [len(payload)]})),
+                      ["extract:kml"], checkpoint=True)
+            graph.add("extract:tourism", counted("tourism", tourism), checkpoint=True)
+            graph.add("load", counted("load", lambda kml, entries: len(kml) + len(entries)),
+                      ["transform:kml", "extract:tourism"])
+            return graph
+
+        first = build()
+        first.run(checkpoint=RunCheckpoint(self.path / "run-1"))
+        self.assertEqual((first.status["extract:tourism"], first.status["load"]), ("failed", "skipped"))
+
+        resumed = build()
+        results = resumed.run(checkpoint=RunCheckpoint(self.path / "run-1"))
+        self.assertEqual(set(resumed.status.values()), {"ok"})
+        self.assertEqual(calls, {"download": 1, "parse": 1, "tourism": 2, "load": 1})
+        self.assertEqual(results["extract:kml"], b"<kml/>")
+        pd.testing.assert_frame_equal(results["transform:kml"], pd.DataFrame({"Bytes": [6]}))
+        self.assertEqual(results["load"], 2)
+
+    def test_catalog_sharding(self):
+        """
+        Verifies the source catalog and the merge of the per-city shards.
+        - Ensures every city gets only its own KML years, mappings and CSV URLs, and invalid entries are rejected.
+        - Ensures merge_shards concatenates the shard tables with a leading 'City' column.
+        """
+        catalog_path = self.path / "sources.json"
+        datasets = [{"city": "Medellin", "kind": "sales", "year": 2020, "mapping": "sales", "url": "med-2020.kml"},
+                    {"city": "Medellin", "kind": "sales", "year": 2021, "mapping": "sales", "url": "med-2021.kml"},
+                    {"city": "Medellin", "kind": "foreigners", "url": "med-foreigners.csv"},
+                    {"city": "Bogota", "kind": "sales", "year": 2020, "mapping": "sales", "url": "bog-2020.kml"}]
+        catalog_path.write_text(json.dumps({"datasets": datasets}))
+        catalog = SourceCatalog.load(catalog_path)
+        self.assertEqual(catalog.cities(), ["Bogota", "Medellin"])
+        self.assertEqual(catalog.kml_urls("Medellin", "sales"), {2020: "med-2020.kml", 2021: "med-2021.kml"})
+        self.assertEqual(catalog.kml_urls("Bogota", "sales"), {2020: "bog-2020.kml"})
+        self.assertEqual(set(catalog.kml_mappings("Bogota", "sales")), {2020})
+        self.assertEqual(catalog.csv_url("Medellin", "foreigners"), "med-foreigners.csv")
+        self.assertIsNone(catalog.csv_url("Bogota", "foreigners"))
+        with self.assertRaises(KeyError):
+            catalog.for_city("Cali")
+        catalog_path.write_text(json.dumps({"datasets": [{"city": "Cali", "kind": "sales", "url": "cali.kml"}]}))
+        with self.assertRaises(ValueError):
+            SourceCatalog.load(catalog_path)
+
+        shards = {city: self._write_database(f"{city}.sqlite", {"monthly_passengers_origin": pd.DataFrame(
+            {"Origin": ["Perú", "Chile"][:rows], "Period": ["2015.01"] * rows, "Number": list(range(rows))})})
+            for city, rows in (("Bogota", 1), ("Medellin", 2))}
+        merged = self.path / "cities.sqlite"
+        merge_shards(shards, merged)
+        conn = sqlite3.connect(merged)
+        try:
+            rows = conn.execute("SELECT City, Origin FROM monthly_passengers_origin ORDER BY City, Origin").fetchall()
+            runs = conn.execute("SELECT City, COUNT(*) FROM _pipeline_runs GROUP BY City").fetchall()
+        finally:
+            conn.close()
+        self.assertEqual(rows, [("Bogota", "Perú"), ("Medellin", "Chile"), ("Medellin", "Perú")])
+        self.assertEqual(runs, [("Bogota", 1), ("Medellin", 1)])
+
+    def test_change_capture_between_loads(self):
+        """
+        Verifies the run-to-run change capture on monthly_entry_colombians_foreigners.
+        - Ensures inserted, updated and deleted keys are reported once each, with the new (or old) row.
+        - Ensures unchanged rows read back from SQLite are not reported, whatever their dtype.
+        """
+        table = "monthly_entry_colombians_foreigners"
+        first = pd.DataFrame({"Nationality": ["Colombiano", "Extranjero", "Colombiano"],
+                              "Period": ["2015.01", "2015.01", "2015.02"], "Number": [10, 5, 12]})
+        database = self._write_database("cdc.sqlite", {table: first})
+        conn = sqlite3.connect(database)
+        try:
+            previous = pd.read_sql_query(f'SELECT * FROM "{table}"', conn)
+        finally:
+            conn.close()
+
+        # 2015.01 Extranjero changes, 2015.02 Colombiano is deleted and 2015.02 Extranjero is inserted
+        second = pd.DataFrame({"Nationality": ["Colombiano", "Extranjero", "Extranjero"],
+                               "Period": ["2015.01", "2015.01", "2015.02"], "Number": [10.0, 6.0, 3.0]})
+        changes = ChangeCapture.diff(table, previous, second, "run-2")
+        self.assertEqual(list(changes.columns), ["Run_ID", "Table_Name", "Change", "Key_Hash", "Row"])
+        self.assertEqual(set(changes["Run_ID"]), {"run-2"})
+        rows = {change: json.loads(row) for change, row in zip(changes["Change"], changes["Row"])}
+        self.assertEqual(len(changes), 3)
+        self.assertEqual(rows["insert"], {"Nationality": "Extranjero", "Period": "2015.02", "Number": 3.0})
+        self.assertEqual(rows["update"], {"Nationality": "Extranjero", "Period": "2015.01", "Number": 6.0})
+        self.assertEqual(rows["delete"], {"Nationality": "Colombiano", "Period": "2015.02", "Number": 12})
+
+        self.assertTrue(ChangeCapture.diff(table, previous, first, "run-3").empty)
+        self.assertEqual(set(ChangeCapture.diff(table, None, first, "run-1")["Change"]), {"insert"})
+
+    def test_change_capture_all_null_column(self):
+        """
+        Verifies that loading the same monthly_features twice records no changes.
+        - Ensures a float column without any value (read back from SQLite as object) hashes like float64 NaN.
+        """
+        table = "monthly_features"
+        features = pd.DataFrame({"Month_Index": [0, 1, 2], "Period": ["2020.01", "2020.02", "2020.03"],
+                                 "Travelers": [10.0, 12.0, 9.0], "Price_m2_Mean_Venta_Lag1": [float("nan")] * 3})
+        for run_id in ("run-1", "run-2"):
+            database = self._write_database(f"{run_id}.sqlite", {table: features}, run_id=run_id)
+            conn = sqlite3.connect(database)
+            try:
+                previous = pd.read_sql_query(f'SELECT * FROM "{table}"', conn)
+            finally:
+                conn.close()
+            self.assertEqual(previous["Price_m2_Mean_Venta_Lag1"].dtype, object)
+            changes = ChangeCapture.diff(table, previous, features.copy(), run_id)
+            self.assertTrue(changes.empty, f"{run_id}: {changes['Change'].value_counts().to_dict()}")
+
+    def test_numeric_parser_separators(self):
+        """
+        Verifies the separator inference of the vectorized numeric parser.
+        - Ensures "$1.234.567" and "$1,234,567" both parse to 1234567, each column in its own format.
+        - Ensures decimals, placeholders and unparseable values are handled per column.
+        """
+        parser = NumericColumnParser()
+        dots, unparsed = parser.parse(pd.Series(["$1.234.567", "$ 2.500.000,50", "N/A", None, "85"]))
+        self.assertEqual(parser.infer_format(pd.Series(["$1.234.567"])), NumberFormat(thousands=".", decimal=","))
+        self.assertEqual(dots.iloc[:2].tolist(), [1234567.0, 2500000.5])
+        self.assertTrue(dots.iloc[2:4].isna().all())
+        self.assertEqual(dots.iloc[4], 85.0)
+        self.assertFalse(unparsed.any())
+
+        commas, unparsed = parser.parse(pd.Series(["$1,234,567", "350,000,000.25", "abc"]))
+        self.assertEqual(parser.infer_format(pd.Series(["$1,234,567"])), NumberFormat(thousands=",", decimal="."))
+        self.assertEqual(commas.iloc[:2].tolist(), [1234567.0, 350000000.25])
+        self.assertEqual(unparsed.tolist(), [False, False, True])
+
+        # A single separator followed by other than three digits is a decimal separator
+        self.assertEqual(parser.parse(pd.Series(["85,5", "120,75"]))[0].tolist(), [85.5, 120.75])
+
+    def test_canonicalizer_save_merges_shared_file(self):
+        """
+        Verifies that canonicalizers sharing one alias file (e.g. the city shards) keep each other's names.
+        - Ensures names learned by both instances are in the file after both saved.
+        - Ensures an accepted suggestion is not restored from the file and no temporary file is left.
+        """
+        aliases_path = self.path / "canonical_aliases.json"
+        first, second = NameCanonicalizer(aliases_path), NameCanonicalizer(aliases_path)
+        first.canonicalize(pd.DataFrame({"Barrio": ["Laureles", "LAURELES", "Belén"]}), "Barrio")
+        second.canonicalize(pd.DataFrame({"Barrio": ["Poblado", "Laureles", "Laureles", "Laurelez"]}), "Barrio")
+        first.save()
+        second.save()
+
+        stored = NameCanonicalizer(aliases_path)
+        self.assertEqual(set(stored.aliases["Barrio"]), {"LAURELES", "BELEN", "POBLADO", "LAURELEZ"})
+        self.assertEqual(stored.suggestions["Barrio"]["LAURELEZ"]["canonical"], "LAURELES")
+        self.assertEqual(stored.accept_suggestions(), 1)
+        stored.save()
+        first.save()
+        reloaded = NameCanonicalizer(aliases_path)
+        self.assertEqual(reloaded.aliases["Barrio"]["LAURELEZ"], "LAURELES")
+        self.assertEqual(reloaded.suggestions["Barrio"], {})
+        self.assertEqual(sorted(path.name for path in self.path.iterdir()),
+                         ["canonical_aliases.json", "canonical_aliases.json.lock"])
+
+        # Shards save from their own processes; none of them may drop the names of another
+        shard_names = [[f"Barrio {shard}-{index}" for index in range(20)] for shard in range(4)]
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            list(executor.map(_save_aliases, [aliases_path] * 4, shard_names))
+        stored = NameCanonicalizer(aliases_path).aliases["Barrio"]
+        self.assertTrue({normalize_key(name) for names in shard_names for name in names} <= set(stored))
+
+    @staticmethod
+    def _kml_layer(year, placemarks, document_attributes="", without_description=()):
+        rows = []
+        for i in range(placemarks):
+            if i in without_description:
+                point = f"<Point><coordinates>-75.{i},6.{i},0</coordinates></Point>"
+                rows.append(f"<Placemark><name>P{i}</name><description></description>{point}</Placemark>")
+                continue
+            description = (f"FECHA: 0{1 + i % 9}-03-{year}<br>INVESTIGACION: Venta<br>"
+                           f"TIPO PREDIO: {'APARTAMENTO' if i % 3 else 'CASA'}<br>ESTADO: Usado<br>BARRIO: B{i % 7}<br>"
+                           f"ESTRATO: {1 + i % 6}<br>AREA PRIVADA: {50 + i}<br>AREA LOTE: 0<br>"
+                           f"VALOR COMERCIAL: ${100000000 + i * 1000:,}<br>VALOR M²: $2.000.000")
+            point = "" if i % 11 == 0 else f"<Point><coordinates>-75.{i},6.{i},0</coordinates></Point>"
+            rows.append(f"<Placemark><name>P{i}</name><description><![CDATA[{description}]]></description>{point}</Placemark>")
+        return (f'<?xml version="1.0" encoding="UTF-8"?><kml xmlns="http://www.opengis.net/kml/2.2">'
+                f'<Document{document_attributes}><name>layer</name>' + "".join(rows) + "</Document></kml>").encode("utf-8")
+
+    def test_async_extraction_deadlines(self):
+        """
+        Runs extract_data_async against a local HTTP server with a hanging and a failing source of each kind.
+        - Ensures a source exceeding the per-source deadline is reported as "timeout" and a failing one as "failed".
+        - Ensures the years and CSVs that finished are kept, with a status per KML year.
+        - Ensures sources still running at the total deadline are "cancelled" while the finished years are kept.
+        """
+        year = 2020
+        layer = self._kml_layer(year, 12)
+        csv = "Nacionalidad,Periodo,Numero\nColombiano,2015.01,10\n"
+
+        async def extract(source_deadline, total_deadline):
+            release = asyncio.Event()
+
+            async def serve(request):
+                name = request.match_info["name"]
+                if name.startswith("hang"):
+                    await release.wait()
+                if name.startswith("fail"):
+                    raise web.HTTPInternalServerError()
+                return web.Response(body=layer if name.endswith(".kml") else csv.encode())
+
+            app = web.Application()
+            app.router.add_get("/{name}", serve)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            base = f"http://127.0.0.1:{runner.addresses[0][1]}"
+            try:
+                pipeline = Pipeline(database_name=self.path / "async.sqlite")
+                pipeline.sales_urls = {2020: f"{base}/ok.kml", 2021: f"{base}/hang.kml", 2019: f"{base}/fail.kml"}
+                pipeline.rents_urls = {2020: f"{base}/ok.kml"}
+                pipeline.entry_colombians_foreigners_url = f"{base}/ok.csv"
+                pipeline.foreigners_country_origin_url = f"{base}/hang.csv"
+                pipeline.colombians_city_origin_url = f"{base}/fail.csv"
+                return await pipeline.extract_data_async(source_deadline=source_deadline, total_deadline=total_deadline)
+            finally:
+                release.set()
+                await runner.cleanup()
+
+        data = asyncio.run(extract(source_deadline=0.5, total_deadline=None))
+        status = data["status"]
+        self.assertEqual({key: status[key] for key in ("sales_2020", "sales_2021", "rents_2020", "tourism_1", "foreigners")},
+                         {"sales_2020": "ok", "sales_2021": "timeout", "rents_2020": "ok", "tourism_1": "ok",
+                          "foreigners": "timeout"})
+        self.assertTrue(status["sales_2019"].startswith("failed") and status["colombians"].startswith("failed"))
+        self.assertEqual((len(data["sales_data"]), len(data["rents_data"]), len(data["tourism_1"])), (10, 10, 1))
+        self.assertTrue(data["foreigners"].empty and data["colombians"].empty)
+
+        data = asyncio.run(extract(source_deadline=30, total_deadline=1))
+        status = data["status"]
+        self.assertEqual((status["sales_2020"], status["sales_2021"], status["foreigners"]), ("ok", "cancelled", "cancelled"))
+        self.assertEqual((len(data["sales_data"]), len(data["tourism_1"])), (10, 1))
+
+    def test_arrow_path_matches_default(self):
+        """
+        Verifies that the pyarrow-backed pipeline (arrow=True) loads the same sales_rents table as the default path.
+        - Runs the KML extraction (concatenated with pa.concat_tables), transform and load on local layers.
+        - Ensures the loaded tables have the same columns, row order and values.
+        """
+        layers = {"sales": self._kml_layer(2020, 30), "rents": self._kml_layer(2020, 20)}
+        tables = {}
+        for arrow in (False, True):
+            pipeline = Pipeline(database_name=self.path / f"arrow_{arrow}.sqlite", arrow=arrow)
+            pipeline.canonicalizer = NameCanonicalizer(self.path / f"aliases_{arrow}.json")
+            for kind, extractor in (("sales", pipeline.sales_extractor), ("rents", pipeline.rents_extractor)):
+                extractor.fetch_kml = lambda url, timeout=60, payload=layers[kind]: payload
+            sales = pipeline.sales_extractor.process_multiple_years({2020: "sales.kml"})
+            rents = pipeline.rents_extractor.process_multiple_years({2020: "rents.kml"})
+            if arrow:
+                self.assertIsInstance(sales["Barrio"].dtype, pd.ArrowDtype)
+            sales_rents = pipeline._transform_sales_rents_data(sales, rents)
+            pipeline.save_data_to_sqlite({"sales_rents_2011_2021": sales_rents})
+            conn = sqlite3.connect(pipeline.database_name)
+            try:
+                tables[arrow] = pd.read_sql_query('SELECT * FROM "sales_rents_2011_2021"', conn)
+            finally:
+                conn.close()
+        self.assertEqual(len(tables[False]), 45)
+        pd.testing.assert_frame_equal(tables[True], tables[False])
+
+    def test_stage_profiler_outputs(self):
+        """
+        Verifies the files written by StageProfiler and the profiled decorator.
+        - Ensures a stage writes a parseable .pstats file in 'cprofile' mode and a collapsed-stack file in 'sample' mode.
+        - Ensures the chunks of a KML layer parsed on the process pool are profiled and merged per year.
+        """
+        class Stage:
+            def __init__(self, profiler):
+                self.profiler = profiler
+
+            @profiled("busy_{0}")
+            def busy(self, name):
+                deadline = time.perf_counter() + 0.05
+                while time.perf_counter() < deadline:
+                    sum(range(1000))
+                return name
+
+        for mode, suffix in (("cprofile", ".pstats"), ("sample", ".collapsed")):
+            output_dir = self.path / mode
+            self.assertEqual(Stage(StageProfiler(output_dir, mode, interval=0.001)).busy(mode), mode)
+            self.assertEqual([path.name for path in output_dir.iterdir()], [f"busy_{mode}{suffix}"])
+        stats = pstats.Stats(str(self.path / "cprofile" / "busy_cprofile.pstats"))
+        self.assertTrue(any(function[2] == "busy" for function in stats.stats))
+        lines = (self.path / "sample" / "busy_sample.collapsed").read_text().splitlines()
+        stacks = {frames: int(count) for frames, count in (line.rsplit(" ", 1) for line in lines)}
+        self.assertTrue(all(count > 0 for count in stacks.values()))
+        self.assertTrue(any("busy (" in frames for frames in stacks))
+
+        year = 2020
+        extractor = KMLDataExtractor({year: KMLMappings.sales_year_mappings[2020]}, parse_processes=2, chunk_bytes=4000)
+        extractor.profiler = StageProfiler(self.path / "pool", "all", interval=0.001)
+        [result] = extractor._process_layers({year: self._kml_layer(year, 60)})
+        self.assertEqual(len(result), 54)
+        stats = pstats.Stats(str(self.path / "pool" / f"process_year_{year}.pstats"))
+        self.assertTrue(any(function[2] == "_parse_chunk" for function in stats.stats))
+        self.assertTrue((self.path / "pool" / f"process_year_{year}.collapsed").exists())
+
+    def test_kml_preview(self):
+        """
+        Verifies the mapping preview on a local KML layer.
+        - Ensures the first-rows preview stops after `rows` placemarks with a Point.
+        - Ensures placemarks without a description are not counted as field matches.
+        - Ensures the reservoir sample has the requested size, comes from the whole layer and is deterministic per seed.
+        - Ensures the --preview command line previews a local --source.
+        """
+        year = 2020
+        source = self.path / "layer.kml"
+        source.write_bytes(self._kml_layer(year, 60, without_description=(2,)))
+        extractor = KMLDataExtractor({year: KMLMappings.sales_year_mappings[2020]})
+        self.assertEqual(sum(1 for _ in extractor.iter_placemarks(str(source))), 54)
+
+        output = StringIO()
+        with redirect_stdout(output):
+            first = extractor.preview(year, str(source), rows=5)
+        self.assertEqual(len(first), 5)
+        # P0 has no Point, so P2 (without a description) is the second row
+        self.assertTrue(first.iloc[1].isna().all())
+        self.assertIn("(4/5)", output.getvalue())
+
+        sample = extractor.preview(year, str(source), rows=10, reservoir=True, seed=7)
+        self.assertEqual(len(sample), 10)
+        pd.testing.assert_frame_equal(sample, extractor.preview(year, str(source), rows=10, reservoir=True, seed=7))
+        # Area Privada is 50 + the placemark number, so a sample of the whole layer reaches past the first rows
+        self.assertGreater(pd.to_numeric(sample["Area Privada"]).max(), 50 + 10)
+        self.assertEqual(len(extractor.preview(year, str(source), rows=100, reservoir=True)), 54)
+
+        completed = subprocess.run([sys.executable, "pipeline.py", "--preview", "sales", "--years", str(year),
+                                    "--source", str(source), "--rows", "5"],
+                                   cwd=Path(__file__).resolve().parent, capture_output=True, text=True, timeout=120)
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertIn(f"Preview of year {year}: 5 placemarks (first rows)", completed.stdout)
+
+    def test_monthly_features_alignment(self):
+        """
+        Verifies MonthlyFeatureBuilder on a small synthetic frame.
+        - Ensures every month between the first and last observation has a row keyed by Month_Index and Period.
+        - Ensures a month without prices leaves a gap (NaN mean, zero count) that lags and windows carry.
+        - Ensures Lag1 and Roll3 take their values from the right earlier months.
+        - Ensures the top-N origin shares of a month sum to at most 1.
+        """
+        periods = ["2011.01", "2011.02", "2011.03", "2011.04", "2011.05"]
+        tourism_1 = pd.DataFrame({"Nationality": ["Extranjero"] * 5 + ["Colombiano"] * 5, "Period": periods * 2,
+                                  "Number": [10, 20, 30, 40, 50, 1, 2, 3, 4, 5]})
+        tourism_2 = pd.DataFrame({"Origin": ["Perú", "Chile", "Otros"] * 5, "Period": [p for p in periods for _ in range(3)],
+                                  "Number": [5, 3, 2] * 5})
+        # No sales in 2011.04
+        sales_rents = pd.DataFrame({"Period": ["2011.01", "2011.01", "2011.02", "2011.03", "2011.05"],
+                                    "Research": ["Venta"] * 5, "Price_per_m2_COP": [100, 300, 400, 600, 800]})
+        features = MonthlyFeatureBuilder(top_n_origins=2).build(sales_rents, tourism_1, tourism_2)
+
+        self.assertEqual(features["Month_Index"].tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(features["Period"].tolist(), periods)
+        mean = features["Price_m2_Mean_Venta"]
+        self.assertEqual(mean.tolist()[:3] + mean.tolist()[4:], [200.0, 400.0, 600.0, 800.0])
+        self.assertTrue(pd.isna(mean[3]))
+        self.assertEqual(features["Price_m2_Count_Venta"].tolist(), [2.0, 1.0, 1.0, 0.0, 1.0])
+        self.assertEqual(features["Price_m2_Mean_Venta_Lag1"].tolist()[1:4], [200.0, 400.0, 600.0])
+        self.assertTrue(pd.isna(features["Price_m2_Mean_Venta_Lag1"][4]))
+        self.assertTrue(features["Price_m2_Mean_Venta_Roll3"][[0, 1, 3, 4]].isna().all())
+        self.assertEqual(features["Price_m2_Mean_Venta_Roll3"][2], 400.0)
+
+        foreigners = features["Tourists_Extranjero"]
+        self.assertEqual(features["Tourists_Extranjero_Lag1"].tolist()[1:], foreigners.tolist()[:-1])
+        self.assertEqual(features["Tourists_Extranjero_Roll3"].tolist()[2:], [20.0, 30.0, 40.0])
+
+        shares = features.filter(like="Origin_Share_")
+        self.assertEqual(sorted(shares.columns), ["Origin_Share_Chile", "Origin_Share_Perú"])
+        self.assertTrue((shares.sum(axis=1) <= 1 + 1e-9).all())
+        self.assertAlmostEqual(shares.sum(axis=1)[0], 0.8)
+
+    def test_kml_parse_tail_seconds(self):
+        """
+        Runs a fixed schedule through the tail latency of the parallel KML parse.
+        - Ensures the tail starts when the earliest of the last `workers` tasks finishes.
+        - Ensures a single worker or fewer finished tasks than workers have no tail.
+        """
+        finished = [1.0, 2.0, 3.0, 4.0, 6.0, 10.0]
+        # 6 tasks on 3 workers: tasks 4, 5 and 6 are the last ones running, the first of them ends at 4.0
+        self.assertEqual(KMLDataExtractor._tail_seconds(finished, 3, 10.0), 6.0)
+        self.assertEqual(KMLDataExtractor._tail_seconds(finished, 2, 10.0), 4.0)
+        self.assertEqual(KMLDataExtractor._tail_seconds(finished, 1, 10.0), 0.0)
+        self.assertEqual(KMLDataExtractor._tail_seconds([1.0, 2.0], 3, 2.0), 0.0)
+
+    def test_kml_chunked_parse_matches_process_year(self):
+        """
+        Verifies that parsing a layer in placemark chunks on a process pool gives the result of process_year.
+        - Ensures the payload is split into several chunks.
+        - Ensures the rows, their order and the per-year counts are the same.
+        """
+        year = 2020
+        payload = self._kml_layer(year, 60)
+        mappings = {year: KMLMappings.sales_year_mappings[2020]}
+        sequential = KMLDataExtractor(mappings, parse_processes=1)
+        sequential.fetch_kml = lambda url, timeout=60: payload
+        expected = sequential.process_year(year, "layer.kml")
+
+        chunked = KMLDataExtractor(mappings, parse_processes=2, chunk_bytes=4000)
+        self.assertGreater(len(chunked.placemark_chunks(payload)), 3)
+        [result] = chunked._process_layers({year: payload})
+        self.assertEqual(len(expected), 54)
+        pd.testing.assert_frame_equal(result, expected)
+        for key in ("Placemarks", "Without_Point", "Rows", "Payload_Bytes"):
+            self.assertEqual(chunked.metrics[year][key], sequential.metrics[year][key], key)
+
+    def test_kml_chunk_parse_error_falls_back_to_year(self):
+        """
+        Verifies the fallback of the chunked KML parse.
+        - Ensures a year with a chunk that cannot be parsed on its own (a namespace prefix declared on the
+          <Document> is not repeated in the chunks) is parsed whole and keeps all of its rows.
+        """
+        year = 2020
+        payload = self._kml_layer(year, 40, ' xmlns:gx="http://www.google.com/kml/ext/2.2"').replace(
+            b"<name>P5</name>", b"<name>P5</name><gx:balloonVisibility>1</gx:balloonVisibility>")
+        mappings = {year: KMLMappings.sales_year_mappings[2020]}
+        expected = KMLDataExtractor(mappings, parse_processes=1).process_payload(year, payload)
+
+        chunked = KMLDataExtractor(mappings, parse_processes=2, chunk_bytes=4000)
+        output = StringIO()
+        with redirect_stdout(output):
+            [result] = chunked._process_layers({year: payload})
+        self.assertIn(f"of year {year} could not be parsed", output.getvalue())
+        pd.testing.assert_frame_equal(result, expected)
+        self.assertEqual(chunked.metrics[year]["Placemarks"], 40)
+
+    def test_canonicalizer_strips_punctuation(self):
+        """
+        Verifies the canonical spelling of names with leading or trailing punctuation.
+        - Ensures ': APARTAMENTO' tied with 'APARTAMENTO' becomes 'APARTAMENTO' and passes the Predio filter.
+        - Ensures spellings carrying accents are still preferred over plain upper case ones.
+        """
+        canonicalizer = NameCanonicalizer()
+        predio = canonicalizer.canonicalize(pd.DataFrame({"Predio": [": APARTAMENTO", "APARTAMENTO", "Casa.", "CASA"]}),
+                                            "Predio")["Predio"]
+        self.assertEqual(predio.tolist(), ["APARTAMENTO", "APARTAMENTO", "CASA", "CASA"])
+        self.assertTrue(predio.str.startswith(('APARTAMENTO', 'CASA'), na=False).all())
+        origin = canonicalizer.canonicalize(pd.DataFrame({"Origin": ["PERU", "Perú", "- Chile -"]}), "Origin")["Origin"]
+        self.assertEqual(origin.tolist(), ["Perú", "Perú", "Chile"])
+
+    def test_jayvee_parses_exercises(self):
+        """
+        Verifies that the Jayvee parser accepts every exercise.
+        - Ensures each exercises/*.jv file has at least one pipeline with a source -> sink path.
+        """
+        exercises = sorted((Path(__file__).resolve().parent.parent / 'exercises').glob('*.jv'))
+        self.assertTrue(exercises, "No exercises were found.")
+        for exercise in exercises:
+            pipelines = JayveeParser.parse_file(exercise)
+            self.assertTrue(pipelines, f"{exercise.name} has no pipeline.")
+            for pipeline in pipelines:
+                self.assertTrue(pipeline.paths(), f"{exercise.name}: pipeline '{pipeline.name}' has no path.")
+
+    def test_jayvee_runs_pipeline(self):
+        """
+        Runs the pipeline of exercise2 end to end on a local CSV instead of the download.
+        - Ensures the loaded table has the declared columns, SQLite types and valid rows.
+        - Ensures rows violating a constraint or a value type are dropped.
+        """
+        exercise = Path(__file__).resolve().parent.parent / 'exercises' / 'exercise2.jv'
+        fixture = "\n".join([
+            "lfd_nr;stadtteil;standort;baumart_botanisch;baumart_deutsch;id;baumfamilie",
+            "1;Vogelsang;Weg 1;Acer campestre;Feldahorn;51.1812, 6.6862;Ahorne",
+            "2;Vogelsang Nord;Weg 2;Tilia cordata;Winterlinde;51.1795, 6.6889;Linden",
+            "3;Furth;Weg 3;Quercus robur;Stieleiche;51.2012, 6.6901;Eichen",
+            "4;Vogelsang;Weg 4;Carpinus betulus;Hainbuche;keine Angabe;Birken",
+            "x;Vogelsang;Weg 5;Prunus avium;Vogelkirsche;51.1801, 6.6870;Rosen",
+        ]).encode("utf-8")
+        executor = JayveeExecutor(output_dir=self.path, cache_dir=None)
+        executor.fetch = lambda url: fixture
+
+        loaded = executor.run_file(exercise)
+        self.assertEqual(loaded, {"TreeDatabaseLoader": 2})
+        conn = sqlite3.connect(self.path / "trees.sqlite")
+        try:
+            columns = [(row[1], row[2]) for row in conn.execute('PRAGMA table_info("trees")')]
+            rows = conn.execute('SELECT lfd_nr, stadtteil, id FROM trees ORDER BY lfd_nr').fetchall()
+        finally:
+            conn.close()
+        self.assertNotIn("baumart_deutsch", [name for name, _ in columns])
+        self.assertEqual(columns[0], ("lfd_nr", "INTEGER"))
+        self.assertEqual(rows, [(1, "Vogelsang", "51.1812, 6.6862"), (2, "Vogelsang Nord", "51.1795, 6.6889")])
+
 
 if __name__ == "__main__":
     # Run tests
-    result = unittest.TextTestRunner(verbosity=0).run(unittest.TestLoader().loadTestsFromTestCase(PipelineAutomatedTesting))
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite([loader.loadTestsFromTestCase(PipelineAutomatedTesting),
+                                loader.loadTestsFromTestCase(ComponentTesting)])
+    result = unittest.TextTestRunner(verbosity=0).run(suite)
 
     # Generate a summary
     print("\n\nTest Summary")